@@ -0,0 +1,53 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from api.renderer_service import RendererService
+from config.settings import Settings
+from models.snippet_fragment import SnippetFragment
+
+
+class AsyncRendererService:
+    """
+    Asyncio client for the renderer service that keeps a bounded number of requests in flight.
+
+    Requests run on the pooled session of the RendererService in a thread pool, so the
+    event loop stays free to classify and build the HTML of the next files while the
+    renderer works on the previous ones.
+    """
+
+    def __init__(self, concurrency: int | None = None):
+        """
+        Initialize the client with the concurrency limit from the settings.
+
+        Args:
+            concurrency (int | None, optional): The maximum number of requests in flight.
+                If None, uses the RENDERER_CONCURRENCY setting.
+        """
+        self.renderer = RendererService.load()
+        self.concurrency = concurrency or Settings.load().renderer_concurrency
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="renderer")
+
+    async def convert_many(
+            self, jobs: list[tuple[str | SnippetFragment, str, str, dict | None]]
+    ) -> list[dict | Exception]:
+        """
+        Sends a batch of HTML documents to the renderer service in a single request,
+        waiting for a free slot if the concurrency limit is reached.
+
+        Args:
+            jobs (list[tuple[str | SnippetFragment, str, str, dict | None]]): The HTML content or
+                code fragment, destination path, filename and viewport of each image
+
+        Returns:
+            list[dict | Exception]: The response or the error of each job, in the order of the jobs
+        """
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self.renderer.convert_many, jobs)
+
+    def close(self) -> None:
+        """
+        Shuts down the thread pool. The shared RendererService session stays open.
+        """
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from config.constants import RENDER_CACHE_VERSION, RENDER_CACHE_DIRNAME, IMAGE_CHUNK_SIZE
+from config.settings import Settings
+from utils.file_handler import FileHandler
+
+
+class RenderCache:
+    """
+    A content-addressed cache of rendered images.
+
+    Images are keyed by the hash of the final HTML together with everything else that
+    affects the screenshot: the viewport, the image format, the device scale factor and
+    the version of the renderer and its browser. A hit is copied to the destination
+    without a request to the renderer service. The images are kept in a directory under
+    the output path, bounded by their total size with least recently used eviction.
+    Implements the Singleton pattern so the cache is shared across a run.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        # Images of a batch are looked up and stored from the threads of the AsyncRendererService
+        self._lock = threading.Lock()
+
+        settings = Settings.load()
+        self.max_bytes = settings.render_cache_max_bytes
+        self.path = settings.render_cache_path
+        if self.path is None and settings.output_path:
+            self.path = os.path.join(settings.output_path, RENDER_CACHE_DIRNAME)
+
+        if self.enabled:
+            self._index()
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Deletes the singleton instance. The next call to load() will create a fresh instance.
+        """
+        cls._instance = None
+
+    @classmethod
+    def load(cls) -> "RenderCache":
+        """
+        Loads the render cache.
+        Returns the same instance on subsequent calls.
+
+        Returns:
+            RenderCache: The singleton cache instance
+        """
+        return cls()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Whether images are cached, which needs a cache directory and a size limit above zero.
+        """
+        return bool(self.path) and self.max_bytes > 0
+
+    @staticmethod
+    def get_key(html_content: str, viewport: dict | None, filename: str, renderer_version: str,
+                device_scale_factor: float) -> str:
+        """
+        Computes the cache key of a rendered image.
+
+        Args:
+            html_content (str): The HTML content of the image
+            viewport (dict | None): The viewport the page is rendered in, or None for the renderer's default
+            filename (str): The filename of the image, whose extension selects the image format
+            renderer_version (str): The version of the renderer service and its browser
+            device_scale_factor (float): The device pixel ratio the renderer takes screenshots at
+
+        Returns:
+            str: Hex digest of the inputs followed by the image extension
+        """
+        extension = os.path.splitext(filename)[1].lower()
+        settings_key = json.dumps([RENDER_CACHE_VERSION, renderer_version, device_scale_factor, viewport, extension])
+        digest = hashlib.sha256(settings_key.encode("utf-8"))
+        digest.update(html_content.encode("utf-8"))
+        return digest.hexdigest() + extension
+
+    def fetch(self, key: str, image_path: str) -> int | None:
+        """
+        Copies a cached image to its destination.
+
+        Args:
+            key (str): The cache key
+            image_path (str): The path to write the image to
+
+        Returns:
+            int | None: The size of the image in bytes, or None on a cache miss
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            cached = key in self._entries
+            if cached:
+                self._entries.move_to_end(key)
+
+        size = None
+        if cached:
+            cache_path = self._get_cache_path(key)
+            try:
+                with open(cache_path, "rb") as file:
+                    size = FileHandler.save_bytes_atomically(iter(lambda: file.read(IMAGE_CHUNK_SIZE), b""), image_path)
+                # The modification time orders the entries when the cache is indexed in the next run
+                os.utime(cache_path)
+            except FileNotFoundError:
+                self._remove(key)
+
+        with self._lock:
+            if size is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.bytes_saved += size
+        return size
+
+    def store(self, key: str, image_path: str) -> None:
+        """
+        Adds a rendered image to the cache, evicting the least recently used images
+        while the cache is over its size limit.
+
+        The image is copied rather than linked, so that overwriting the destination in
+        place never changes the cached image.
+
+        Args:
+            key (str): The cache key
+            image_path (str): The path of the rendered image
+        """
+        if not self.enabled:
+            return
+
+        try:
+            with open(image_path, "rb") as file:
+                size = FileHandler.save_bytes_atomically(
+                    iter(lambda: file.read(IMAGE_CHUNK_SIZE), b""), self._get_cache_path(key)
+                )
+        except OSError:
+            # The renderer may have saved the image to a volume this machine cannot read
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries[key]
+            self._entries[key] = size
+            self._size += size
+            evicted = []
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                evicted_key, evicted_size = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                evicted.append(evicted_key)
+
+        for evicted_key in evicted:
+            self._delete_file(evicted_key)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, misses, hit ratio, bytes copied from the cache instead of rendered,
+                number of cached images and their size in bytes
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
+
+    def summary(self) -> str:
+        """
+        Returns a one-line, human readable summary of the cache counters.
+
+        Returns:
+            str: The summary of hits, misses, hit ratio and bytes saved
+        """
+        stats = self.stats()
+        return (
+            f"Render cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_ratio']:.0%} hit ratio), {stats['bytes_saved'] / 1024:.0f} KB saved"
+        )
+
+    def clear(self) -> None:
+        """
+        Removes all cached images and resets the counters.
+        """
+        with self._lock:
+            keys = list(self._entries)
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.bytes_saved = 0
+
+        for key in keys:
+            self._delete_file(key)
+
+    def _index(self) -> None:
+        """
+        Loads the images already in the cache directory, least recently used first,
+        and evicts the oldest ones if the size limit was lowered since the last run.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.name.startswith("."):
+                # Temporary file of an interrupted write
+                os.remove(entry.path)
+                continue
+            stat = entry.stat()
+            files.append((stat.st_mtime, entry.name, stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._delete_file(key)
+
+    def _remove(self, key: str) -> None:
+        """
+        Forgets an entry whose image was deleted from the cache directory.
+        """
+        with self._lock:
+            size = self._entries.pop(key, None)
+            if size is not None:
+                self._size -= size
+
+    def _delete_file(self, key: str) -> None:
+        """
+        Deletes the image of an evicted entry.
+        """
+        try:
+            os.remove(self._get_cache_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _get_cache_path(self, key: str) -> str:
+        """
+        Returns the path of the cached image of a key.
+        """
+        return os.path.join(self.path, key)
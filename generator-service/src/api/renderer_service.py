@@ -1,20 +1,124 @@
+import base64
 import os
+import re
+import threading
+import time
+from http.client import RemoteDisconnected
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
+from urllib3.util.retry import Retry
 
+from api.render_cache import RenderCache
+from config.constants import RENDER_PRIORITY_BULK, RENDER_PRIORITY_INTERACTIVE, RENDERER_OUTPUT_IMAGE, IMAGE_CHUNK_SIZE
 from config.settings import Settings
+from models.snippet_fragment import SnippetFragment
+from rendering.contact_sheet import ContactSheet
+from rendering.image_post_processor import ImagePostProcessor
+from utils.file_handler import FileHandler
+
+# Render duration reported by the renderer service, e.g. "render;dur=812.4"
+SERVER_TIMING_RENDER_PATTERN = re.compile(r"\brender;dur=([\d.]+)")
+
+
+class _RendererRetry(Retry):
+    """
+    Retry policy of the renderer service requests, which treats connections the renderer reset or
+    closed before answering like connection errors. Idle keep-alive connections are closed this way.
+    """
+
+    def _is_connection_error(self, err: Exception) -> bool:
+        if isinstance(err, ProtocolError) and isinstance(err.args[-1], (ConnectionResetError, RemoteDisconnected)):
+            return True
+        return super()._is_connection_error(err)
 
 
 class RendererService:
     """
     Service class for communicating with the Node.js renderer service
     that handles HTML to image conversion.
+
+    By default the renderer sends the image bytes back, which are written to the destination
+    here, so the renderer may run on another machine. With RENDERER_OUTPUT=file it saves the
+    image to the /output volume it shares with this service instead.
+    Images that were rendered before from the same HTML are copied from the RenderCache.
+    Code snippets may be sent as a SnippetFragment, which the renderer swaps into a preset
+    page it keeps loaded. Preset pages are registered with the renderer on first use.
+    Batches render the fragments of a preset together on a ContactSheet.
+    Images sent back are post-processed by the ImagePostProcessor.
+
+    Requests go through a long-lived session with a pool of keep-alive connections,
+    which retries with backoff when a connection is refused or reset, and after the
+    delay in the Retry-After header when the renderer's queue is full.
+    Implements the Singleton pattern so a whole batch run reuses the same connections.
     """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
 
     def __init__(self):
         """Initialize the renderer service with configuration from environment variables."""
+        if self._initialized:
+            return
+
+        self._initialized = True
         self.settings = Settings.load()
         self.renderer_url = self.settings.renderer_service_url
+        self.returns_images = self.settings.renderer_output == RENDERER_OUTPUT_IMAGE
+        self.render_cache = RenderCache.load()
+        self._renderer_version = None
+        self._registered_presets: set[str] = set()
+        # Batches register presets from several threads, each preset is registered by one of them
+        self._presets_lock = threading.Lock()
+        self.requests = 0
+        self.total_time = 0.0
+        self.render_time = 0.0
+        self._counters_lock = threading.Lock()
+
+        # POST requests are only retried when the renderer never started on them: on connection errors
+        # and busy responses. A request whose response timed out may still be rendering, so it is not sent again.
+        # A busy renderer answers 429 with a Retry-After delay, which is waited for instead of the backoff,
+        # and the last busy response is returned instead of raised so its error message can be reported
+        retry = _RendererRetry(
+            total=self.settings.renderer_retries + self.settings.renderer_busy_retries,
+            connect=self.settings.renderer_retries,
+            read=False,
+            status=self.settings.renderer_busy_retries,
+            status_forcelist=(429, 503),
+            backoff_factor=self.settings.renderer_backoff,
+            allowed_methods=None,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=self.settings.renderer_pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Closes and deletes the singleton instance. The next call to load() will create a fresh instance.
+        """
+        if cls._instance is not None:
+            cls._instance.session.close()
+        cls._instance = None
+
+    @classmethod
+    def load(cls) -> "RendererService":
+        """
+        Loads the renderer service client.
+        Returns the same instance on subsequent calls.
+
+        Returns:
+            RendererService: The singleton renderer service client
+        """
+        return cls()
 
     def _get_relative_path(self, full_path):
         """
@@ -37,43 +141,518 @@ class RendererService:
         # Default case - return the path as is
         return full_path
 
-    def convert_html_to_image(self, html_content: str, dest_path: str, filename: str) -> dict:
+    def convert_html_to_image(
+            self,
+            html_content: str | SnippetFragment,
+            dest_path: str,
+            filename: str,
+            viewport: dict | None = None,
+            priority: str = RENDER_PRIORITY_INTERACTIVE
+    ) -> dict:
         """
         Sends HTML content to the renderer service to be converted to an image.
         
         Args:
-            html_content (str): The HTML content to convert
+            html_content (str | SnippetFragment): The HTML content to convert, or a code fragment
+                to render into its preset page
             dest_path (str): The destination path (can be a full Windows path)
             filename (str): The filename for the generated image (must end with .png, .jpg, or .jpeg)
+            viewport (dict | None, optional): The width and height of the page to render in CSS pixels,
+                as computed by SnippetMetrics.get_viewport. If None, the renderer's default viewport is used.
+            priority (str, optional): The queue lane of the render. Defaults to RENDER_PRIORITY_INTERACTIVE,
+                which is rendered before the images of running batches.
             
         Returns:
-            dict: Response from the renderer service containing status and path information
+            dict: Response from the renderer service containing status and path information,
+                the size of the image in bytes if the renderer sent it back, and the timing of
+                the request in seconds: the total round trip, the time the renderer spent
+                rendering and the remaining connection and transfer time. Images copied from
+                the render cache have no timing and are marked as cached.
             
         Raises:
             Exception: If the renderer service returns an error or is unavailable
         """
-        # Convert full Windows path to relative path for Docker container
-        relative_dest_path = self._get_relative_path(dest_path)
+        payload = self._get_job_payload(html_content, dest_path, filename, viewport)
+        image_path = self._get_image_path(payload, dest_path, filename)
+
+        cache_key = self._get_cache_key(html_content, viewport, filename)
+        size = self.render_cache.fetch(cache_key, image_path) if cache_key else None
+        if size is not None:
+            return self._post_process(self._get_cached_result(image_path, size))
 
         try:
-            response = requests.post(
-                f"{self.renderer_url}/convert",
-                json={
-                    "html": html_content,
-                    "destPath": relative_dest_path,
-                    "filename": filename
+            start = time.perf_counter()
+            response = self._post_jobs(
+                "/convert",
+                {**payload, "priority": priority, "output": self.settings.renderer_output},
+                [html_content],
+                timeout=30,
+                stream=True
+            )
+
+            with response:
+                if response.status_code != 200:
+                    error_data = response.json()
+                    raise Exception(f"Renderer service error: {error_data.get('error', 'Unknown error')}")
+
+                if self.returns_images:
+                    # Write the image while it arrives, the destination only appears once it is complete
+                    size = FileHandler.save_bytes_atomically(response.iter_content(IMAGE_CHUNK_SIZE), image_path)
+                    result = {"message": "Image saved successfully", "path": image_path, "size": size}
+                else:
+                    result = response.json()
+                    result['path'] = image_path
+
+                total_time = time.perf_counter() - start
+                result['timing'] = self._record_timing(total_time, response)
+
+            if cache_key:
+                self.render_cache.store(cache_key, image_path)
+            return self._post_process(result)
+
+        except requests.HTTPError as e:
+            # The renderer service rejected the preset page of the fragment
+            raise Exception(str(e))
+        except requests.RequestException as e:
+            raise Exception(f"Failed to communicate with renderer service: {str(e)}")
+
+    def convert_many(
+            self, jobs: list[tuple[str | SnippetFragment, str, str, dict | None]], priority: str = RENDER_PRIORITY_BULK
+    ) -> list[dict | Exception]:
+        """
+        Sends several HTML documents to the renderer service in a single request, which renders
+        them in parallel pages of one browser. Images sent back come base64 encoded in the
+        JSON response, and are written to their destinations when the batch is complete.
+        Images found in the render cache are copied instead and left out of the request.
+        Code fragments of the same preset are rendered together on contact sheets instead,
+        unless RENDERER_SHEETS is disabled or the renderer saves the images itself.
+
+        Args:
+            jobs (list[tuple[str | SnippetFragment, str, str, dict | None]]): The HTML content or code
+                fragment, destination path, filename and viewport of each image, like the arguments
+                of convert_html_to_image
+            priority (str, optional): The queue lane of the batch. Defaults to RENDER_PRIORITY_BULK.
+
+        Returns:
+            list[dict | Exception]: The response of each job in the order of the jobs, with its
+                path information, or the error the job failed with. When the renderer service
+                rejects a request or is unavailable, each job of the request gets that error,
+                while the images of the other jobs are kept.
+        """
+        results: list[dict | Exception | None] = [None] * len(jobs)
+        pending = []
+        for index, (html_content, dest_path, filename, viewport) in enumerate(jobs):
+            payload = self._get_job_payload(html_content, dest_path, filename, viewport)
+            image_path = self._get_image_path(payload, dest_path, filename)
+
+            cache_key = self._get_cache_key(html_content, viewport, filename)
+            try:
+                size = self.render_cache.fetch(cache_key, image_path) if cache_key else None
+                if size is not None:
+                    results[index] = self._post_process(self._get_cached_result(image_path, size))
+                    continue
+            except (ValueError, OSError) as e:
+                # The cached image could not be copied to its destination or post-processed
+                results[index] = e
+                continue
+            pending.append((index, html_content, payload, image_path, cache_key))
+
+        sheets, pending = self._pack_sheets(pending)
+        for sheet in sheets:
+            if not self._convert_sheet(sheet, priority, results):
+                # Render the fragments of a failed sheet on their own pages with the rest of the batch
+                pending.extend(sheet)
+        if pending:
+            self._convert_batch(pending, priority, results)
+        return results
+
+    def _convert_batch(self, pending: list[tuple], priority: str, results: list[dict | Exception | None]) -> None:
+        """
+        Renders jobs of a batch on parallel pages of the renderer service and writes their images.
+
+        Args:
+            pending (list[tuple]): The index, content, payload, image path and cache key of each job
+            priority (str): The queue lane of the batch
+            results (list[dict | Exception | None]): The results of the batch, filled in at the index of each job.
+                If the renderer service rejects the batch, is unavailable or sends an invalid response,
+                each job gets the error, and a job whose image is missing or cannot be written gets its own.
+        """
+        try:
+            start = time.perf_counter()
+            response = self._post_jobs(
+                "/convert-batch",
+                {
+                    "jobs": [payload for _, _, payload, _, _ in pending],
+                    "priority": priority,
+                    "output": self.settings.renderer_output
                 },
-                timeout=30
+                [html_content for _, html_content, _, _, _ in pending],
+                timeout=30 * len(pending)
             )
+            total_time = time.perf_counter() - start
 
-            if response.status_code == 200:
-                # Convert the relative path back to full Windows path for local use
-                result = response.json()
-                result['path'] = os.path.join("D:/Coek/Work/Social Media Nikola", relative_dest_path, filename)
-                return result
-            else:
+            if response.status_code != 200:
                 error_data = response.json()
                 raise Exception(f"Renderer service error: {error_data.get('error', 'Unknown error')}")
 
+            job_results = response.json()["results"]
+            if not isinstance(job_results, list):
+                raise TypeError(f"Expected a list of results, got {type(job_results).__name__}")
+
+        except (KeyError, TypeError, ValueError) as e:
+            error = Exception(f"Invalid response from renderer service: {e!r}")
+        except requests.HTTPError as e:
+            # The renderer service rejected one of the preset pages
+            error = Exception(str(e))
         except requests.RequestException as e:
-            raise Exception(f"Failed to communicate with renderer service: {str(e)}")
+            error = Exception(f"Failed to communicate with renderer service: {str(e)}")
+        except Exception as e:
+            # The renderer service rejected the batch
+            error = e
+        else:
+            error = None
+
+        if error is not None:
+            for index, _, _, _, _ in pending:
+                results[index] = error
+            return
+
+        timing = self._record_timing(total_time, response)
+        for position, (index, _, _, image_path, cache_key) in enumerate(pending):
+            result = job_results[position] if position < len(job_results) else None
+            if not isinstance(result, dict):
+                results[index] = Exception("Renderer service sent no result for the job")
+                continue
+            if result.get("status") != "ok":
+                results[index] = Exception(f"Renderer service error: {result.get('details') or result.get('error')}")
+                continue
+
+            try:
+                if self.returns_images:
+                    result['size'] = FileHandler.save_bytes_atomically(
+                        [base64.b64decode(result.pop('image'), validate=True)], image_path
+                    )
+                result['path'] = image_path
+                result['timing'] = timing
+
+                if cache_key:
+                    self.render_cache.store(cache_key, image_path)
+                results[index] = self._post_process(result)
+            except (KeyError, ValueError) as e:
+                results[index] = Exception(f"Invalid image from renderer service: {e!r}")
+            except OSError as e:
+                results[index] = e
+
+    def _pack_sheets(self, pending: list[tuple]) -> tuple[list[list[tuple]], list[tuple]]:
+        """
+        Groups the code fragments of a batch by preset and packs each group into contact sheets.
+
+        Args:
+            pending (list[tuple]): The index, content, payload, image path and cache key of each job
+
+        Returns:
+            tuple[list[list[tuple]], list[tuple]]: The jobs of each sheet, and the jobs rendered
+                on their own, as they are full HTML documents or would be alone on their sheet
+        """
+        if not self.settings.renderer_sheets or not self.returns_images:
+            return [], pending
+
+        presets: dict[str, list[tuple]] = {}
+        for job in pending:
+            html_content, payload = job[1], job[2]
+            if isinstance(html_content, SnippetFragment) and "viewport" in payload:
+                presets.setdefault(html_content.preset, []).append(job)
+
+        sheets = []
+        for preset_jobs in presets.values():
+            heights = [payload["viewport"]["height"] for _, _, payload, _, _ in preset_jobs]
+            for indices in ContactSheet.pack(heights):
+                if len(indices) > 1:
+                    sheets.append([preset_jobs[index] for index in indices])
+
+        on_sheets = {job[0] for sheet in sheets for job in sheet}
+        return sheets, [job for job in pending if job[0] not in on_sheets]
+
+    def _convert_sheet(self, sheet: list[tuple], priority: str, results: list[dict | Exception | None]) -> bool:
+        """
+        Renders code fragments of one preset as a contact sheet and slices it into their images.
+
+        Args:
+            sheet (list[tuple]): The index, content, payload, image path and cache key of each job
+            priority (str): The queue lane of the batch
+            results (list[dict | Exception | None]): The results of the batch, filled in at the index of each job
+
+        Returns:
+            bool: Whether the sheet was rendered, False if the renderer service rejected it, is unavailable
+                or sent a sheet that could not be sliced into the images, in which case no result is filled in
+        """
+        try:
+            start = time.perf_counter()
+            response = self._post_jobs(
+                "/convert-sheet",
+                {"jobs": [payload for _, _, payload, _, _ in sheet], "priority": priority},
+                [html_content for _, html_content, _, _, _ in sheet],
+                timeout=30 * len(sheet)
+            )
+            total_time = time.perf_counter() - start
+
+            if response.status_code != 200:
+                error_data = response.json()
+                raise requests.HTTPError(
+                    f"Renderer service error: {error_data.get('error', 'Unknown error')}", response=response
+                )
+
+            sheet_result = response.json()
+            if len(sheet_result["boxes"]) != len(sheet):
+                raise ValueError(f"Expected {len(sheet)} boxes, got {len(sheet_result['boxes'])}")
+            sizes = ContactSheet.slice_images(
+                base64.b64decode(sheet_result["image"], validate=True),
+                sheet_result["boxes"],
+                sheet_result["deviceScaleFactor"],
+                [image_path for _, _, _, image_path, _ in sheet]
+            )
+
+        except (requests.RequestException, KeyError, TypeError, ValueError, OSError) as e:
+            # Unavailable, rejected, an invalid response or a sheet that could not be sliced and written
+            print(f"Contact sheet failed, rendering its {len(sheet)} images on their own: {str(e)}")
+            return False
+
+        timing = self._record_timing(total_time, response)
+        for (index, _, _, image_path, cache_key), size in zip(sheet, sizes):
+            if cache_key:
+                self.render_cache.store(cache_key, image_path)
+            try:
+                results[index] = self._post_process({
+                    "message": "Image sliced from a contact sheet", "path": image_path, "size": size, "timing": timing
+                })
+            except (ValueError, OSError) as e:
+                results[index] = e
+        return True
+
+    def _post_jobs(
+            self, path: str, body: dict, contents: list[str | SnippetFragment], **kwargs
+    ) -> requests.Response:
+        """
+        Posts conversion jobs to the renderer service, registering the preset pages of their fragments first.
+
+        A renderer that restarted has lost its preset pages and answers 409, in which case the
+        presets are registered again and the jobs sent once more.
+
+        Args:
+            path (str): The path of the endpoint
+            body (dict): The request body
+            contents (list[str | SnippetFragment]): The HTML content or code fragment of each job
+            **kwargs: Further arguments of the request, like its timeout
+
+        Returns:
+            requests.Response: The response of the renderer service
+        """
+        fragments = [content for content in contents if isinstance(content, SnippetFragment)]
+        self._register_presets(fragments)
+
+        response = self.session.post(f"{self.renderer_url}{path}", json=body, **kwargs)
+        if response.status_code == 409 and fragments:
+            response.close()
+            self._register_presets(fragments, force=True)
+            response = self.session.post(f"{self.renderer_url}{path}", json=body, **kwargs)
+        return response
+
+    def _register_presets(self, fragments: list[SnippetFragment], force: bool = False) -> None:
+        """
+        Registers the preset pages of code fragments with the renderer service.
+
+        Args:
+            fragments (list[SnippetFragment]): The code fragments to render
+            force (bool, optional): Whether to register presets that were registered before.
+                Defaults to False.
+
+        Raises:
+            requests.RequestException: If the renderer service is unavailable or rejects a preset page
+        """
+        presets = {fragment.preset: fragment.preset_html for fragment in fragments}
+        with self._presets_lock:
+            for name, preset_html in presets.items():
+                if name in self._registered_presets and not force:
+                    continue
+
+                response = self.session.post(
+                    f"{self.renderer_url}/presets", json={"name": name, "html": preset_html}, timeout=30
+                )
+                if response.status_code != 200:
+                    error_data = response.json()
+                    raise requests.HTTPError(
+                        f"Renderer service error: {error_data.get('error', 'Unknown error')}", response=response
+                    )
+                self._registered_presets.add(name)
+
+    def get_renderer_version(self) -> dict | None:
+        """
+        Asks the renderer service for its version and device scale factor, once per session.
+
+        Returns:
+            dict | None: The version of the renderer and its browser, and the device scale factor
+                it renders at, or None if the renderer service does not report them
+        """
+        if self._renderer_version is None:
+            try:
+                response = self.session.get(f"{self.renderer_url}/version", timeout=5)
+                if response.status_code == 200:
+                    self._renderer_version = response.json()
+            except requests.RequestException:
+                # Unavailable for now, the next call asks again
+                pass
+        return self._renderer_version
+
+    def _get_cache_key(self, html_content: str | SnippetFragment, viewport: dict | None, filename: str) -> str | None:
+        """
+        Computes the render cache key of an image.
+
+        Args:
+            html_content (str | SnippetFragment): The HTML content or code fragment to convert
+            viewport (dict | None): The width and height of the page to render, or None for the default
+            filename (str): The filename for the generated image
+
+        Returns:
+            str | None: The cache key, or None if the cache is disabled or the renderer version is unknown
+        """
+        if not self.render_cache.enabled:
+            return None
+
+        renderer_version = self.get_renderer_version()
+        if renderer_version is None:
+            return None
+
+        if isinstance(html_content, SnippetFragment):
+            # The preset name changes with the preset page, so it identifies the page the fragment is rendered in
+            html_content = f"{html_content.preset}:{html_content.fragment}"
+
+        return RenderCache.get_key(
+            html_content, viewport, filename, renderer_version["version"], renderer_version["deviceScaleFactor"]
+        )
+
+    def _get_image_path(self, payload: dict, dest_path: str, filename: str) -> str:
+        """
+        Returns the local path of the image of a job.
+
+        Args:
+            payload (dict): The job as sent to the renderer service
+            dest_path (str): The destination path
+            filename (str): The filename for the generated image
+
+        Returns:
+            str: The destination of the image, or for images saved by the renderer,
+                their full Windows path for local use
+        """
+        if self.returns_images:
+            return os.path.join(dest_path, filename)
+        return os.path.join("D:/Coek/Work/Social Media Nikola", payload["destPath"], filename)
+
+    def _post_process(self, result: dict) -> dict:
+        """
+        Post-processes an image that was sent back by the renderer service or copied from the render cache.
+
+        The render cache keeps the image as it was rendered, so changing the IMAGE_* settings
+        never needs a new render.
+
+        Args:
+            result (dict): The result of the image, with its path
+
+        Returns:
+            dict: The result with the size of the post-processed PNG and the size of each saved file
+        """
+        if self.returns_images and ImagePostProcessor.is_enabled():
+            images = ImagePostProcessor.process_file(result["path"])
+            result["size"] = images[result["path"]]
+            result["images"] = images
+        return result
+
+    @staticmethod
+    def _get_cached_result(image_path: str, size: int) -> dict:
+        """
+        Builds the result of an image copied from the render cache.
+
+        Args:
+            image_path (str): The path the image was copied to
+            size (int): The size of the image in bytes
+
+        Returns:
+            dict: The result with the path of the image, like the renderer service's response
+        """
+        return {"message": "Image copied from the render cache", "path": image_path, "size": size, "cached": True}
+
+    def _get_job_payload(
+            self, html_content: str | SnippetFragment, dest_path: str, filename: str, viewport: dict | None
+    ) -> dict:
+        """
+        Builds the request body of a single conversion job.
+
+        Args:
+            html_content (str | SnippetFragment): The HTML content or code fragment to convert
+            dest_path (str): The destination path (can be a full Windows path)
+            filename (str): The filename for the generated image
+            viewport (dict | None): The width and height of the page to render, or None for the default
+
+        Returns:
+            dict: The job as expected by the renderer service
+        """
+        if isinstance(html_content, SnippetFragment):
+            payload = {"fragment": html_content.fragment, "preset": html_content.preset}
+        else:
+            payload = {"html": html_content}
+        payload["filename"] = filename
+        if not self.returns_images:
+            # Convert full Windows path to relative path for Docker container
+            payload["destPath"] = self._get_relative_path(dest_path)
+        if viewport is not None:
+            payload["viewport"] = viewport
+        return payload
+
+    def _record_timing(self, total_time: float, response: requests.Response) -> dict:
+        """
+        Splits the round trip of a request into rendering and transport time and adds it to the counters.
+
+        Args:
+            total_time (float): The round trip time of the request in seconds
+            response (requests.Response): The response, carrying the render duration in its Server-Timing header
+
+        Returns:
+            dict: The total, render and transport time of the request in seconds
+        """
+        match = SERVER_TIMING_RENDER_PATTERN.search(response.headers.get("Server-Timing", ""))
+        render_time = min(float(match.group(1)) / 1000, total_time) if match else 0.0
+
+        # Requests may be sent from several threads by the AsyncRendererService
+        with self._counters_lock:
+            self.requests += 1
+            self.total_time += total_time
+            self.render_time += render_time
+        return {"total": total_time, "render": render_time, "transport": total_time - render_time}
+
+    def stats(self) -> dict:
+        """
+        Returns the request counters.
+
+        Returns:
+            dict: The number of requests and their total, render and transport time in seconds
+        """
+        return {
+            "requests": self.requests,
+            "total": self.total_time,
+            "render": self.render_time,
+            "transport": self.total_time - self.render_time,
+        }
+
+    def summary(self) -> str:
+        """
+        Returns a one-line, human readable summary of the request counters.
+
+        Returns:
+            str: The summary of requests and the average render and transport time
+        """
+        if not self.requests:
+            return "Renderer service: 0 requests"
+        return (
+            f"Renderer service: {self.requests} requests, "
+            f"{self.render_time / self.requests * 1000:.0f} ms render, "
+            f"{(self.total_time - self.render_time) / self.requests * 1000:.0f} ms transport on average"
+        )
@@ -12,7 +12,8 @@ from config.prompts import (
     prompt_for_title,
 )
 from config.prompts import style
-from core.code_classifier import parse_code
+from config.settings import Settings
+from core.classification_cache import ClassificationCache
 from generators.html_generator import HtmlGenerator
 from utils.file_handler import FileHandler
 
@@ -44,11 +45,10 @@ def generate_html_file(file_name: str, folder_path: str) -> None:
         return
 
     title = "csharp" if file_name.endswith(".cs") else "json"
-    token_classifications = parse_code(code_snippet)
-    html_code = HtmlGenerator.generate_blog_html_file_content(code_snippet, token_classifications, title)
+    token_spans = ClassificationCache.load().classify(code_snippet, Settings.load().classifier_options)
 
     with open(html_file_path, "w") as html_file:
-        html_file.write(html_code)
+        HtmlGenerator.write_blog_html_file_content(code_snippet, token_spans, html_file, title)
 
 
 def generate_html_from_manual_input() -> None:
@@ -58,8 +58,8 @@ def generate_html_from_manual_input() -> None:
     code_snippet, file_name, folder_path = prompt_for_code_snippet()
     title = prompt_for_title()
 
-    token_classifications = parse_code(code_snippet)
-    html_code = HtmlGenerator.generate_blog_html_file_content(code_snippet, token_classifications, title)
+    token_spans = ClassificationCache.load().classify(code_snippet, Settings.load().classifier_options)
+    html_code = HtmlGenerator.generate_blog_html_file_content(code_snippet, token_spans, title)
 
     FileHandler.save_file(file_name, folder_path, html_code)
     open_folder_in_explorer(folder_path)
@@ -115,6 +115,7 @@ def generate_htmls_from_folder(preset_folder: str | None = None) -> None:
 
         os.system("cls")
         print_success(f"Html files successfully generated!")
+        print(ClassificationCache.load().summary())
         open_folder_in_explorer(folder_path)
 
 
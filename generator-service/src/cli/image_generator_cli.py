@@ -1,9 +1,15 @@
+import asyncio
 import os
 
 from prompt_toolkit.shortcuts import button_dialog
 
+from api.async_renderer_service import AsyncRendererService
+from api.render_cache import RenderCache
+from api.renderer_service import RendererService
 from cli.benchmark_cli import process_benchmark_table
-from config.constants import menu_text
+from config.constants import (
+    menu_text, RENDER_BACKEND_BROWSER, RENDER_BACKEND_PILLOW, RENDER_BACKEND_SVG, BENCHMARK_TABLE_MAX_WIDTH
+)
 from config.prompts import (
     prompt_for_code_snippet,
     prompt_for_file,
@@ -12,12 +18,79 @@ from config.prompts import (
     open_folder_in_explorer,
     style,
 )
-from core.code_classifier import parse_code
+from config.settings import Settings
+from core.classification_cache import ClassificationCache
 from generators.benchmark_html_generator import BenchmarkHtmlGenerator
+from generators.console_preview import ConsolePreview
 from generators.html_generator import HtmlGenerator
+from models.snippet_fragment import SnippetFragment
+from rendering.glyph_atlas import GlyphAtlas
+from rendering.pillow_renderer import PillowRenderer
+from rendering.snippet_metrics import SnippetMetrics
 from utils.file_handler import FileHandler
 
 
+def prepare_image_request(
+        code_snippet: str, file_name: str, code_path: str
+) -> tuple[str | SnippetFragment, str, str, dict] | None:
+    """
+    Prepares the renderer service request of a code snippet or benchmark results.
+    With the Pillow and SVG backends, the image is generated right away instead.
+
+    Args:
+        code_snippet (str): The source code to convert to an image
+        file_name (str): The file name (without extension)
+        code_path (str): The directory path where the code file is stored at
+
+    Returns:
+        tuple[str | SnippetFragment, str, str, dict] | None: The HTML or code fragment, destination path,
+            file name and viewport to send to the renderer service, or None if the image was already generated
+    """
+    image_file_destination = FileHandler.convert_code_to_image_destination(code_path)
+    settings = Settings.load()
+
+    if file_name.endswith('.txt'):
+        benchmark_table = process_benchmark_table(code_snippet)
+
+        if settings.render_backend == RENDER_BACKEND_PILLOW:
+            PillowRenderer.render_benchmark_table_image(benchmark_table, image_file_destination, file_name)
+            return None
+        if settings.render_backend == RENDER_BACKEND_SVG:
+            svg_code = BenchmarkHtmlGenerator.generate_benchmark_svg(benchmark_table)
+            HtmlGenerator.save_svg_image(svg_code, image_file_destination, file_name)
+            return None
+
+        html_code = BenchmarkHtmlGenerator.generate_benchmark_html(benchmark_table)
+        viewport = SnippetMetrics.get_viewport(
+            SnippetMetrics.get_benchmark_table_size(benchmark_table), BENCHMARK_TABLE_MAX_WIDTH
+        )
+    else:
+        options = settings.classifier_options
+        token_spans = ClassificationCache.load().classify(code_snippet, options)
+
+        if settings.render_backend == RENDER_BACKEND_PILLOW:
+            ConsolePreview.print_preview(HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans))
+            PillowRenderer.render_code_snippet_image(
+                code_snippet, token_spans, options, image_file_destination, file_name
+            )
+            return None
+        if settings.render_backend == RENDER_BACKEND_SVG:
+            ConsolePreview.print_preview(HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans))
+            svg_code = HtmlGenerator.generate_code_snippet_svg(code_snippet, token_spans, options)
+            HtmlGenerator.save_svg_image(svg_code, image_file_destination, file_name)
+            return None
+
+        if settings.renderer_fragments:
+            html_code = HtmlGenerator.generate_code_snippet_fragment(code_snippet, token_spans, options)
+        else:
+            html_code = HtmlGenerator.generate_code_snippets_image_html(code_snippet, token_spans, options)
+        lines = HtmlGenerator.split_code_snippet_lines(code_snippet, token_spans)
+        viewport = SnippetMetrics.get_viewport(SnippetMetrics.get_code_snippet_size(lines))
+
+    image_file_name = os.path.splitext(file_name)[0] + '.png'
+    return html_code, image_file_destination, image_file_name, viewport
+
+
 def generate_image_logic(code_snippet: str, file_name: str, code_path: str):
     """
     Generates an image from a code snippet or benchmark results.
@@ -30,15 +103,101 @@ def generate_image_logic(code_snippet: str, file_name: str, code_path: str):
     Returns:
         None: The function generates an image file on disk
     """
-    if file_name.endswith('.txt'):
-        benchmark_table = process_benchmark_table(code_snippet)
-        html_code = BenchmarkHtmlGenerator.generate_benchmark_html(benchmark_table)
-    else:
-        token_classifications = parse_code(code_snippet)
-        html_code = HtmlGenerator.generate_code_snippets_image_html(code_snippet, token_classifications)
+    image_request = prepare_image_request(code_snippet, file_name, code_path)
+    if image_request is not None:
+        HtmlGenerator.render_code_snippet_image(*image_request)
 
-    image_file_destination = FileHandler.convert_code_to_image_destination(code_path)
-    HtmlGenerator.render_code_snippet_image(html_code, image_file_destination, file_name)
+
+async def render_images_concurrently(
+        folder_path: str,
+        file_names: list[str],
+        prepared_requests: dict[str, tuple[str | SnippetFragment, str, str, dict] | None]
+) -> dict[str, dict | Exception]:
+    """
+    Renders the images of a folder with the renderer service, keeping several requests in flight.
+
+    The files are read, classified and turned into HTML on the event loop and sent in
+    batches of RENDERER_BATCH_SIZE images, while the previous batches are rendering.
+
+    Args:
+        folder_path (str): The folder the files are stored in
+        file_names (list[str]): The names of the files to render
+        prepared_requests (dict[str, tuple[str | SnippetFragment, str, str, dict] | None]): The renderer requests
+            that were prepared up front, by file name
+
+    Returns:
+        dict[str, dict | Exception]: The renderer service response or the error of each rendered file
+    """
+    renderer = AsyncRendererService()
+    batch_size = Settings.load().renderer_batch_size
+    results: dict[str, dict | Exception] = {}
+
+    async def render_batch(batch_file_names: list[str], batch: list[tuple[str | SnippetFragment, str, str, dict]]) -> None:
+        # Failed requests are reported per file, so the images of the other files in the batch are kept
+        results.update(zip(batch_file_names, await renderer.convert_many(batch)))
+
+    pending_batches = []
+    batch_file_names, batch = [], []
+    try:
+        for file_name in file_names:
+            if file_name in prepared_requests:
+                image_request = prepared_requests[file_name]
+            else:
+                os.system("cls")
+                print_success(f"Generating {file_name}.\n\n")
+
+                code_snippet = FileHandler.read_file(f"{folder_path}/{file_name}")
+                if not code_snippet:
+                    continue
+                try:
+                    image_request = prepare_image_request(code_snippet, file_name, folder_path)
+                except Exception as e:
+                    results[file_name] = e
+                    continue
+
+            if image_request is None:
+                continue
+            batch_file_names.append(file_name)
+            batch.append(image_request)
+
+            if len(batch) == batch_size:
+                pending_batches.append(asyncio.create_task(render_batch(batch_file_names, batch)))
+                batch_file_names, batch = [], []
+                # Let the batch reach the renderer before preparing the next files
+                await asyncio.sleep(0)
+
+        if batch:
+            pending_batches.append(asyncio.create_task(render_batch(batch_file_names, batch)))
+        await asyncio.gather(*pending_batches)
+    finally:
+        renderer.close()
+
+    return results
+
+
+def generate_images_with_renderer(folder_path: str, file_names: list[str]) -> None:
+    """
+    Batch renders the images of a folder with the renderer service and reports the failed files.
+
+    Args:
+        folder_path (str): The folder the files are stored in
+        file_names (list[str]): The names of the files to render
+    """
+    # Benchmark tables are set up in interactive dialogs, which cannot run inside the event loop
+    prepared_requests = {}
+    for file_name in file_names:
+        if file_name.endswith(".txt"):
+            code_snippet = FileHandler.read_file(f"{folder_path}/{file_name}")
+            if code_snippet:
+                prepared_requests[file_name] = prepare_image_request(code_snippet, file_name, folder_path)
+
+    results = asyncio.run(render_images_concurrently(folder_path, file_names, prepared_requests))
+
+    os.system("cls")
+    failures = {file_name: error for file_name, error in results.items() if isinstance(error, Exception)}
+    for file_name, error in failures.items():
+        print(f"Failed to generate {file_name}: {error}")
+    print_success(f"{len(results) - len(failures)} images successfully generated!")
 
 
 def generate_image_from_manual_input():
@@ -97,12 +256,19 @@ def generate_images_from_folder(preset_folder=None):
     folder_path = preset_folder or prompt_for_folder()
 
     if folder_path:
-        for file_name in os.listdir(folder_path):
+        file_names = [
+            file_name for file_name in os.listdir(folder_path)
             if (
                     file_name.endswith(".cs") or
                     file_name.endswith(".txt") or
                     file_name.endswith(".json")
-            ):
+            )
+        ]
+
+        if Settings.load().render_backend == RENDER_BACKEND_BROWSER:
+            generate_images_with_renderer(folder_path, file_names)
+        else:
+            for file_name in file_names:
                 os.system("cls")
                 print_success(f"Generating {file_name}.\n\n")
 
@@ -113,8 +279,15 @@ def generate_images_from_folder(preset_folder=None):
 
                 generate_image_logic(code_snippet, file_name, folder_path)
 
-        os.system("cls")
-        print_success(f"Images successfully generated!")
+            os.system("cls")
+            print_success(f"Images successfully generated!")
+
+        print(ClassificationCache.load().summary())
+        if Settings.load().render_backend == RENDER_BACKEND_PILLOW:
+            print(GlyphAtlas.load().summary())
+        elif Settings.load().render_backend == RENDER_BACKEND_BROWSER:
+            print(RendererService.load().summary())
+            print(RenderCache.load().summary())
         open_folder_in_explorer(os.path.split(folder_path)[0] + "/Images")
 
 
@@ -2,6 +2,7 @@ DELIMITERS = [
     " ",  # Space
     "\n",  # New line
     "\t",  # Tab
+    "\r",  # Carriage return
     ".",  # Member access
     "(",  # Opening parenthesis
     ")",  # Closing parenthesis
@@ -25,6 +26,10 @@ DELIMITERS = [
     "%",  # Modulus
     "&&",  # Logical AND
     "||",  # Logical OR
+    "=>",  # Lambda / expression body
+    "??",  # Null coalescing
+    "++",  # Increment
+    "--",  # Decrement
     "!",  # Logical NOT
     ";",  # Statement terminator
     ":",  # Colon
@@ -49,6 +54,117 @@ TOKEN_STRING = "string"
 TOKEN_BLANK = ""
 BACKGROUND_COLOR = ""
 
+# Compact token kinds stored in token spans, as indexes into TOKEN_KIND_CLASSES.
+# KIND_NONE marks code that is emitted without a classification.
+TOKEN_KIND_CLASSES = (
+    None,
+    TOKEN_BLANK,
+    TOKEN_CLASS_NAME,
+    TOKEN_INTERFACE,
+    TOKEN_METHOD,
+    TOKEN_PROPERTY,
+    TOKEN_VARIABLE,
+    TOKEN_KEYWORD,
+    TOKEN_NUMBER,
+    TOKEN_COMMENT,
+    TOKEN_STRING,
+)
+TOKEN_KINDS = {token_class: kind for kind, token_class in enumerate(TOKEN_KIND_CLASSES)}
+KIND_NONE = TOKEN_KINDS[None]
+
+# Classification cache. Bump CLASSIFIER_VERSION whenever classification results
+# change, so that previously cached spans are no longer used.
+CLASSIFIER_VERSION = 1
+CLASSIFICATION_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# The persisted store drops its oldest entries once their spans take up more than this
+CLASSIFICATION_CACHE_DISK_MAX_BYTES = 256 * 1024 * 1024
+CLASSIFICATION_CACHE_FILENAME = "classification_cache.sqlite3"
+
+# Number of tokens rendered into each chunk of streamed HTML
+HTML_CHUNK_TOKENS = 1024
+
+# Time in seconds the classifier may spend on multi-token rules for a single file,
+# after which only the linear per-word rules are applied to the rest of the file
+CLASSIFICATION_TIME_BUDGET = 1.0
+
+# Image rendering backends
+RENDER_BACKEND_BROWSER = "browser"
+RENDER_BACKEND_PILLOW = "pillow"
+RENDER_BACKEND_SVG = "svg"
+RENDER_BACKENDS = [RENDER_BACKEND_BROWSER, RENDER_BACKEND_PILLOW, RENDER_BACKEND_SVG]
+
+# Output modes of the renderer service: send the image bytes back, or save them to the shared /output volume
+RENDERER_OUTPUT_IMAGE = "image"
+RENDERER_OUTPUT_FILE = "file"
+RENDERER_OUTPUTS = [RENDERER_OUTPUT_IMAGE, RENDERER_OUTPUT_FILE]
+
+# Size of the chunks images are streamed and copied in
+IMAGE_CHUNK_SIZE = 64 * 1024
+
+# Formats the image post-processing stage can write next to each PNG
+IMAGE_FORMAT_WEBP = "webp"
+IMAGE_FORMAT_AVIF = "avif"
+IMAGE_FORMATS = [IMAGE_FORMAT_WEBP, IMAGE_FORMAT_AVIF]
+
+# Contact sheets: the snippet fragments of a batch are stacked on one page of the renderer, which takes
+# a single screenshot of them, as long as the sum of their viewport heights stays below this (CSS pixels)
+RENDER_SHEET_MAX_HEIGHT = 4096
+
+# Render cache. Bump RENDER_CACHE_VERSION whenever the HTML sent to the renderer no longer
+# determines the image on its own, so that previously cached images are no longer used.
+RENDER_CACHE_VERSION = 1
+RENDER_CACHE_DIRNAME = "render_cache"
+
+# Priority lanes of the renderer service queue, interactive renders are served before bulk ones
+RENDER_PRIORITY_INTERACTIVE = "interactive"
+RENDER_PRIORITY_BULK = "bulk"
+
+# Code snippet image layout in CSS pixels, mirroring resources/snippet_template.html
+# and SyntaxPresets.generate_css
+SNIPPET_FONT_PATH = "resources/fonts/Hack-Regular.ttf"
+SNIPPET_FONT_FAMILY = "Hack, monospace"
+SNIPPET_FONT_NAME = "Hack"
+# Font subsets of the pages sent to the renderer service always hold printable ASCII, so that
+# nearly all snippets share one cached subset, and the number of subsets kept
+FONT_SUBSET_BASE_CHARS = "".join(chr(code) for code in range(0x20, 0x7f))
+FONT_SUBSET_CACHE_SIZE = 256
+SNIPPET_FONT_ADVANCE = 1233 / 2048  # Hack glyph metrics in em
+SNIPPET_FONT_ASCENT = 1901 / 2048
+SNIPPET_FONT_DESCENT = 483 / 2048
+SNIPPET_IMAGE_SCALE = 2
+SNIPPET_FONT_SIZE = 14
+SNIPPET_LINE_HEIGHT = 21
+SNIPPET_LETTER_SPACING = 0.25
+SNIPPET_TAB_SIZE = 8
+SNIPPET_TEXT_COLOR = "ffffff"
+SNIPPET_CONTAINER_PADDING = 12
+SNIPPET_CODE_PADDING = 5
+SNIPPET_HEADER_PADDING = (8, 16, 8, 9)  # Top, right, bottom, left
+SNIPPET_HEADER_CIRCLE_SIZE = 15
+SNIPPET_HEADER_CIRCLE_MARGIN = 9
+SNIPPET_HEADER_CIRCLE_COLORS = ["ff5f56", "ffbd2e", "27c93f"]
+
+# Benchmark table image layout in CSS pixels, mirroring resources/benchmark_template.html
+BENCHMARK_FONT_SIZE = 16
+BENCHMARK_LINE_HEIGHT = 19
+BENCHMARK_CELL_PADDING = (8, 12)  # Vertical, horizontal
+BENCHMARK_BORDER_WIDTH = 1
+BENCHMARK_BACKGROUND_COLOR = "1e1e1e"
+BENCHMARK_HEADER_BACKGROUND_COLOR = "2d2d2d"
+BENCHMARK_BORDER_COLOR = "3c3c3c"
+BENCHMARK_TEXT_COLOR = "dcdcdc"
+BENCHMARK_METHOD_COLOR = "56a8f5"
+BENCHMARK_UNDERLINE_COLOR = "ed1c24"
+BENCHMARK_UNDERLINE_OFFSET = 2
+BENCHMARK_UNDERLINE_HEIGHT = 2.75
+BENCHMARK_UNDERLINE_RADIUS = 1.25
+BENCHMARK_TABLE_MAX_WIDTH = 600
+
+# Renderer service viewport around the rendered element, in CSS pixels
+RENDER_VIEWPORT_PADDING = 20
+RENDER_VIEWPORT_SLACK = 16
+RENDER_VIEWPORT_MAX_SIZE = 16384
+
 TOKEN_COLORS_ANSI = {
     "class-name": 141,
     "interface": 141,
@@ -7,21 +7,12 @@ These patterns are used for syntax highlighting and code analysis.
 # Pattern to extract using directives and namespace declarations
 IMPORTS_AND_NAMESPACES_PATTERN = r"(?:using|namespace)\s+([a-zA-Z0-9_.]+);"
 
-# Pattern to extract class names (not following a dot, and not followed by parentheses)
-CLASS_NAMES_PATTERN = r"(?<![.])\b[A-Z][a-zA-Z]*\b(?!\()"
-
-# Pattern to extract interface names (not following a dot, and not followed by parentheses)
-INTERFACE_NAMES_PATTERN = r"(?<![.])\b[I][A-Z][a-z][a-zA-Z]*\b(?!\()"
-
-# Pattern to extract variable names (starts with lowercase, can be camelCase, no parentheses or < after)
-VARIABLE_NAMES_PATTERN = r"(?<![.])\b[a-z][a-zA-Z0-9]*\b(?!\(|<)"
-
-# Pattern to extract method names
-METHODS_PATTERN = r"\w+\(.*?"
-
 # Pattern to extract generic method names
 GENERIC_METHODS_PATTERN = r".?\b(\w+)<[^>]*>+\("
 
+# Pattern to check the end of a generic method's type arguments
+GENERIC_METHOD_END_PATTERN = r">+\("
+
 # Pattern to extract constructors
 CONSTRUCTORS_PATTERN = r"\bnew (\w+)"
 
@@ -31,11 +22,13 @@ OBJECT_INITIALIZERS_PATTERN = r"new\s+\w+\s*\{[^{}]*\}"
 # Pattern to extract properties from object initializers
 OBJECT_INITIALIZER_PROPERTIES_PATTERN = r"\b(\w+)\b(?=\s*[:=])"
 
-# Pattern to extract properties from member access
-MEMBER_ACCESS_PROPERTIES_PATTERN = r"\.\b[A-Z][a-zA-Z0-9]*\b(?!\()"
+# Pattern to extract records. The parameter list must also match (?:\w+\s+\w+\,?\s*)+,
+# which the classifier checks separately since that nested quantifier backtracks exponentially
+RECORDS_PATTERN = r"record \b[A-Z][a-zA-Z]*\b\(([\w\s,]*)\)"
 
-# Pattern to extract records
-RECORDS_PATTERN = r"record \b[A-Z][a-zA-Z]*\b\((?:\w+\s+\w+\,?\s*)+\)"
+# Patterns to split record parameter lists into words and the separators after them
+RECORD_PARAMETER_PARTS_PATTERN = r"(\w+)([\s,]*)"
+RECORD_PARAMETER_SEPARATOR_PATTERN = r",?\s*"
 
 # Pattern to extract properties from records
 RECORD_PROPERTIES_PATTERN = r"\b\w+\s+(\w+)"
@@ -43,12 +36,6 @@ RECORD_PROPERTIES_PATTERN = r"\b\w+\s+(\w+)"
 # Pattern to extract numbers
 NUMBERS_PATTERN = r"\d+"
 
-# Pattern to extract string literals
-STRINGS_PATTERN = r'(\$"[^"]*?"|"[^"]*?")'
-
-# Pattern to extract comments
-COMMENTS_PATTERN = r"//.*?(?=\n|$)"
-
 # Pattern to extract class properties - handles generic types and various modifiers
 CLASS_PROPERTY_PATTERN = r"public\s+(?:[A-Za-z0-9_<>?,\s]+\s+)(\w+)\s*\{\s*get;\s*set;\s*\}"
 
@@ -58,8 +45,15 @@ AUTO_PROPERTY_GET_PATTERN = r"(?i)\b\w+\s+[A-Z]\w*\s*\{\s*get;"
 # Pattern to extract region names
 REGION_NAME_PATTERN = r"#region\s+(.+)$"
 
-# Pattern to extract interpolated string expressions
-INTERPOLATED_STRING_EXPRESSIONS_PATTERN = r'\{[^}]*\}'
+# Whole-word shapes checked for every word by the single-scan classifier
+# Class names (not following a dot, and not followed by parentheses)
+CLASS_NAME_SHAPE_PATTERN = r"[A-Z][a-zA-Z]*"
+
+# Interface names (not following a dot, and not followed by parentheses)
+INTERFACE_NAME_SHAPE_PATTERN = r"I[A-Z][a-z][a-zA-Z]*"
+
+# Variable names (not following a dot, and not followed by parentheses or <)
+VARIABLE_NAME_SHAPE_PATTERN = r"[a-z][a-zA-Z0-9]*"
 
-# Pattern to extract C# multiline string literals (verbatim strings with @"" or raw string literals with """)
-MULTILINE_STRING_PATTERN = r'(@"[\s\S]*?")|("""[\s\S]*?""")'
+# Properties from member access (following a dot, and not followed by parentheses)
+MEMBER_ACCESS_PROPERTY_SHAPE_PATTERN = r"[A-Z][a-zA-Z0-9]*"
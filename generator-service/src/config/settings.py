@@ -2,8 +2,11 @@ import os
 import sys
 
 from dotenv import load_dotenv
+from PIL import features
 
+from config.constants import IMAGE_FORMAT_AVIF, IMAGE_FORMATS, RENDER_BACKENDS, RENDERER_OUTPUTS
 from config.syntax_presets import SyntaxPresets
+from models.classifier_options import ClassifierOptions
 
 
 class Settings:
@@ -57,10 +60,58 @@ class Settings:
         self.server_port = int(os.getenv("SERVER_PORT", "55003"))
         self.linkedin_posts_path = os.getenv("LINKEDIN_POSTS_PATH")
         self.renderer_service_url = os.getenv("RENDERER_SERVICE_URL", 'http://localhost:3000')
+        self.renderer_pool_size = int(os.getenv("RENDERER_POOL_SIZE", "4"))
+        self.renderer_retries = int(os.getenv("RENDERER_RETRIES", "3"))
+        self.renderer_backoff = float(os.getenv("RENDERER_BACKOFF", "0.5"))
+        self.renderer_busy_retries = int(os.getenv("RENDERER_BUSY_RETRIES", "10"))
+        self.renderer_output = os.getenv("RENDERER_OUTPUT", "image").lower()
+        if self.renderer_output not in RENDERER_OUTPUTS:
+            raise ValueError(
+                f"Unknown RENDERER_OUTPUT: {self.renderer_output}. Use one of: {', '.join(RENDERER_OUTPUTS)}"
+            )
+        self.renderer_fragments = os.getenv("RENDERER_FRAGMENTS", "True").lower() == "true"
+        self.renderer_sheets = os.getenv("RENDERER_SHEETS", "True").lower() == "true"
+        self.render_cache_path = os.getenv("RENDER_CACHE_PATH")
+        self.render_cache_max_bytes = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+        self.image_trim = os.getenv("IMAGE_TRIM", "False").lower() == "true"
+        self.image_palette_colors = int(os.getenv("IMAGE_PALETTE_COLORS", "0"))
+        self.image_optimize = os.getenv("IMAGE_OPTIMIZE", "False").lower() == "true"
+        self.image_formats = [
+            image_format.strip() for image_format in os.getenv("IMAGE_FORMATS", "").lower().split(",")
+            if image_format.strip()
+        ]
+        unknown_formats = sorted(set(self.image_formats) - set(IMAGE_FORMATS))
+        if unknown_formats:
+            raise ValueError(
+                f"Unknown IMAGE_FORMATS: {', '.join(unknown_formats)}. Use any of: {', '.join(IMAGE_FORMATS)}"
+            )
+        # Pillow only encodes AVIF from 11.2 on, and only when it was built with libavif
+        if IMAGE_FORMAT_AVIF in self.image_formats and not (
+                IMAGE_FORMAT_AVIF in features.modules and features.check_module(IMAGE_FORMAT_AVIF)
+        ):
+            raise ValueError(
+                "IMAGE_FORMATS holds avif, but the installed Pillow cannot encode AVIF. "
+                "Install Pillow 11.2 or newer with libavif, or remove avif from IMAGE_FORMATS"
+            )
+        self.image_avif_quality = int(os.getenv("IMAGE_AVIF_QUALITY", "80"))
+        self.renderer_concurrency = int(os.getenv("RENDERER_CONCURRENCY", "4"))
+        self.renderer_batch_size = int(os.getenv("RENDERER_BATCH_SIZE", "8"))
         self.blog_mode = os.getenv("BLOG_MODE", "False").lower() == "true"
+        self.classification_cache_persist = os.getenv("CLASSIFICATION_CACHE_PERSIST", "False").lower() == "true"
+        self.render_backend = os.getenv("RENDER_BACKEND", "browser").lower()
+        if self.render_backend not in RENDER_BACKENDS:
+            raise ValueError(
+                f"Unknown RENDER_BACKEND: {self.render_backend}. Use one of: {', '.join(RENDER_BACKENDS)}"
+            )
         syntax_preset_value = os.getenv("SYNTAX_PRESET")
         self.syntax_preset = SyntaxPresets[syntax_preset_value]
 
+        # Frozen snapshot of the settings used by the classification pipeline
+        self.classifier_options = ClassifierOptions(
+            blog_mode=self.blog_mode,
+            syntax_preset=self.syntax_preset,
+        )
+
         # In Docker, use the container service name for renderer
         if os.environ.get('DOCKER_ENV') == 'true':
             self.renderer_service_url = 'http://renderer-service:3000'
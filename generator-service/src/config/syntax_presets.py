@@ -1,4 +1,5 @@
 from enum import Enum
+from functools import lru_cache
 
 from config.constants import TOKEN_CLASS_NAME, TOKEN_INTERFACE, TOKEN_METHOD, TOKEN_PROPERTY, TOKEN_VARIABLE, \
     TOKEN_KEYWORD, TOKEN_NUMBER, TOKEN_COMMENT, TOKEN_STRING, TOKEN_BLANK, BACKGROUND_COLOR
@@ -37,9 +38,11 @@ class SyntaxPresets(Enum):
         return preset_map.get(preset_name, default_preset_colors)
 
     @classmethod
+    @lru_cache(maxsize=None)
     def generate_css(cls, preset_name):
         """
         Generates CSS for syntax highlighting based on the given preset.
+        The CSS is generated once per preset.
         
         Args:
             preset_name: The name of the preset to generate CSS for
@@ -0,0 +1,252 @@
+import hashlib
+import os
+import sqlite3
+from array import array
+from collections import OrderedDict
+
+from config.constants import (
+    CLASSIFIER_VERSION, CLASSIFICATION_CACHE_MAX_BYTES, CLASSIFICATION_CACHE_DISK_MAX_BYTES, CLASSIFICATION_CACHE_FILENAME
+)
+from config.settings import Settings
+from core.code_classifier import classify_code
+from models.classifier_options import ClassifierOptions
+from models.token_spans import TokenSpans
+
+
+class ClassificationCache:
+    """
+    A content-addressed cache of classified token spans.
+
+    Snippets are keyed by the hash of their text together with the settings that
+    affect classification, so unchanged snippets skip lexing and classification.
+    Entries are kept in an in-memory LRU bounded by the size of the cached spans,
+    and optionally persisted to an SQLite store under the output path, which is
+    bounded as well and drops its oldest entries first. Spans the classifier only
+    partly classified within its time budget are not cached.
+    Implements the Singleton pattern so the cache is shared across a run.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        settings = Settings.load()
+        if settings.classification_cache_persist and not settings.output_path:
+            # Not kept as the singleton, so every load() reports the error
+            ClassificationCache._instance = None
+            raise ValueError("CLASSIFICATION_CACHE_PERSIST needs OUTPUT_PATH, the directory of the SQLite store")
+
+        self._initialized = True
+        self.max_bytes = CLASSIFICATION_CACHE_MAX_BYTES
+        self.disk_max_bytes = CLASSIFICATION_CACHE_DISK_MAX_BYTES
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, TokenSpans] = OrderedDict()
+        self._size = 0
+        self._connection = None
+        self._disk_size = 0
+
+        if settings.classification_cache_persist:
+            os.makedirs(settings.output_path, exist_ok=True)
+            self._connection = sqlite3.connect(os.path.join(settings.output_path, CLASSIFICATION_CACHE_FILENAME))
+            with self._connection:
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS token_spans (key TEXT PRIMARY KEY, spans BLOB NOT NULL)"
+                )
+            self._disk_size = self._connection.execute(
+                "SELECT COALESCE(SUM(LENGTH(spans)), 0) FROM token_spans"
+            ).fetchone()[0]
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Closes and deletes the singleton instance. The next call to load() will create a fresh instance.
+        """
+        if cls._instance is not None and cls._instance._connection is not None:
+            cls._instance._connection.close()
+        cls._instance = None
+
+    @classmethod
+    def load(cls) -> "ClassificationCache":
+        """
+        Loads the classification cache.
+        Returns the same instance on subsequent calls.
+
+        Returns:
+            ClassificationCache: The singleton cache instance
+        """
+        return cls()
+
+    @staticmethod
+    def get_key(code: str, blog_mode: bool) -> str:
+        """
+        Computes the cache key of a snippet.
+
+        Args:
+            code (str): The C# code
+            blog_mode (bool): Whether the code is classified for blog mode
+
+        Returns:
+            str: Hex digest of the code, the blog mode and the classifier version
+        """
+        digest = hashlib.sha256(f"{CLASSIFIER_VERSION}:{int(blog_mode)}:".encode("utf-8"))
+        digest.update(code.encode("utf-8"))
+        return digest.hexdigest()
+
+    def classify(self, code: str, options: ClassifierOptions) -> TokenSpans:
+        """
+        Returns the classified token spans of the code, classifying it only on a cache miss.
+
+        Args:
+            code (str): The C# code to classify
+            options (ClassifierOptions): The classification options
+
+        Returns:
+            TokenSpans: The (start, end, kind) spans covering the whole code
+        """
+        key = self.get_key(code, options.blog_mode)
+
+        token_spans = self._entries.get(key)
+        if token_spans is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return token_spans
+
+        token_spans = self._load_from_disk(key)
+        if token_spans is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            token_spans = classify_code(code, options)
+            if token_spans.is_partial:
+                return token_spans
+            self._save_to_disk(key, token_spans)
+
+        self._add(key, token_spans)
+        return token_spans
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters.
+
+        Returns:
+            dict: Hits, disk hits, misses, number of entries and their size in bytes,
+                and the size of the spans in the on-disk store
+        """
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "disk_bytes": self._disk_size,
+        }
+
+    def summary(self) -> str:
+        """
+        Returns a one-line, human readable summary of the cache counters.
+
+        Returns:
+            str: The summary of hits, disk hits and misses
+        """
+        return f"Classification cache: {self.hits} hits, {self.disk_hits} disk hits, {self.misses} misses"
+
+    def clear(self) -> None:
+        """
+        Removes all entries from the in-memory and on-disk stores and resets the counters.
+        """
+        self._entries.clear()
+        self._size = 0
+        self.hits = self.disk_hits = self.misses = 0
+        self._disk_size = 0
+        if self._connection is not None:
+            with self._connection:
+                self._connection.execute("DELETE FROM token_spans")
+
+    def _add(self, key: str, token_spans: TokenSpans) -> None:
+        """
+        Adds an entry to the in-memory LRU, evicting the least recently used entries
+        while the cache is over its size limit.
+
+        Args:
+            key (str): The cache key
+            token_spans (TokenSpans): The token spans to cache
+        """
+        self._entries[key] = token_spans
+        self._size += self._sizeof(token_spans)
+
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= self._sizeof(evicted)
+
+    @staticmethod
+    def _sizeof(token_spans: TokenSpans) -> int:
+        """
+        Returns the size of the cached spans in bytes.
+        """
+        return token_spans.spans.itemsize * len(token_spans.spans)
+
+    def _load_from_disk(self, key: str) -> TokenSpans | None:
+        """
+        Looks up an entry in the on-disk store, if persistence is enabled.
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            TokenSpans | None: The stored token spans, or None if not found
+        """
+        if self._connection is None:
+            return None
+
+        row = self._connection.execute("SELECT spans FROM token_spans WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        spans = array("I")
+        spans.frombytes(row[0])
+        return TokenSpans(spans)
+
+    def _save_to_disk(self, key: str, token_spans: TokenSpans) -> None:
+        """
+        Writes an entry to the on-disk store, if persistence is enabled, deleting the oldest
+        entries while the store is over its size limit.
+
+        Args:
+            key (str): The cache key
+            token_spans (TokenSpans): The token spans to store
+        """
+        if self._connection is None:
+            return
+
+        spans = token_spans.spans.tobytes()
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO token_spans (key, spans) VALUES (?, ?)", (key, spans))
+            self._disk_size += len(spans)
+            if self._disk_size > self.disk_max_bytes:
+                self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        """
+        Deletes the oldest entries of the on-disk store until its spans fit in its size limit.
+        Rows are numbered in the order they were written, so the oldest come first.
+        """
+        last_rowid = None
+        rows = self._connection.execute("SELECT rowid, LENGTH(spans) FROM token_spans ORDER BY rowid")
+        for rowid, size in rows:
+            if self._disk_size <= self.disk_max_bytes:
+                break
+            self._disk_size -= size
+            last_rowid = rowid
+        rows.close()
+
+        if last_rowid is not None:
+            self._connection.execute("DELETE FROM token_spans WHERE rowid <= ?", (last_rowid,))
@@ -1,183 +1,403 @@
 import re
+import time
+from array import array
 
 from config.constants import *
 from config.regex_patterns import *
-from config.settings import Settings
-
-
-def get_tokens(code: str) -> set[str]:
+from core.tokenizer import SIGNIFICANT_TOKEN_PATTERN, LEXEME_COMMENT, LEXEME_STRING, LEXEME_WORD
+from models.classifier_options import ClassifierOptions
+from models.token_spans import TokenSpans
+
+# Classification rules in ascending priority. When the same token is matched by
+# several rules anywhere in the code, the rule with the highest priority wins.
+RULE_CLASS_NAME = 0
+RULE_INTERFACE = 1
+RULE_METHOD = 2
+RULE_VARIABLE = 3
+RULE_INITIALIZER_PROPERTY = 4
+RULE_MEMBER_ACCESS_PROPERTY = 5
+RULE_CLASS_PROPERTY = 6
+RULE_DOMAIN = 7
+RULE_GENERIC_METHOD = 8
+RULE_CONSTRUCTOR = 9
+RULE_RECORD_PROPERTY = 10
+RULE_RECORD_NAME = 11
+RULE_NUMBER = 12
+RULE_REGION_NAME = 13
+RULE_KEYWORD = 14
+
+# Token classification of each rule as (regular mode, blog mode)
+RULE_TOKEN_CLASSES = {
+    RULE_CLASS_NAME: (TOKEN_CLASS_NAME, TOKEN_CLASS_NAME),
+    RULE_INTERFACE: (TOKEN_INTERFACE, TOKEN_CLASS_NAME),
+    RULE_METHOD: (TOKEN_METHOD, TOKEN_METHOD),
+    RULE_VARIABLE: (TOKEN_VARIABLE, TOKEN_BLANK),
+    RULE_INITIALIZER_PROPERTY: (TOKEN_PROPERTY, TOKEN_VARIABLE),
+    RULE_MEMBER_ACCESS_PROPERTY: (TOKEN_PROPERTY, TOKEN_VARIABLE),
+    RULE_CLASS_PROPERTY: (TOKEN_PROPERTY, TOKEN_VARIABLE),
+    RULE_DOMAIN: (TOKEN_CLASS_NAME, TOKEN_CLASS_NAME),
+    RULE_GENERIC_METHOD: (TOKEN_METHOD, TOKEN_METHOD),
+    RULE_CONSTRUCTOR: (TOKEN_CLASS_NAME, TOKEN_CLASS_NAME),
+    RULE_RECORD_PROPERTY: (TOKEN_BLANK, TOKEN_BLANK),
+    RULE_RECORD_NAME: (TOKEN_CLASS_NAME, TOKEN_CLASS_NAME),
+    RULE_NUMBER: (TOKEN_NUMBER, TOKEN_NUMBER),
+    RULE_REGION_NAME: (TOKEN_COMMENT, TOKEN_COMMENT),
+    RULE_KEYWORD: (TOKEN_KEYWORD, TOKEN_KEYWORD),
+}
+
+# Token kind of each rule, indexed by rule, for regular and blog mode
+_RULE_KINDS = {
+    blog_mode: tuple(TOKEN_KINDS[RULE_TOKEN_CLASSES[rule][blog_mode]] for rule in sorted(RULE_TOKEN_CLASSES))
+    for blog_mode in (False, True)
+}
+
+# Token kinds of the lexemes the lexer classifies by itself
+_LEXEME_KINDS = {
+    LEXEME_COMMENT: TOKEN_KINDS[TOKEN_COMMENT],
+    LEXEME_STRING: TOKEN_KINDS[TOKEN_STRING],
+}
+
+# Word shapes used by the per-word rules, matched against whole words
+_NUMBER_SHAPE = re.compile(NUMBERS_PATTERN)
+_MEMBER_ACCESS_SHAPE = re.compile(MEMBER_ACCESS_PROPERTY_SHAPE_PATTERN)
+_INTERFACE_SHAPE = re.compile(INTERFACE_NAME_SHAPE_PATTERN)
+_CLASS_NAME_SHAPE = re.compile(CLASS_NAME_SHAPE_PATTERN)
+_VARIABLE_SHAPE = re.compile(VARIABLE_NAME_SHAPE_PATTERN)
+
+# Characters that split code into the token set keywords are looked up in
+_KEYWORD_BOUNDARIES = frozenset(d for d in DELIMITERS if len(d) == 1)
+_KEYWORDS = frozenset(kw for kw in C_SHARP_KEYWORDS if kw.isidentifier())
+
+# Keywords that may start an import, constructor, object initializer or record
+_TRIGGER_KEYWORDS = ("namespace", "record", "using", "new")
+
+# The classifier scans the words of the code once; multi-token constructs are
+# only matched at the words they can start at
+CLASSIFICATION_PATTERN = re.compile(r"\w+")
+
+_IMPORTS_AND_NAMESPACES_RE = re.compile(IMPORTS_AND_NAMESPACES_PATTERN)
+_GENERIC_METHODS_RE = re.compile(GENERIC_METHODS_PATTERN)
+_GENERIC_METHOD_END_RE = re.compile(GENERIC_METHOD_END_PATTERN)
+_CONSTRUCTORS_RE = re.compile(CONSTRUCTORS_PATTERN)
+_OBJECT_INITIALIZERS_RE = re.compile(OBJECT_INITIALIZERS_PATTERN)
+_OBJECT_INITIALIZER_PROPERTIES_RE = re.compile(OBJECT_INITIALIZER_PROPERTIES_PATTERN)
+_RECORDS_RE = re.compile(RECORDS_PATTERN)
+_RECORD_PROPERTIES_RE = re.compile(RECORD_PROPERTIES_PATTERN)
+_RECORD_PARAMETER_PARTS_RE = re.compile(RECORD_PARAMETER_PARTS_PATTERN)
+_RECORD_PARAMETER_SEPARATOR_RE = re.compile(RECORD_PARAMETER_SEPARATOR_PATTERN)
+_AUTO_PROPERTY_GET_RE = re.compile(AUTO_PROPERTY_GET_PATTERN)
+_REGION_NAME_RE = re.compile(REGION_NAME_PATTERN)
+_WHITESPACE_RE = re.compile(r"\s*")
+
+# Number of words scanned between checks of the time budget
+_TIME_BUDGET_CHECK_INTERVAL = 1024
+
+
+def _is_keyword_boundary(code: str, index: int, step: int) -> bool:
     """
-    Extracts tokens from a code string by replacing delimiters with spaces
-    and splitting the resulting string.
+    Checks whether the character at index separates tokens the way the delimiter split does.
 
     Args:
-        code (str): The source code string to tokenize
+        code (str): The C# code
+        index (int): Index of the character next to the word
+        step (int): -1 when looking left of the word, 1 when looking right
 
     Returns:
-        set[str]: A set of unique tokens extracted from the code
+        bool: True if the word ends at this side when splitting the code at delimiters
     """
-    for delimiter in DELIMITERS:
-        code = code.replace(delimiter, " ")
+    if index < 0 or index >= len(code):
+        return True
 
-    tokens = set(code.split())
-    return tokens
+    char = code[index]
+    if char.isspace() or char in _KEYWORD_BOUNDARIES:
+        return True
 
+    if char not in "&|":
+        return False
 
-# noinspection DuplicatedCode
-def parse_code(code: str) -> dict[str, str]:
-    """
-    Parses C# code and classifies tokens for syntax highlighting.
+    # && and || are only delimiters as a pair, paired from the left of a run of the character
+    run_end = index
+    while 0 <= run_end + step < len(code) and code[run_end + step] == char:
+        run_end += step
+    run_length = abs(run_end - index) + 1
+    return run_length % 2 == 0 if step < 0 else run_length > 1
 
-    Identifies C# language elements like keywords, classes, methods, and properties
-    using regex patterns to match different code constructs.
+
+def _is_record_parameter_list(parameters: str) -> bool:
+    r"""
+    Checks whether record parameters match `(?:\w+\s+\w+\,?\s*)+` in linear time.
+
+    The list is walked word by word, tracking whether the current parameter still
+    needs the whitespace between its type and name, or is complete. Like the pattern,
+    a word may also be split into the end of one parameter and the start of the next.
 
     Args:
-        code (str): The C# code to parse
+        parameters (str): The text between the parentheses of a record
 
     Returns:
-        dict[str, str]: Mapping of tokens to classification types (keyword,
-        class-name, method, variable, number, string, comment)
+        bool: True if the pattern matches the whole parameter list
     """
-    blog_mode = Settings().load().blog_mode
-    tokens = set(get_tokens(code))
-
-    keywords = [kw for kw in C_SHARP_KEYWORDS if kw in tokens]
-
-    imports_and_namespaces = set(re.findall(IMPORTS_AND_NAMESPACES_PATTERN, code))
-
-    domains = set()
-    for domain in imports_and_namespaces:
-        if "." in domain:
-            split_domains = domain.split(".")
-            for d in split_domains:
-                domains.add(d)
+    if not parameters or not (parameters[0].isalnum() or parameters[0] == "_"):
+        return False
+
+    parts = _RECORD_PARAMETER_PARTS_RE.findall(parameters)
+    needs_separator, is_complete = True, False
+    for index, (word, separator) in enumerate(parts):
+        if not _RECORD_PARAMETER_SEPARATOR_RE.fullmatch(separator):
+            return False
+        if index == len(parts) - 1:
+            return is_complete
+
+        if separator.startswith(","):
+            needs_separator, is_complete = is_complete, False
         else:
-            domains.add(domain)
-
-    classes = set(re.findall(CLASS_NAMES_PATTERN, code))
-    
-    interfaces = set(re.findall(INTERFACE_NAMES_PATTERN, code))
+            needs_separator, is_complete = is_complete, needs_separator or (is_complete and len(word) > 1)
+        if not (needs_separator or is_complete):
+            return False
 
-    methods = set(re.findall(METHODS_PATTERN, code))
-    methods = set([method.split("(")[0] for method in methods])
-    
-    variables = set(re.findall(VARIABLE_NAMES_PATTERN, code))
+    return False
 
-    generic_methods = set(re.findall(GENERIC_METHODS_PATTERN, code))
 
-    constructors = set(re.findall(CONSTRUCTORS_PATTERN, code))
-
-    object_initializers = set(re.findall(OBJECT_INITIALIZERS_PATTERN, code))
-    properties_set = set()
-    for initializer in object_initializers:
-        # Find all matches for properties using the regex and add them to the set
-        properties = re.findall(OBJECT_INITIALIZER_PROPERTIES_PATTERN, initializer)
-        properties_set.update(properties)
-    variable_properties = [
-        prop[1:] for prop in set(re.findall(MEMBER_ACCESS_PROPERTIES_PATTERN, code))
-    ]
-    # class_properties = set(re.findall(CLASS_PROPERTY_PATTERN, code))  # TODO: Fix this
-    class_properties = set(re.findall(AUTO_PROPERTY_GET_PATTERN, code))
-    class_properties = [prop.split(" ")[1] for prop in class_properties]
-
-    records = set(re.findall(RECORDS_PATTERN, code))
-    record_properties_set = set()
-    record_names_set = set()
-    for record in records:
-        # Find all property names using the regex
-        record_name = record.split("(")[0].split()[1]
-        record_names_set.add(record_name)
-
-        properties = re.findall(RECORD_PROPERTIES_PATTERN, record.split("(")[1][0:-1])
-        record_properties_set.update(properties)
-
-    numbers = set(re.findall(NUMBERS_PATTERN, code))
-
-    strings = set(re.findall(STRINGS_PATTERN, code))
-
-    interpolated_strings = set(re.findall(INTERPOLATED_STRING_EXPRESSIONS_PATTERN, code))  # TODO: Fix this
-
-    multiline_strings = set(re.findall(MULTILINE_STRING_PATTERN, code))
-
-    comments = set(re.findall(COMMENTS_PATTERN, code))
-
-    region_names = set(re.findall(REGION_NAME_PATTERN, code))  # TODO: Fix this
-
-    token_classifications = {}
+def _word_rule(code: str, start: int, end: int) -> int | None:
+    """
+    Evaluates the per-word rules for one occurrence of a word, highest priority first.
 
-    # Classes (highest priority)
-    for cls in classes:
-        token_classifications[cls] = TOKEN_CLASS_NAME
+    Args:
+        code (str): The C# code
+        start (int): Start index of the word
+        end (int): End index of the word
 
-    # Interfaces
-    for interface in interfaces:
-        token_classifications[interface] = TOKEN_INTERFACE if not blog_mode else TOKEN_CLASS_NAME
+    Returns:
+        int | None: The RULE_* constant of the first matching rule, or None
+    """
+    word = code[start:end]
+    previous_char = code[start - 1] if start else ""
+    next_char = code[end] if end < len(code) else ""
+
+    if word in _KEYWORDS and _is_keyword_boundary(code, start - 1, -1) and _is_keyword_boundary(code, end, 1):
+        return RULE_KEYWORD
+    if _NUMBER_SHAPE.fullmatch(word):
+        return RULE_NUMBER
+    if previous_char == "." and next_char != "(" and _MEMBER_ACCESS_SHAPE.fullmatch(word):
+        return RULE_MEMBER_ACCESS_PROPERTY
+    if next_char == "(":
+        return RULE_METHOD
+    if previous_char == ".":
+        return None
+    if _INTERFACE_SHAPE.fullmatch(word):
+        return RULE_INTERFACE
+    if _CLASS_NAME_SHAPE.fullmatch(word):
+        return RULE_CLASS_NAME
+    if next_char != "<" and _VARIABLE_SHAPE.fullmatch(word):
+        return RULE_VARIABLE
+    return None
+
+
+def classify_tokens(code: str, time_budget: float = CLASSIFICATION_TIME_BUDGET) -> dict[str, int]:
+    """
+    Scans C# code once and assigns every word-like token its highest-priority rule.
 
-    # Methods
-    for method in methods:
-        token_classifications[method] = TOKEN_METHOD
+    Args:
+        code (str): The C# code to classify
+        time_budget (float, optional): Seconds that may be spent on multi-token rules.
+            Defaults to CLASSIFICATION_TIME_BUDGET.
 
-    # Variables
-    for variable in variables:
-        token_classifications[variable] = TOKEN_VARIABLE if not blog_mode else TOKEN_BLANK
+    Returns:
+        dict[str, int]: Mapping of tokens to the RULE_* constant that classifies them
+    """
+    return _classify_tokens(code, time_budget)[0]
 
-    # Object initializer properties
-    for prop in properties_set:
-        token_classifications[prop] = TOKEN_PROPERTY if not blog_mode else TOKEN_VARIABLE
 
-    # Variable properties
-    for prop in variable_properties:
-        token_classifications[prop] = TOKEN_PROPERTY if not blog_mode else TOKEN_VARIABLE
+def _classify_tokens(code: str, time_budget: float) -> tuple[dict[str, int], bool]:
+    """
+    Scans C# code once and assigns every word-like token its highest-priority rule.
 
-    # Class properties
-    for prop in class_properties:
-        token_classifications[prop] = TOKEN_PROPERTY if not blog_mode else TOKEN_VARIABLE
+    Each word is checked against the per-word rules once per distinct context
+    (previous character, word, next character), and multi-token constructs are
+    only matched where one can start, so the cost grows with the size of the code
+    rather than with the number of rules. If matching multi-token constructs takes
+    longer than the time budget, the rest of the code only gets the per-word rules.
 
-    # Domains (from imports and namespaces)
-    for domain in domains:
-        token_classifications[domain] = TOKEN_CLASS_NAME
+    Args:
+        code (str): The C# code to classify
+        time_budget (float): Seconds that may be spent on multi-token rules
 
-    # Generic methods
-    for method in generic_methods:
-        token_classifications[method] = TOKEN_METHOD
+    Returns:
+        tuple[dict[str, int], bool]: Mapping of tokens to the RULE_* constant that classifies
+            them, and whether the time budget ran out before the end of the code
+    """
+    priorities: dict[str, int] = {}
+    word_rules: dict[tuple[str, str, str], int | None] = {}
+
+    def promote(token: str, rule: int) -> None:
+        if priorities.get(token, -1) < rule:
+            priorities[token] = rule
+
+    # The auto-property pattern ignores case, so 'GET;' starts one as well
+    has_auto_properties = "get;" in code.lower()
+    # End offsets of the last multi-token matches, so that they never overlap
+    imports_end = constructor_end = initializer_end = record_end = generic_end = auto_property_end = region_end = 0
+    # The next '>' after a generic's '<' and whether it closes a generic method call
+    generic_close = 0
+    generic_closes_call = False
+    # Region names run to the end of the code, so they can only be on its last line
+    region_line_start = code.rfind("\n", 0, len(code) - code.endswith("\n")) + 1
+
+    deadline = time.perf_counter() + time_budget
+    words_until_deadline_check = _TIME_BUDGET_CHECK_INTERVAL
+    is_over_budget = False
+
+    for match in CLASSIFICATION_PATTERN.finditer(code):
+        start, end = match.span()
+        word = match.group()
+        previous_char = code[start - 1:start]
+        next_char = code[end:end + 1]
+
+        if previous_char in ("&", "|") or next_char in ("&", "|"):
+            rule = _word_rule(code, start, end)
+        else:
+            context = (previous_char, word, next_char)
+            rule = word_rules.get(context, -1)
+            if rule == -1:
+                rule = word_rules[context] = _word_rule(code, start, end)
+
+        if rule is not None and priorities.get(word, -1) < rule:
+            priorities[word] = rule
+
+        if is_over_budget:
+            continue
+        words_until_deadline_check -= 1
+        if not words_until_deadline_check:
+            words_until_deadline_check = _TIME_BUDGET_CHECK_INTERVAL
+            is_over_budget = time.perf_counter() > deadline
+
+        if next_char == "<":
+            # Type arguments run up to the next '>', so only try a match when that '>' ends a call
+            if generic_close != -1 and generic_close < end:
+                generic_close = code.find(">", end)
+                generic_closes_call = generic_close != -1 and bool(_GENERIC_METHOD_END_RE.match(code, generic_close))
+            if generic_closes_call and start >= generic_end:
+                generic = _GENERIC_METHODS_RE.match(code, start)
+                if generic:
+                    promote(generic.group(1), RULE_GENERIC_METHOD)
+                    generic_end = generic.end()
+            continue
+
+        if word == "region" and previous_char == "#" and start - 1 >= region_end:
+            if _WHITESPACE_RE.match(code, end).end() >= region_line_start:
+                region = _REGION_NAME_RE.match(code, start - 1)
+                if region:
+                    promote(region.group(1), RULE_REGION_NAME)
+                    region_end = region.end()
+
+        if not next_char.isspace():
+            continue
+
+        if word.endswith(_TRIGGER_KEYWORDS):
+            # Imports, initializers and records may also start at the end of a longer word
+            keyword = next(kw for kw in _TRIGGER_KEYWORDS if word.endswith(kw))
+            keyword_start = end - len(keyword)
+
+            if keyword in ("using", "namespace"):
+                imports = keyword_start >= imports_end and _IMPORTS_AND_NAMESPACES_RE.match(code, keyword_start)
+                if imports:
+                    for domain in imports.group(1).split("."):
+                        promote(domain, RULE_DOMAIN)
+                    imports_end = imports.end()
+            elif keyword == "new":
+                constructor = keyword_start >= constructor_end and _CONSTRUCTORS_RE.match(code, keyword_start)
+                if constructor:
+                    promote(constructor.group(1), RULE_CONSTRUCTOR)
+                    constructor_end = constructor.end()
+
+                initializer = keyword_start >= initializer_end and _OBJECT_INITIALIZERS_RE.match(code, keyword_start)
+                if initializer:
+                    for prop in _OBJECT_INITIALIZER_PROPERTIES_RE.findall(initializer.group()):
+                        promote(prop, RULE_INITIALIZER_PROPERTY)
+                    initializer_end = initializer.end()
+            else:
+                record = keyword_start >= record_end and _RECORDS_RE.match(code, keyword_start)
+                if record and _is_record_parameter_list(record.group(1)):
+                    record_text = record.group()
+                    promote(record_text.split("(")[0].split()[1], RULE_RECORD_NAME)
+                    for prop in _RECORD_PROPERTIES_RE.findall(record_text.split("(")[1][0:-1]):
+                        promote(prop, RULE_RECORD_PROPERTY)
+                    record_end = record.end()
+
+        if has_auto_properties and start >= auto_property_end:
+            auto_property = _AUTO_PROPERTY_GET_RE.match(code, start)
+            if auto_property:
+                parts = auto_property.group().split(" ")
+                if len(parts) > 1:
+                    promote(parts[1], RULE_CLASS_PROPERTY)
+                auto_property_end = auto_property.end()
+
+    return priorities, is_over_budget
+
+
+def parse_code(code: str, options: ClassifierOptions) -> dict[str, str]:
+    """
+    Parses C# code and classifies tokens for syntax highlighting.
 
-    # Constructors
-    for con in constructors:
-        token_classifications[con] = TOKEN_CLASS_NAME
+    Identifies C# language elements like keywords, classes, methods, and properties
+    in a single scan over the words of the code, resolving conflicts by rule priority.
+    String literals and comments are classified by the lexer.
 
-    # Record properties
-    for prop in record_properties_set:
-        token_classifications[prop] = TOKEN_BLANK
+    Args:
+        code (str): The C# code to parse
+        options (ClassifierOptions): The classification options
 
-    # Record names
-    for rec in record_names_set:
-        token_classifications[rec] = TOKEN_CLASS_NAME
+    Returns:
+        dict[str, str]: Mapping of tokens to classification types (keyword,
+        class-name, method, variable, number, comment)
+    """
+    return {
+        token: RULE_TOKEN_CLASSES[rule][options.blog_mode]
+        for token, rule in classify_tokens(code, options.time_budget).items()
+    }
 
-    # Numbers
-    for num in numbers:
-        token_classifications[num] = TOKEN_NUMBER
 
-    # Comments
-    for comment in comments:
-        token_classifications[f"{comment}\n"] = TOKEN_COMMENT
+def classify_code(code: str, options: ClassifierOptions) -> TokenSpans:
+    """
+    Classifies C# code into position-based token spans for syntax highlighting.
 
-    # Region names
-    for region in region_names:
-        token_classifications[region] = TOKEN_COMMENT
+    The code is lexed once and every token is resolved to a small-int kind, so
+    renderers can walk the spans in order without re-tokenizing the code or
+    looking tokens up by their text.
 
-    # Keywords
-    for keyword in keywords:
-        token_classifications[keyword] = TOKEN_KEYWORD
+    Args:
+        code (str): The C# code to classify
+        options (ClassifierOptions): The classification options
 
-    # Strings
-    for string in strings:
-        token_classifications[f"{string}"] = TOKEN_STRING
+    Returns:
+        TokenSpans: The (start, end, kind) spans covering the whole code, marked as partial
+            if the time budget ran out and part of the code only got the per-word rules
+    """
+    rule_kinds = _RULE_KINDS[options.blog_mode]
+    priorities, is_partial = _classify_tokens(code, options.time_budget)
+    spans = []
+    # End of the last classified span; the gaps between them are unclassified code
+    classified_end = 0
+
+    for match in SIGNIFICANT_TOKEN_PATTERN.finditer(code):
+        lexeme = match.lastgroup
+        if lexeme == LEXEME_WORD:
+            rule = priorities.get(match.group())
+            if rule is None:
+                continue
+            kind = rule_kinds[rule]
+        else:
+            kind = _LEXEME_KINDS.get(lexeme, KIND_NONE)
+            if kind == KIND_NONE:
+                continue
 
-    for multiline_string in multiline_strings:
-        token_classifications[f"{multiline_string}"] = TOKEN_STRING
+        start, end = match.span()
+        if start > classified_end:
+            spans += (classified_end, start, KIND_NONE)
+        spans += (start, end, kind)
+        classified_end = end
 
-    # Interpolated strings
-    for interpolated_string in interpolated_strings:
-        token_classifications[interpolated_string] = TOKEN_BLANK
+    if classified_end < len(code):
+        spans += (classified_end, len(code), KIND_NONE)
 
-    return token_classifications
+    return TokenSpans(array("I", spans), is_partial)
@@ -1,3 +1,17 @@
+"""
+DEPRECATED: This file is no longer in use and will be removed in a future version.
+The lexer in core.tokenizer emits string literals and comments as whole tokens.
+"""
+
+import warnings
+
+warnings.warn(
+    "The module 'token_combiners' is deprecated and will be removed in a future version.",
+    DeprecationWarning,
+    stacklevel=2
+)
+
+
 def combine_string_tokens(code_tokens):
     """Combine tokens that are part of a string delimited by double quotes or starting with $."""
     combined_tokens = []
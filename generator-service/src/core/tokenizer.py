@@ -1,41 +1,115 @@
-from config.constants import DELIMITERS
+import re
+from functools import lru_cache
+from typing import Iterator
+
+from config.constants import DELIMITERS, TOKEN_COMMENT, TOKEN_STRING
+
+# Lexeme kinds emitted by the lexer
+LEXEME_COMMENT = TOKEN_COMMENT
+LEXEME_STRING = TOKEN_STRING
+LEXEME_CHAR = "char"
+LEXEME_NEWLINE = "newline"
+LEXEME_WHITESPACE = "whitespace"
+LEXEME_OPERATOR = "operator"
+LEXEME_WORD = "word"
+LEXEME_OTHER = "other"
+
+# Line comments keep their terminating newline, block comments may be left unterminated
+_COMMENT_PATTERN = r"//[^\n]*\n?|/\*[\s\S]*?(?:\*/|\Z)"
+
+# Raw ("""..."""), verbatim (@"...") and regular/interpolated ("...", $"...") string literals
+_STRING_PATTERN = (
+    r'\$*(?P<raw_quotes>"{3,})[\s\S]*?(?:(?P=raw_quotes)|\Z)'
+    r'|(?:\$+@|@\$*)"[^"]*(?:""[^"]*)*"?'
+    r'|\$*"[^"\\\n]*(?:\\.[^"\\\n]*)*"?'
+)
+
+_CHAR_PATTERN = r"'[^'\\\n]*(?:\\.[^'\\\n]*)*'?"
+
+
+@lru_cache(maxsize=8)
+def _compile_token_pattern(delimiters: tuple[str, ...], significant_only: bool = False) -> re.Pattern:
+    """
+    Compiles a single master pattern that lexes code in one left-to-right pass.
+
+    Operators are ordered longest first so that multi-character delimiters like
+    `==`, `&&` or `<=` win over their single-character prefixes (maximal munch).
+
+    Args:
+        delimiters (tuple[str, ...]): The delimiters to split the code at
+        significant_only (bool, optional): Whether to only match the comments,
+            strings, chars and words, leaving everything else as unmatched gaps.
+            Defaults to False.
+
+    Returns:
+        re.Pattern: The compiled lexer pattern with one named group per lexeme kind
+    """
+    whitespace = sorted({d for d in delimiters if d.isspace() and d != "\n"})
+    operators = sorted(
+        {d for d in delimiters if not d.isspace() and d not in ('"', "'")},
+        key=lambda d: (-len(d), d),
+    )
+    word_stops = {d[0] for d in delimiters} | {'"', "'", "\n"}
+    word = f"(?P<{LEXEME_WORD}>[^{re.escape(''.join(sorted(word_stops)))}]+)"
+
+    alternatives = [
+        f"(?P<{LEXEME_COMMENT}>{_COMMENT_PATTERN})",
+        f"(?P<{LEXEME_STRING}>{_STRING_PATTERN})",
+        f"(?P<{LEXEME_CHAR}>{_CHAR_PATTERN})",
+    ]
+    if significant_only:
+        return re.compile("|".join(alternatives + [word]))
+
+    alternatives.append(f"(?P<{LEXEME_NEWLINE}>\\n)")
+    if whitespace:
+        alternatives.append(f"(?P<{LEXEME_WHITESPACE}>[{re.escape(''.join(whitespace))}]+)")
+    if operators:
+        alternatives.append(f"(?P<{LEXEME_OPERATOR}>{'|'.join(re.escape(op) for op in operators)})")
+    alternatives.append(word)
+    alternatives.append(f"(?P<{LEXEME_OTHER}>[\\s\\S])")
+
+    return re.compile("|".join(alternatives))
+
+
+TOKEN_PATTERN = _compile_token_pattern(tuple(DELIMITERS))
+
+# Matches the same comments, strings, chars and words as TOKEN_PATTERN, but skips
+# whitespace and operators, which never carry a classification
+SIGNIFICANT_TOKEN_PATTERN = _compile_token_pattern(tuple(DELIMITERS), significant_only=True)
+
+
+def iter_tokens(code: str, delimiters: list[str] | None = None) -> Iterator[tuple[str, str]]:
+    """
+    Lexes a code string in a single linear pass, yielding each token with its kind.
+
+    String literals and comments are emitted as whole tokens, so no extra
+    combining passes are needed afterwards.
+
+    Args:
+        code (str): The source code string to lex.
+        delimiters (list, optional): A list of delimiters to split the code at.
+            If None, uses the default DELIMITERS from config.
+
+    Yields:
+        tuple[str, str]: The lexeme kind (one of the LEXEME_* constants) and the token text.
+    """
+    pattern = TOKEN_PATTERN if delimiters is None else _compile_token_pattern(tuple(delimiters))
+
+    for match in pattern.finditer(code):
+        yield match.lastgroup, match.group()
 
 
 def tokenize(code: str, delimiters: list[str] | None = None) -> list[str]:
     """
     Tokenizes a code string by splitting it at specified delimiters.
-    
+
     Args:
         code (str): The source code string to tokenize.
-        delimiters (list, optional): A list of delimiter characters to use for tokenization.
+        delimiters (list, optional): A list of delimiters to use for tokenization.
             If None, uses the default DELIMITERS from config.
-    
+
     Returns:
         list[str]: A list of tokens extracted from the code.
     """
-    if delimiters is None:
-        delimiters = DELIMITERS
-    tokens = []
-    current_token = ""
-    length = len(code)
-
-    for i in range(length):
-        char = code[i]
-
-        # Check if the current character is a delimiter
-        if char in delimiters:
-            # If there's a current token, add it to the tokens list
-            if current_token:
-                tokens.append(current_token)
-                current_token = ""
-            # Add the delimiter itself as a token
-            tokens.append(char)
-        else:
-            # Build the current token
-            current_token += char
-
-    # Add any remaining token
-    if current_token:
-        tokens.append(current_token)
-
-    return tokens
+    pattern = TOKEN_PATTERN if delimiters is None else _compile_token_pattern(tuple(delimiters))
+    return [match.group() for match in pattern.finditer(code)]
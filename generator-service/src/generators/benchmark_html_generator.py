@@ -1,6 +1,10 @@
+import html
 import os
 
+from config.constants import *
 from models.benchmark_table import BenchmarkTable
+from rendering.snippet_metrics import SnippetMetrics
+from utils.template_cache import TemplateCache
 
 
 class BenchmarkHtmlGenerator:
@@ -46,7 +50,81 @@ class BenchmarkHtmlGenerator:
         current_dir = os.getcwd()
         template_path = os.path.join(current_dir, "resources/benchmark_template.html").replace("\\", "/")
 
-        with open(template_path, "r", encoding="utf-8") as file:
-            html_code = file.read()
+        return TemplateCache.render(template_path, TABLE_CODE=table_html)
 
-        return html_code.replace("{{TABLE_CODE}}", table_html)
+    @staticmethod
+    def generate_benchmark_svg(table: BenchmarkTable) -> str:
+        """
+        Generates a self-contained SVG image of a benchmark table.
+
+        The image has the look of resources/benchmark_template.html, with column widths
+        computed from the advance of the monospaced font, so it needs no browser.
+
+        Args:
+            table (BenchmarkTable): The benchmark table model to convert to SVG
+
+        Returns:
+            str: The SVG document
+        """
+        font_size = BENCHMARK_FONT_SIZE
+        char_width = SNIPPET_FONT_ADVANCE * font_size
+        ascent, descent = SNIPPET_FONT_ASCENT * font_size, SNIPPET_FONT_DESCENT * font_size
+        baseline_offset = (BENCHMARK_LINE_HEIGHT - ascent - descent) / 2 + ascent
+        padding_y, padding_x = BENCHMARK_CELL_PADDING
+        border = BENCHMARK_BORDER_WIDTH
+
+        rows = [row.sorted_cells(table.headers) for row in table.rows]
+        edges = SnippetMetrics.get_benchmark_column_edges(table)
+        row_height = SnippetMetrics.get_benchmark_row_height()
+        width, height = SnippetMetrics.get_benchmark_table_size(table)
+        svg = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" height="{height:g}" '
+            f'viewBox="0 0 {width:g} {height:g}" font-family="{SNIPPET_FONT_FAMILY}" font-size="{font_size}">',
+            f'<rect width="100%" height="100%" fill="#{BENCHMARK_BORDER_COLOR}"/>',
+        ]
+
+        def append_cell(row_index: int, column_index: int, text: str, background: str, color: str,
+                        anchor: str, bold: bool = False, underlined: bool = False) -> None:
+            top = row_index * row_height + border
+            left = edges[column_index] + border
+            cell_width = edges[column_index + 1] - left
+            svg.append(
+                f'<rect x="{left:.2f}" y="{top:g}" width="{cell_width:.2f}" '
+                f'height="{row_height - border:g}" fill="#{background}"/>'
+            )
+
+            # Text is anchored like it is aligned in the template, so it stays in place with fallback fonts
+            content_width = cell_width - 2 * padding_x
+            anchor_x = left + padding_x + {"start": 0, "middle": content_width / 2, "end": content_width}[anchor]
+            text_width = len(text) * char_width
+            text_left = anchor_x - {"start": 0, "middle": text_width / 2, "end": text_width}[anchor]
+
+            content_top = top + padding_y
+            weight = ' font-weight="bold"' if bold else ""
+            svg.append(
+                f'<text x="{anchor_x:.2f}" y="{content_top + baseline_offset:.2f}" text-anchor="{anchor}" '
+                f'fill="#{color}"{weight} xml:space="preserve">{html.escape(text, quote=False)}</text>'
+            )
+            if underlined:
+                underline_bottom = content_top + BENCHMARK_LINE_HEIGHT + BENCHMARK_UNDERLINE_OFFSET
+                svg.append(
+                    f'<rect x="{text_left:.2f}" y="{underline_bottom - BENCHMARK_UNDERLINE_HEIGHT:g}" '
+                    f'width="{text_width:.2f}" height="{BENCHMARK_UNDERLINE_HEIGHT:g}" '
+                    f'rx="{BENCHMARK_UNDERLINE_RADIUS:g}" fill="#{BENCHMARK_UNDERLINE_COLOR}"/>'
+                )
+
+        for column_index, header in enumerate(table.headers):
+            append_cell(0, column_index, header, BENCHMARK_HEADER_BACKGROUND_COLOR, BENCHMARK_TEXT_COLOR, "middle",
+                        bold=True)
+
+        for row_index, cells in enumerate(rows, start=1):
+            for column_index, cell in enumerate(cells[:len(table.headers)]):
+                append_cell(
+                    row_index, column_index, cell.value, BENCHMARK_BACKGROUND_COLOR,
+                    BENCHMARK_METHOD_COLOR if cell.is_method else BENCHMARK_TEXT_COLOR,
+                    "start" if cell.is_method else "end",
+                    underlined=cell.is_underlined,
+                )
+
+        svg.append('</svg>')
+        return "".join(svg)
@@ -0,0 +1,74 @@
+import sys
+from typing import Iterable
+
+from blessed import Terminal
+
+from config.constants import TOKEN_COLORS_ANSI, TOKEN_KIND_CLASSES
+
+
+class ConsolePreview:
+    """
+    Prints syntax-highlighted code snippets to the console.
+
+    The preview is built as a single ANSI-colored string from the classified tokens,
+    using one shared Terminal and a color lookup table per token kind.
+    """
+    _terminal: Terminal | None = None
+    _kind_colors: tuple[str, ...] = ()
+
+    @staticmethod
+    def get_kind_colors() -> tuple[str, ...]:
+        """
+        Returns the ANSI color sequence of each token kind, creating the terminal on first use.
+
+        Returns:
+            tuple[str, ...]: The color sequences, indexed by token kind
+        """
+        if ConsolePreview._terminal is None:
+            terminal = Terminal()
+            default_color = TOKEN_COLORS_ANSI["default"]
+            ConsolePreview._kind_colors = tuple(
+                str(terminal.color(TOKEN_COLORS_ANSI.get(token_class or "", default_color)))
+                for token_class in TOKEN_KIND_CLASSES
+            )
+            ConsolePreview._terminal = terminal
+        return ConsolePreview._kind_colors
+
+    @staticmethod
+    def generate_preview(tokens: Iterable[tuple[str, int]]) -> str:
+        """
+        Builds the ANSI-colored preview of a code snippet.
+
+        Args:
+            tokens (Iterable[tuple[str, int]]): The token texts and kinds of the snippet
+
+        Returns:
+            str: The snippet with a color sequence wherever the token color changes
+        """
+        kind_colors = ConsolePreview.get_kind_colors()
+        preview = []
+        current_color = None
+        for token, kind in tokens:
+            color = kind_colors[kind]
+            if color != current_color:
+                preview.append(color)
+                current_color = color
+            preview.append(token)
+
+        preview.append(ConsolePreview._terminal.normal)
+        return "".join(preview)
+
+    @staticmethod
+    def print_preview(tokens: Iterable[tuple[str, int]]) -> None:
+        """
+        Prints the ANSI-colored preview of a code snippet in a single write.
+        Nothing is printed when stdout is not a terminal.
+
+        Args:
+            tokens (Iterable[tuple[str, int]]): The token texts and kinds of the snippet
+        """
+        if not sys.stdout.isatty():
+            return
+
+        sys.stdout.write(ConsolePreview.generate_preview(tokens) + "\n\n\n")
+        sys.stdout.flush()
@@ -1,38 +1,169 @@
+import hashlib
+import html
 import os
+from functools import lru_cache
+from typing import Iterator, TextIO
 
 import pyperclip
-from blessed import Terminal
 
 from api.renderer_service import RendererService
-from config.constants import TOKEN_COLORS_ANSI
+from config.constants import *
 from config.prompts import print_success
-from config.settings import Settings
 from config.syntax_presets import SyntaxPresets
-from core.token_combiners import combine_string_tokens, combine_comment_tokens
-from core.tokenizer import tokenize
+from generators.console_preview import ConsolePreview
+from models.classifier_options import ClassifierOptions
+from models.snippet_fragment import SnippetFragment
+from models.token_spans import TokenSpans
+from rendering.font_subsetter import FontSubsetter
+from rendering.snippet_metrics import SnippetMetrics
+from utils.template_cache import TemplateCache
+
+# Opening span tag of each token kind
+_SPAN_OPENINGS = tuple(
+    "" if token_class is None else f'<span class="{token_class}">'
+    for token_class in TOKEN_KIND_CLASSES
+)
 
 
 class HtmlGenerator:
     @staticmethod
-    def __print_token(token: str, token_classifications: dict[str, str]) -> None:
+    def iter_code_snippet_tokens(code_snippet: str, token_spans: TokenSpans) -> Iterator[tuple[str, int]]:
         """
-        Prints a token to the console with syntax highlighting based on its classification.
+        Yields the rendered tokens of a code snippet in source order.
 
         Args:
-            token (str): The code token to print
-            token_classifications (dict[str, str]): A dictionary mapping tokens to their
-                classification types (e.g., 'keyword', 'class-name', 'method')
+            code_snippet (str): The source code
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+
+        Yields:
+            tuple[str, int]: The token text and its kind, without the leading and
+                trailing line breaks of the snippet
         """
-        terminal = Terminal()
-        color = TOKEN_COLORS_ANSI.get(
-            token_classifications.get(token, ""), TOKEN_COLORS_ANSI["default"]
+        starting_index = 1 if code_snippet.startswith("\n") else 0
+        ending_index = len(code_snippet)
+        if code_snippet.endswith("\n") and token_spans.spans and token_spans.spans[-1] == KIND_NONE:
+            ending_index -= 1
+
+        for start, end, kind in token_spans:
+            token = code_snippet[max(start, starting_index):min(end, ending_index)]
+            if token:
+                yield token, kind
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_token_colors(syntax_preset: SyntaxPresets) -> tuple[str, ...]:
+        """
+        Returns the text color of each token kind for a syntax preset.
+
+        Args:
+            syntax_preset (SyntaxPresets): The syntax highlighting preset
+
+        Returns:
+            tuple[str, ...]: The colors as #rrggbb strings, indexed by token kind
+        """
+        colors = SyntaxPresets.get_color_scheme(syntax_preset)
+        return tuple(
+            f"#{colors.get(token_class) or SNIPPET_TEXT_COLOR}" if token_class else f"#{SNIPPET_TEXT_COLOR}"
+            for token_class in TOKEN_KIND_CLASSES
         )
-        print(terminal.color(color)(token), end="")
+
+    @staticmethod
+    def expand_tabs(text: str, column: int) -> str:
+        """
+        Replaces tabs with spaces up to the next tab stop.
+
+        Args:
+            text (str): The text of a single line
+            column (int): The column the text starts at
+
+        Returns:
+            str: The text with its tabs expanded
+        """
+        parts = text.split("\t")
+        expanded = parts[0]
+        for part in parts[1:]:
+            expanded += " " * (SNIPPET_TAB_SIZE - (column + len(expanded)) % SNIPPET_TAB_SIZE) + part
+        return expanded
+
+    @staticmethod
+    def split_code_snippet_lines(code_snippet: str, token_spans: TokenSpans) -> list[list[tuple[str, int]]]:
+        """
+        Splits the rendered tokens of a code snippet into lines, expanding tabs.
+
+        Args:
+            code_snippet (str): The source code
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+
+        Returns:
+            list[list[tuple[str, int]]]: The (text, kind) runs of each line
+        """
+        lines = [[]]
+        column = 0
+        for token, kind in HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans):
+            for index, text in enumerate(token.split("\n")):
+                if index:
+                    lines.append([])
+                    column = 0
+                text = text.replace("\r", "")
+                if "\t" in text:
+                    text = HtmlGenerator.expand_tabs(text, column)
+                if text:
+                    lines[-1].append((text, kind))
+                    column += len(text)
+
+        # A line break at the very end of a block does not start a new line
+        if not lines[-1] and len(lines) > 1:
+            lines.pop()
+        if lines == [[]]:
+            return []
+        return lines
+
+    @staticmethod
+    def iter_code_snippet_html(code_snippet: str, token_spans: TokenSpans) -> Iterator[str]:
+        """
+        Lazily generates HTML markup for a code snippet with syntax highlighting.
+
+        The markup is yielded in chunks of HTML_CHUNK_TOKENS tokens, so it can be
+        written to a file or socket without building the whole document in memory.
+
+        Args:
+            code_snippet (str): The source code to convert to HTML
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+
+        Yields:
+            str: The next chunk of HTML markup
+        """
+        chunk = []
+        for token, kind in HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans):
+            if kind == KIND_NONE:
+                chunk.append(html.escape(token, quote=False))
+            else:
+                chunk.append(f"{_SPAN_OPENINGS[kind]}{html.escape(token, quote=False)}</span>")
+
+            if len(chunk) == HTML_CHUNK_TOKENS:
+                yield "".join(chunk)
+                chunk.clear()
+
+        if chunk:
+            yield "".join(chunk)
+
+    @staticmethod
+    def write_code_snippet_html(code_snippet: str, token_spans: TokenSpans, file: TextIO) -> None:
+        """
+        Streams HTML markup for a code snippet with syntax highlighting to a file.
+
+        Args:
+            code_snippet (str): The source code to convert to HTML
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            file (TextIO): The file, buffer or socket file object to write the markup to
+        """
+        for chunk in HtmlGenerator.iter_code_snippet_html(code_snippet, token_spans):
+            file.write(chunk)
 
     @staticmethod
     def generate_code_snippet_html(
             code_snippet: str,
-            token_classifications: dict[str, str],
+            token_spans: TokenSpans,
             show_code_snippet: bool = False,
     ) -> str:
         """
@@ -40,93 +171,108 @@ class HtmlGenerator:
         
         Args:
             code_snippet (str): The source code to convert to HTML
-            token_classifications (dict[str, str]): A dictionary mapping tokens to their
-                classification types (e.g., 'keyword', 'class-name', 'method')
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
             show_code_snippet (bool, optional): Whether to print the code snippet to
                 the console with syntax highlighting. Defaults to False.
                 
         Returns:
             str: HTML markup of the code snippet with syntax highlighting spans
         """
-        tokens = token_classifications.keys()
-        code_tokens = tokenize(code_snippet)
-        code_tokens = combine_string_tokens(code_tokens)
-        code_tokens = combine_comment_tokens(code_tokens)
-        code_snippet_html = ""
-
-        starting_index = 0
-        ending_index = None
-        if code_tokens[0] == "\n":
-            starting_index = 1
-        if code_tokens[-1] == "\n":
-            ending_index = -1
-
-        for token in code_tokens[starting_index:ending_index]:
-            if token not in tokens:
-                if token == "<":
-                    code_snippet_html += "&lt;"
-                elif token == ">":
-                    code_snippet_html += "&gt;"
-                else:
-                    code_snippet_html += token
-            else:
-                code_snippet_html += (
-                    f'<span class="{token_classifications[token]}">{token}</span>'
-                )
-            if show_code_snippet:
-                HtmlGenerator.__print_token(token, token_classifications)
-
         if show_code_snippet:
-            print("\n\n")
-        return code_snippet_html
+            ConsolePreview.print_preview(HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans))
+        return "".join(HtmlGenerator.iter_code_snippet_html(code_snippet, token_spans))
 
     @staticmethod
     def generate_code_snippets_image_html(
-            code_snippet: str, token_classifications: dict[str, str]
+            code_snippet: str, token_spans: TokenSpans, options: ClassifierOptions
     ) -> str:
         """
         Generates HTML for a code snippet that will be rendered as an image.
         
         Args:
             code_snippet (str): The source code to convert to HTML
-            token_classifications (dict[str, str]): A dictionary mapping tokens to their
-                classification types (e.g., 'keyword', 'class-name', 'method')
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            options (ClassifierOptions): The options holding the syntax preset to style the code with
                 
         Returns:
             str: Complete HTML document with the syntax-highlighted code snippet
                  embedded in a template suitable for rendering as an image
         """
-        code_snippet_html = HtmlGenerator.generate_code_snippet_html(
-            code_snippet, token_classifications, True
+        ConsolePreview.print_preview(HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans))
+
+        template_path = os.path.join(os.getcwd(), "resources/snippet_template.html").replace("\\", "/")
+
+        # The font is inlined, subset to the characters of the snippet, so the renderer never waits for it
+        return TemplateCache.render(
+            template_path,
+            CODE_SNIPPET=HtmlGenerator.iter_code_snippet_html(code_snippet, token_spans),
+            CSS_CODE=FontSubsetter.load().get_font_face(code_snippet) + SyntaxPresets.generate_css(options.syntax_preset),
         )
 
-        current_dir = os.getcwd()
-        template_path = os.path.join(current_dir, "resources/snippet_template.html").replace("\\", "/")
-        font_path = os.path.join(current_dir, "resources/fonts/Hack-Regular.ttf").replace("\\", "/")
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_code_snippet_preset(syntax_preset: SyntaxPresets) -> tuple[str, str]:
+        """
+        Generates the preset page of a syntax preset, into which the renderer service swaps code fragments.
 
-        with open(template_path, "r", encoding="utf-8") as file:
-            html_code = file.read()
+        The page is the snippet template with the CSS of the preset and an empty code element.
+        The whole Hack font is embedded, as the page renders any code.
 
-        html_code = (html_code
-                     .replace("{{FONT_PATH}}", font_path)
-                     .replace("{{CODE_SNIPPET}}", code_snippet_html)
-                     .replace("{{CSS_CODE}}", SyntaxPresets.generate_css(Settings.load().syntax_preset)))
+        Args:
+            syntax_preset (SyntaxPresets): The syntax highlighting preset
 
-        return html_code
+        Returns:
+            tuple[str, str]: The name of the preset page, which changes with its content, and its HTML
+        """
+        template_path = os.path.join(os.getcwd(), "resources/snippet_template.html").replace("\\", "/")
+        preset_html = TemplateCache.render(
+            template_path,
+            CODE_SNIPPET="",
+            CSS_CODE=FontSubsetter.load().get_font_face() + SyntaxPresets.generate_css(syntax_preset),
+        )
+
+        digest = hashlib.sha256(preset_html.encode("utf-8")).hexdigest()
+        return f"{syntax_preset.name.lower()}-{digest[:16]}", preset_html
+
+    @staticmethod
+    def generate_code_snippet_fragment(
+            code_snippet: str, token_spans: TokenSpans, options: ClassifierOptions
+    ) -> SnippetFragment:
+        """
+        Generates the highlighted fragment of a code snippet that will be rendered as an image
+        in the preset page of its syntax preset.
+
+        Args:
+            code_snippet (str): The source code to convert to HTML
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            options (ClassifierOptions): The options holding the syntax preset to style the code with
+
+        Returns:
+            SnippetFragment: The span markup of the code together with its preset page
+        """
+        ConsolePreview.print_preview(HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans))
+
+        preset, preset_html = HtmlGenerator.get_code_snippet_preset(options.syntax_preset)
+        fragment = "".join(HtmlGenerator.iter_code_snippet_html(code_snippet, token_spans))
+        return SnippetFragment(fragment, preset, preset_html)
 
     @staticmethod
     def render_code_snippet_image(
-            html_code: str,
+            html_code: str | SnippetFragment,
             dest_path: str = "snippets",
-            filename: str = "code_snippet.png"
+            filename: str = "code_snippet.png",
+            viewport: dict | None = None
     ) -> dict:
         """
         Renders a code snippet as an image using the external renderer service.
         
         Args:
-            html_code (str): The html code to render as an image
+            html_code (str | SnippetFragment): The html code to render as an image,
+                or the code fragment to render into its preset page
             dest_path (str, optional): The destination folder path. Defaults to "snippets".
             filename (str, optional): The filename for the image. Defaults to "code_snippet.png".
+            viewport (dict | None, optional): The pre-measured viewport to render the page in.
+                Defaults to None, which uses the renderer's default viewport.
                 
         Returns:
             dict: Response from the renderer service with image path information
@@ -134,23 +280,127 @@ class HtmlGenerator:
         if not filename.lower().endswith('.png'):
             filename = os.path.splitext(filename)[0] + '.png'
 
-        renderer = RendererService()
-        result = renderer.convert_html_to_image(html_code, dest_path, filename)
+        renderer = RendererService.load()
+        result = renderer.convert_html_to_image(html_code, dest_path, filename, viewport)
 
         print_success(f"\n\nImage successfully generated at: {result.get('path')}")
         return result
 
+    @staticmethod
+    def generate_code_snippet_svg(
+            code_snippet: str, token_spans: TokenSpans, options: ClassifierOptions
+    ) -> str:
+        """
+        Generates a self-contained SVG image of a code snippet with syntax highlighting.
+
+        The image has the layout of resources/snippet_template.html, drawn as vector shapes
+        and one text element per code line, with a tspan per run of equally colored tokens.
+        The Hack font is embedded, subset to the characters of the snippet, so the image looks
+        the same where Hack is not installed. It needs neither a browser nor rasterization.
+
+        Args:
+            code_snippet (str): The source code to convert to SVG
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            options (ClassifierOptions): The options holding the syntax preset to color the code with
+
+        Returns:
+            str: The SVG document
+        """
+        font_size = SNIPPET_FONT_SIZE
+        ascent, descent = SNIPPET_FONT_ASCENT * font_size, SNIPPET_FONT_DESCENT * font_size
+        baseline_offset = (SNIPPET_LINE_HEIGHT - ascent - descent) / 2 + ascent
+
+        lines = HtmlGenerator.split_code_snippet_lines(code_snippet, token_spans)
+        width, height = SnippetMetrics.get_code_snippet_size(lines)
+        header_top, _, _, header_left = SNIPPET_HEADER_PADDING
+        _, header_height = SnippetMetrics.get_code_snippet_header_size()
+
+        background = SyntaxPresets.get_color_scheme(options.syntax_preset).get(BACKGROUND_COLOR) or "000000"
+        svg = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:g}" height="{height:g}" '
+            f'viewBox="0 0 {width:g} {height:g}">',
+            f'<style>{FontSubsetter.load().get_font_face(code_snippet)}</style>',
+            f'<rect width="100%" height="100%" fill="#{background}"/>',
+        ]
+
+        radius = SNIPPET_HEADER_CIRCLE_SIZE / 2
+        circle_x = SNIPPET_CONTAINER_PADDING + header_left + radius
+        circle_y = SNIPPET_CONTAINER_PADDING + header_top + radius
+        for circle_color in SNIPPET_HEADER_CIRCLE_COLORS:
+            svg.append(f'<circle cx="{circle_x:g}" cy="{circle_y:g}" r="{radius:g}" fill="#{circle_color}"/>')
+            circle_x += SNIPPET_HEADER_CIRCLE_SIZE + SNIPPET_HEADER_CIRCLE_MARGIN
+
+        svg.append(
+            f'<text font-family="{SNIPPET_FONT_FAMILY}" font-size="{font_size}" '
+            f'letter-spacing="{SNIPPET_LETTER_SPACING:g}" fill="#{SNIPPET_TEXT_COLOR}" '
+            f'xml:space="preserve" style="white-space:pre">'
+        )
+
+        token_colors = HtmlGenerator.get_token_colors(options.syntax_preset)
+        default_color = f"#{SNIPPET_TEXT_COLOR}"
+        code_left = SNIPPET_CONTAINER_PADDING + SNIPPET_CODE_PADDING
+        line_top = SNIPPET_CONTAINER_PADDING + header_height + SNIPPET_CODE_PADDING
+        for line in lines:
+            svg.append(f'<tspan x="{code_left:g}" y="{line_top + baseline_offset:.2f}">')
+
+            # Merge adjacent tokens of the same color into a single run
+            runs = []
+            for text, kind in line:
+                color = token_colors[kind]
+                if runs and runs[-1][1] == color:
+                    runs[-1][0].append(text)
+                else:
+                    runs.append(([text], color))
+
+            for texts, color in runs:
+                text = html.escape("".join(texts), quote=False)
+                svg.append(text if color == default_color else f'<tspan fill="{color}">{text}</tspan>')
+
+            svg.append('</tspan>')
+            line_top += SNIPPET_LINE_HEIGHT
+
+        svg.append('</text>')
+        svg.append('</svg>')
+        return "".join(svg)
+
+    @staticmethod
+    def save_svg_image(
+            svg_code: str,
+            dest_path: str = "snippets",
+            filename: str = "code_snippet.svg"
+    ) -> dict:
+        """
+        Saves an SVG image to disk.
+
+        Args:
+            svg_code (str): The SVG document to save
+            dest_path (str, optional): The destination folder path. Defaults to "snippets".
+            filename (str, optional): The filename for the image. Defaults to "code_snippet.svg".
+
+        Returns:
+            dict: The result with the path of the saved image, like the renderer service's response
+        """
+        if not filename.lower().endswith('.svg'):
+            filename = os.path.splitext(filename)[0] + '.svg'
+
+        os.makedirs(dest_path, exist_ok=True)
+        image_path = os.path.join(dest_path, filename)
+        with open(image_path, "w", encoding="utf-8") as file:
+            file.write(svg_code)
+
+        print_success(f"\n\nImage successfully generated at: {image_path}")
+        return {"message": "Image saved successfully", "path": image_path}
+
     @staticmethod
     def generate_blog_html(
-            code_snippet: str, token_classifications: dict[str, str], title="csharp"
+            code_snippet: str, token_spans: TokenSpans, title="csharp"
     ) -> None:
         """
         Generates HTML for a code snippet suitable for blog posts and copies it to clipboard.
         
         Args:
             code_snippet (str): The source code to convert to HTML
-            token_classifications (dict[str, str]): A dictionary mapping tokens to their
-                classification types (e.g., 'keyword', 'class-name', 'method')
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
             title (str, optional): The title to display in the code header.
                 Defaults to "csharp".
                 
@@ -158,7 +408,7 @@ class HtmlGenerator:
             None: The HTML is copied to the clipboard
         """
         code_snippet_html = HtmlGenerator.generate_code_snippet_html(
-            code_snippet, token_classifications, True
+            code_snippet, token_spans, True
         )
         html_code = f"""
         <div class="code-container">
@@ -171,31 +421,67 @@ class HtmlGenerator:
         pyperclip.copy(html_code)
         print_success("\n\nSuccessfully copied html code to clipboard!")
 
+    @staticmethod
+    def iter_blog_html_file_content(
+            code_snippet: str, token_spans: TokenSpans, title="csharp"
+    ) -> Iterator[str]:
+        """
+        Lazily generates HTML content for a code snippet suitable for blog app.
+
+        Args:
+            code_snippet (str): The source code to convert to HTML
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            title (str, optional): The title to display in the code header.
+                Defaults to "csharp".
+
+        Yields:
+            str: The next chunk of the HTML content
+        """
+        yield f"""<div class="code-container">
+    <div class="code-header">
+    <span class="code-header-title">{title}</span>
+    </div>
+    <pre><code>"""
+        yield from HtmlGenerator.iter_code_snippet_html(code_snippet, token_spans)
+        yield """</code></pre>
+    </div>"""
+
+    @staticmethod
+    def write_blog_html_file_content(
+            code_snippet: str, token_spans: TokenSpans, file: TextIO, title="csharp"
+    ) -> None:
+        """
+        Streams HTML content for a code snippet suitable for blog app to a file.
+
+        Args:
+            code_snippet (str): The source code to convert to HTML
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            file (TextIO): The file to write the HTML content to
+            title (str, optional): The title to display in the code header.
+                Defaults to "csharp".
+        """
+        ConsolePreview.print_preview(HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans))
+        for chunk in HtmlGenerator.iter_blog_html_file_content(code_snippet, token_spans, title):
+            file.write(chunk)
+        print_success("\n\nSuccessfully generated html file!")
+
     @staticmethod
     def generate_blog_html_file_content(
-            code_snippet: str, token_classifications: dict[str, str], title="csharp"
+            code_snippet: str, token_spans: TokenSpans, title="csharp"
     ) -> str:
         """
         Generates HTML content for a code snippet suitable for blog app.
         
         Args:
             code_snippet (str): The source code to convert to HTML
-            token_classifications (dict[str, str]): A dictionary mapping tokens to their
-                classification types (e.g., 'keyword', 'class-name', 'method')
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
             title (str, optional): The title to display in the code header.
                 Defaults to "csharp".
                 
         Returns:
             str: The generated HTML code as a string
         """
-        code_snippet_html = HtmlGenerator.generate_code_snippet_html(
-            code_snippet, token_classifications, True
-        )
-        html_code = f"""<div class="code-container">
-    <div class="code-header">
-    <span class="code-header-title">{title}</span>
-    </div>
-    <pre><code>{code_snippet_html}</code></pre>
-    </div>"""
+        ConsolePreview.print_preview(HtmlGenerator.iter_code_snippet_tokens(code_snippet, token_spans))
+        html_code = "".join(HtmlGenerator.iter_blog_html_file_content(code_snippet, token_spans, title))
         print_success("\n\nSuccessfully copied html code to clipboard!")
         return html_code
@@ -0,0 +1,22 @@
+from dataclasses import dataclass
+
+from config.constants import CLASSIFICATION_TIME_BUDGET
+from config.syntax_presets import SyntaxPresets
+
+
+@dataclass(frozen=True)
+class ClassifierOptions:
+    """An immutable snapshot of the settings that affect classification and highlighting.
+
+    The options are passed explicitly through the classification and HTML generation
+    pipeline, so it never reads global settings and can safely run in thread or
+    process pools.
+
+    Attributes:
+        blog_mode (bool): Whether tokens are classified with the blog color mapping.
+        syntax_preset (SyntaxPresets): The syntax highlighting preset used for the CSS.
+        time_budget (float): Seconds the classifier may spend on multi-token rules per file.
+    """
+    blog_mode: bool = False
+    syntax_preset: SyntaxPresets = SyntaxPresets.RIDER
+    time_budget: float = CLASSIFICATION_TIME_BUDGET
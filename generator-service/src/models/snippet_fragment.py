@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SnippetFragment:
+    """The highlighted code of a snippet, to be rendered into a preset page of the renderer service.
+
+    The renderer keeps the preset page loaded, with the snippet template, the CSS of the
+    syntax preset and the font, and only swaps the fragment into its code element.
+
+    Attributes:
+        fragment (str): The syntax-highlighted span markup of the code.
+        preset (str): The name of the preset page, unique for each preset_html.
+        preset_html (str): The preset page, registered with the renderer on first use.
+    """
+    fragment: str
+    preset: str
+    preset_html: str
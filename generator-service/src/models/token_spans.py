@@ -0,0 +1,29 @@
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterator
+
+
+@dataclass
+class TokenSpans:
+    """A compact, position-based classification of a code snippet.
+
+    Spans are stored as flat (start, end, kind) triples of unsigned ints, in source
+    order and without gaps, where kind indexes TOKEN_KIND_CLASSES. Adjacent
+    unclassified code is merged into a single span.
+
+    Attributes:
+        spans (array): The flattened (start, end, kind) triples.
+        is_partial (bool): Whether the classifier ran out of time and only applied
+            the per-word rules to part of the code.
+    """
+    spans: array = field(default_factory=lambda: array("I"))
+    is_partial: bool = False
+
+    def __iter__(self) -> Iterator[tuple[int, int, int]]:
+        """Iterates over the (start, end, kind) spans in source order."""
+        values = iter(self.spans)
+        return zip(values, values, values)
+
+    def __len__(self) -> int:
+        """Returns the number of spans."""
+        return len(self.spans) // 3
@@ -0,0 +1,70 @@
+import io
+
+from PIL import Image
+
+from config.constants import RENDER_SHEET_MAX_HEIGHT
+from utils.file_handler import FileHandler
+
+
+class ContactSheet:
+    """
+    Packs the images of a batch into contact sheets and slices rendered sheets into images.
+
+    A contact sheet stacks the code containers of several snippets on a single page of the
+    renderer service, which takes one screenshot of all of them. The renderer sends the
+    sheet back with the box of each container, which is cut out of it here. Page setup and
+    the screenshot are paid once per sheet instead of once per image.
+    """
+
+    @staticmethod
+    def pack(heights: list[int], max_height: int = RENDER_SHEET_MAX_HEIGHT) -> list[list[int]]:
+        """
+        Groups images into sheets, in order, whose viewport heights add up to at most the maximum height.
+
+        Args:
+            heights (list[int]): The viewport height of each image in CSS pixels
+            max_height (int, optional): The maximum height of a sheet. Defaults to RENDER_SHEET_MAX_HEIGHT.
+
+        Returns:
+            list[list[int]]: The indices of the images of each sheet. An image taller than the
+                maximum height gets a sheet of its own.
+        """
+        sheets: list[list[int]] = []
+        sheet_height = 0
+        for index, height in enumerate(heights):
+            if not sheets or sheet_height + height > max_height:
+                sheets.append([])
+                sheet_height = 0
+            sheets[-1].append(index)
+            sheet_height += height
+        return sheets
+
+    @staticmethod
+    def slice_images(
+            sheet: bytes, boxes: list[dict], device_scale_factor: float, image_paths: list[str]
+    ) -> list[int]:
+        """
+        Cuts the images out of a rendered sheet and saves them as PNG files.
+
+        Args:
+            sheet (bytes): The PNG of the sheet
+            boxes (list[dict]): The x, y, width and height of each image on the sheet in CSS pixels
+            device_scale_factor (float): The device pixel ratio the sheet was rendered at
+            image_paths (list[str]): The path to save each image to
+
+        Returns:
+            list[int]: The size of each saved image in bytes
+        """
+        sizes = []
+        with Image.open(io.BytesIO(sheet)) as image:
+            image.load()
+            for box, image_path in zip(boxes, image_paths):
+                left = round(box["x"] * device_scale_factor)
+                top = round(box["y"] * device_scale_factor)
+                right = round((box["x"] + box["width"]) * device_scale_factor)
+                bottom = round((box["y"] + box["height"]) * device_scale_factor)
+
+                output = io.BytesIO()
+                image.crop((left, top, right, bottom)).save(output, format="PNG")
+                sizes.append(FileHandler.save_bytes_atomically([output.getvalue()], image_path))
+        return sizes
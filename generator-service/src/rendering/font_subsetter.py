@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+from collections import OrderedDict
+
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+from config.constants import SNIPPET_FONT_PATH, SNIPPET_FONT_NAME, FONT_SUBSET_BASE_CHARS, FONT_SUBSET_CACHE_SIZE
+
+# Cache key of the whole font, which is not subset
+_FULL_FONT_KEY = "full"
+
+# fontTools warns about every table of the font it cannot subset
+logging.getLogger("fontTools").setLevel(logging.ERROR)
+
+
+class FontSubsetter:
+    """
+    Builds the inline @font-face rule of the snippet font for pages sent to the renderer.
+
+    The font is embedded as a base64 WOFF2 data URL, so the renderer never loads it from
+    the network or a path it cannot reach. For a single snippet it is subset to printable
+    ASCII and the other characters of the snippet, which keeps the page small. Rules are
+    cached by the hash of their glyph set, so snippets share a subset unless they use
+    characters beyond ASCII. Subsetting and WOFF2 compression take tens of milliseconds,
+    so a subset per exact character set would cost more than its few saved kilobytes.
+    Implements the Singleton pattern so subsets are reused across the images of a run.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.hits = 0
+        self.misses = 0
+        self._font_data: bytes | None = None
+        self._font_faces: OrderedDict[str, str] = OrderedDict()
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Deletes the singleton instance. The next call to load() will create a fresh instance.
+        """
+        cls._instance = None
+
+    @classmethod
+    def load(cls) -> "FontSubsetter":
+        """
+        Loads the font subsetter.
+        Returns the same instance on subsequent calls.
+
+        Returns:
+            FontSubsetter: The singleton subsetter instance
+        """
+        return cls()
+
+    @staticmethod
+    def get_glyph_set(text: str) -> str:
+        """
+        Returns the characters a text needs glyphs for.
+
+        Args:
+            text (str): The text to render
+
+        Returns:
+            str: The distinct printable characters of the text and printable ASCII in code point order
+        """
+        return "".join(sorted(set(text) - {"\r", "\n", "\t"} | set(FONT_SUBSET_BASE_CHARS)))
+
+    def get_font_face(self, text: str | None = None) -> str:
+        """
+        Returns the @font-face rule of the snippet font, subsetting it on first use of a glyph set.
+
+        Args:
+            text (str | None, optional): The text to render, whose characters the font is subset to.
+                Defaults to None, which embeds the whole font.
+
+        Returns:
+            str: The CSS rule declaring the font with an inline WOFF2 source
+        """
+        if text is None:
+            key = _FULL_FONT_KEY
+            glyph_set = None
+        else:
+            glyph_set = self.get_glyph_set(text)
+            key = hashlib.sha256(glyph_set.encode("utf-8")).hexdigest()
+
+        font_face = self._font_faces.get(key)
+        if font_face is not None:
+            self._font_faces.move_to_end(key)
+            self.hits += 1
+            return font_face
+
+        self.misses += 1
+        font_data = base64.b64encode(self._build_font(glyph_set)).decode("ascii")
+        font_face = (
+            f"@font-face {{ font-family: '{SNIPPET_FONT_NAME}'; "
+            f"src: url(data:font/woff2;base64,{font_data}) format('woff2'); }}"
+        )
+
+        self._font_faces[key] = font_face
+        if len(self._font_faces) > FONT_SUBSET_CACHE_SIZE:
+            self._font_faces.popitem(last=False)
+        return font_face
+
+    def summary(self) -> str:
+        """
+        Returns a one-line, human readable summary of the subset counters.
+
+        Returns:
+            str: The summary of cached subsets, hits and misses
+        """
+        return f"Font subsets: {len(self._font_faces)} subsets, {self.hits} hits, {self.misses} misses"
+
+    def clear(self) -> None:
+        """
+        Removes all cached subsets and the loaded font and resets the counters.
+        """
+        self._font_data = None
+        self._font_faces.clear()
+        self.hits = self.misses = 0
+
+    def _build_font(self, glyph_set: str | None) -> bytes:
+        """
+        Subsets the snippet font and compresses it as WOFF2.
+
+        Args:
+            glyph_set (str | None): The characters to keep, or None to keep the whole font
+
+        Returns:
+            bytes: The WOFF2 font file
+        """
+        if self._font_data is None:
+            with open(os.path.join(os.getcwd(), SNIPPET_FONT_PATH), "rb") as file:
+                self._font_data = file.read()
+
+        font = TTFont(io.BytesIO(self._font_data))
+        if glyph_set is not None:
+            # Chromium renders with light autohinting, which ignores the TrueType hinting instructions
+            options = subset.Options()
+            options.hinting = False
+            options.drop_tables += ["TTFA"]
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(text=glyph_set)
+            subsetter.subset(font)
+
+        font.flavor = "woff2"
+        output = io.BytesIO()
+        font.save(output)
+        return output.getvalue()
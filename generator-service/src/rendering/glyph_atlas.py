@@ -0,0 +1,122 @@
+import os
+
+from PIL import Image, ImageDraw, ImageFont
+
+from config.constants import SNIPPET_FONT_PATH
+
+# Font size the glyph advance is measured at, so that it is not rounded to whole pixels
+_ADVANCE_MEASURE_SIZE = 2048
+
+
+class GlyphAtlas:
+    """
+    A lazily built cache of rasterized, colored glyphs.
+
+    Code is monospaced and uses a handful of colors, so nearly every glyph of a
+    snippet repeats. Each (character, color, font size, scale) combination is
+    rasterized once and then blitted onto the image canvas for every occurrence.
+    Implements the Singleton pattern so the atlas stays warm across the images of a run.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self.hits = 0
+        self.misses = 0
+        self._fonts: dict[int, tuple[ImageFont.FreeTypeFont, float]] = {}
+        self._glyphs: dict[tuple[str, str, int, int], tuple[Image.Image, int, int] | None] = {}
+
+    @classmethod
+    def reset(cls) -> None:
+        """
+        Deletes the singleton instance. The next call to load() will create a fresh instance.
+        """
+        cls._instance = None
+
+    @classmethod
+    def load(cls) -> "GlyphAtlas":
+        """
+        Loads the glyph atlas.
+        Returns the same instance on subsequent calls.
+
+        Returns:
+            GlyphAtlas: The singleton atlas instance
+        """
+        return cls()
+
+    def get_font(self, font_size: int) -> tuple[ImageFont.FreeTypeFont, float]:
+        """
+        Loads the snippet font at the given pixel size.
+
+        Args:
+            font_size (int): The font size in device pixels
+
+        Returns:
+            tuple[ImageFont.FreeTypeFont, float]: The font and the exact advance of
+                its (monospaced) glyphs in device pixels
+        """
+        if font_size not in self._fonts:
+            font_path = os.path.join(os.getcwd(), SNIPPET_FONT_PATH)
+            measure_font = ImageFont.truetype(font_path, _ADVANCE_MEASURE_SIZE)
+            advance = measure_font.getlength("0") * font_size / _ADVANCE_MEASURE_SIZE
+            self._fonts[font_size] = ImageFont.truetype(font_path, font_size), advance
+        return self._fonts[font_size]
+
+    def get_glyph(self, char: str, color: str, font_size: int, scale: int) -> tuple[Image.Image, int, int] | None:
+        """
+        Returns the rasterized glyph of a character, rasterizing it on first use.
+
+        Args:
+            char (str): The character to rasterize
+            color (str): The text color as a #rrggbb string
+            font_size (int): The font size in CSS pixels
+            scale (int): The device pixel ratio
+
+        Returns:
+            tuple[Image.Image, int, int] | None: The RGBA glyph bitmap and its offset
+                from the pen position on the baseline, or None if the glyph has no ink
+        """
+        key = (char, color, font_size, scale)
+        if key in self._glyphs:
+            self.hits += 1
+            return self._glyphs[key]
+
+        self.misses += 1
+        font, _ = self.get_font(font_size * scale)
+        left, top, right, bottom = font.getbbox(char, anchor="ls")
+        glyph = None
+        if right > left and bottom > top:
+            mask = Image.new("L", (right - left, bottom - top), 0)
+            ImageDraw.Draw(mask).text((-left, -top), char, font=font, fill=255, anchor="ls")
+            bitmap = Image.new("RGBA", mask.size, color)
+            bitmap.putalpha(mask)
+            glyph = bitmap, left, top
+
+        self._glyphs[key] = glyph
+        return glyph
+
+    def summary(self) -> str:
+        """
+        Returns a one-line, human readable summary of the atlas counters.
+
+        Returns:
+            str: The summary of cached glyphs, hits and misses
+        """
+        return f"Glyph atlas: {len(self._glyphs)} glyphs, {self.hits} hits, {self.misses} misses"
+
+    def clear(self) -> None:
+        """
+        Removes all rasterized glyphs and loaded fonts and resets the counters.
+        """
+        self._fonts.clear()
+        self._glyphs.clear()
+        self.hits = self.misses = 0
@@ -0,0 +1,116 @@
+import io
+import os
+
+from PIL import Image
+
+from config.constants import IMAGE_FORMAT_WEBP, IMAGE_FORMAT_AVIF
+from config.settings import Settings
+from utils.file_handler import FileHandler
+
+
+class ImagePostProcessor:
+    """
+    Post-processes rendered images as they are saved, as configured by the IMAGE_* settings.
+
+    The image can be trimmed to its opaque pixels, reduced to a palette and saved as an
+    optimized PNG, and WebP and AVIF copies can be written next to the PNG. Code snippets
+    have few colors, so their palette PNG or lossless WebP is several times smaller than
+    the RGBA PNG of the browser. The image is decoded once and every format is encoded
+    from it. With the default settings the PNG is saved as it is.
+    """
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """
+        Checks whether any post-processing is configured.
+
+        Returns:
+            bool: False if rendered PNG files are kept as they are
+        """
+        settings = Settings.load()
+        return (
+                settings.image_trim
+                or settings.image_palette_colors > 0
+                or settings.image_optimize
+                or bool(settings.image_formats)
+        )
+
+    @staticmethod
+    def save(image: Image.Image, image_path: str) -> dict[str, int]:
+        """
+        Post-processes an image and saves it as a PNG file, followed by its copies in the other configured formats.
+
+        Args:
+            image (Image.Image): The rendered image
+            image_path (str): The path of the PNG file, the other formats replace its extension
+
+        Returns:
+            dict[str, int]: The size in bytes of each saved file, by its path
+        """
+        settings = Settings.load()
+
+        if settings.image_trim and "A" in image.getbands():
+            # Screenshots are clipped to the code container, but may keep transparent rows and columns at its edges
+            bounding_box = image.getchannel("A").getbbox()
+            if bounding_box:
+                image = image.crop(bounding_box)
+
+        # Dithering would speckle the flat backgrounds, the few colors of code are kept as they are
+        palette_image = image
+        if settings.image_palette_colors > 0:
+            palette_image = image.quantize(
+                settings.image_palette_colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE
+            )
+
+        sizes = {
+            image_path: ImagePostProcessor._save_format(
+                palette_image, image_path, "PNG", optimize=settings.image_optimize
+            )
+        }
+
+        file_path = os.path.splitext(image_path)[0]
+        if IMAGE_FORMAT_WEBP in settings.image_formats:
+            # Lossless WebP keeps the text sharp and compresses the palette image further
+            webp_path = f"{file_path}.{IMAGE_FORMAT_WEBP}"
+            sizes[webp_path] = ImagePostProcessor._save_format(palette_image, webp_path, "WEBP", lossless=True)
+        if IMAGE_FORMAT_AVIF in settings.image_formats:
+            # AVIF is lossy, so it is encoded from the full color image rather than adding the palette's error
+            avif_path = f"{file_path}.{IMAGE_FORMAT_AVIF}"
+            sizes[avif_path] = ImagePostProcessor._save_format(
+                image, avif_path, "AVIF", quality=settings.image_avif_quality
+            )
+        return sizes
+
+    @staticmethod
+    def process_file(image_path: str) -> dict[str, int]:
+        """
+        Post-processes a saved PNG file in place and writes its copies in the other configured formats.
+
+        Args:
+            image_path (str): The path of the PNG file
+
+        Returns:
+            dict[str, int]: The size in bytes of each saved file, by its path
+        """
+        # Decoded before it is replaced, as open files cannot be replaced on Windows
+        with Image.open(image_path) as image:
+            image.load()
+        return ImagePostProcessor.save(image, image_path)
+
+    @staticmethod
+    def _save_format(image: Image.Image, file_path: str, image_format: str, **options) -> int:
+        """
+        Encodes an image and saves it, replacing the file only once it is complete.
+
+        Args:
+            image (Image.Image): The image to save
+            file_path (str): The path of the file
+            image_format (str): The Pillow format name
+            **options: The encoder options of the format
+
+        Returns:
+            int: The size of the file in bytes
+        """
+        output = io.BytesIO()
+        image.save(output, format=image_format, **options)
+        return FileHandler.save_bytes_atomically([output.getvalue()], file_path)
@@ -0,0 +1,224 @@
+import math
+import os
+
+from PIL import Image, ImageDraw
+
+from config.constants import *
+from config.prompts import print_success
+from config.syntax_presets import SyntaxPresets
+from generators.html_generator import HtmlGenerator
+from models.benchmark_table import BenchmarkTable, BenchmarkCell
+from models.classifier_options import ClassifierOptions
+from models.token_spans import TokenSpans
+from rendering.glyph_atlas import GlyphAtlas
+from rendering.image_post_processor import ImagePostProcessor
+from rendering.snippet_metrics import SnippetMetrics
+
+
+class PillowRenderer:
+    """
+    Renders syntax-highlighted code snippets and benchmark tables to images with Pillow,
+    without a browser.
+
+    The snippet image reproduces the layout of resources/snippet_template.html as rendered
+    by the renderer service: a code container with a window header, the code in the
+    bundled Hack font and the colors of the selected syntax preset. Glyphs are
+    taken from the shared GlyphAtlas, so repeated characters are rasterized once per run.
+    The benchmark table image reproduces resources/benchmark_template.html.
+    """
+
+    @staticmethod
+    def render_code_snippet(
+            code_snippet: str, token_spans: TokenSpans, options: ClassifierOptions
+    ) -> Image.Image:
+        """
+        Renders a code snippet to an image.
+
+        Args:
+            code_snippet (str): The source code to render
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            options (ClassifierOptions): The options holding the syntax preset to color the code with
+
+        Returns:
+            Image.Image: The rendered RGBA image of the code container
+        """
+        scale = SNIPPET_IMAGE_SCALE
+        atlas = GlyphAtlas.load()
+        font, advance = atlas.get_font(SNIPPET_FONT_SIZE * scale)
+        column_width = advance + SNIPPET_LETTER_SPACING * scale
+        line_height = SNIPPET_LINE_HEIGHT * scale
+        ascent, descent = font.getmetrics()
+        baseline_offset = (line_height - ascent - descent) / 2 + ascent
+
+        lines = HtmlGenerator.split_code_snippet_lines(code_snippet, token_spans)
+        width, height = SnippetMetrics.get_code_snippet_size(lines)
+        width, height = math.ceil(width * scale), math.ceil(height * scale)
+        header_top, _, _, header_left = SNIPPET_HEADER_PADDING
+        _, header_height = SnippetMetrics.get_code_snippet_header_size()
+
+        background = f"#{SyntaxPresets.get_color_scheme(options.syntax_preset).get(BACKGROUND_COLOR) or '000000'}"
+        image = Image.new("RGBA", (width, height), background)
+        draw = ImageDraw.Draw(image)
+
+        circle_left = (SNIPPET_CONTAINER_PADDING + header_left) * scale
+        circle_top = (SNIPPET_CONTAINER_PADDING + header_top) * scale
+        for circle_color in SNIPPET_HEADER_CIRCLE_COLORS:
+            draw.ellipse(
+                (circle_left, circle_top,
+                 circle_left + SNIPPET_HEADER_CIRCLE_SIZE * scale - 1, circle_top + SNIPPET_HEADER_CIRCLE_SIZE * scale - 1),
+                fill=f"#{circle_color}",
+            )
+            circle_left += (SNIPPET_HEADER_CIRCLE_SIZE + SNIPPET_HEADER_CIRCLE_MARGIN) * scale
+
+        token_colors = HtmlGenerator.get_token_colors(options.syntax_preset)
+        code_left = (SNIPPET_CONTAINER_PADDING + SNIPPET_CODE_PADDING) * scale
+        line_top = (SNIPPET_CONTAINER_PADDING + header_height + SNIPPET_CODE_PADDING) * scale
+        for line in lines:
+            baseline = round(line_top + baseline_offset)
+            column = 0
+            for text, kind in line:
+                color = token_colors[kind]
+                for char in text:
+                    if not char.isspace():
+                        glyph = atlas.get_glyph(char, color, SNIPPET_FONT_SIZE, scale)
+                        if glyph is not None:
+                            bitmap, left, top = glyph
+                            image.alpha_composite(bitmap, (round(code_left + column * column_width) + left, baseline + top))
+                    column += 1
+            line_top += line_height
+
+        return image
+
+    @staticmethod
+    def render_code_snippet_image(
+            code_snippet: str,
+            token_spans: TokenSpans,
+            options: ClassifierOptions,
+            dest_path: str = "snippets",
+            filename: str = "code_snippet.png"
+    ) -> dict:
+        """
+        Renders a code snippet as a PNG image and saves it to disk.
+        The image is post-processed as configured, see ImagePostProcessor.
+
+        Args:
+            code_snippet (str): The source code to render
+            token_spans (TokenSpans): The classified (start, end, kind) spans of the code
+            options (ClassifierOptions): The options holding the syntax preset to color the code with
+            dest_path (str, optional): The destination folder path. Defaults to "snippets".
+            filename (str, optional): The filename for the image. Defaults to "code_snippet.png".
+
+        Returns:
+            dict: The result with the path of the saved image, like the renderer service's response
+        """
+        if not filename.lower().endswith('.png'):
+            filename = os.path.splitext(filename)[0] + '.png'
+
+        os.makedirs(dest_path, exist_ok=True)
+        image_path = os.path.join(dest_path, filename)
+        ImagePostProcessor.save(PillowRenderer.render_code_snippet(code_snippet, token_spans, options), image_path)
+
+        print_success(f"\n\nImage successfully generated at: {image_path}")
+        return {"message": "Image saved successfully", "path": image_path}
+
+    @staticmethod
+    def render_benchmark_table(table: BenchmarkTable) -> Image.Image:
+        """
+        Renders a benchmark table to an image.
+
+        Args:
+            table (BenchmarkTable): The benchmark table model to render
+
+        Returns:
+            Image.Image: The rendered RGBA image of the table
+        """
+        scale = SNIPPET_IMAGE_SCALE
+        font, advance = GlyphAtlas.load().get_font(BENCHMARK_FONT_SIZE * scale)
+        char_width = advance / scale
+        ascent, descent = font.getmetrics()
+        baseline_offset = (BENCHMARK_LINE_HEIGHT * scale - ascent - descent) / 2 + ascent
+        padding_y, padding_x = BENCHMARK_CELL_PADDING
+        border = BENCHMARK_BORDER_WIDTH
+
+        rows: list[list[BenchmarkCell]] = [row.sorted_cells(table.headers) for row in table.rows]
+        edges = SnippetMetrics.get_benchmark_column_edges(table)
+        row_height = SnippetMetrics.get_benchmark_row_height()
+
+        width = round(edges[-1] * scale) + border * scale
+        height = round((len(rows) + 1) * row_height * scale) + border * scale
+        image = Image.new("RGBA", (width, height), f"#{BENCHMARK_BORDER_COLOR}")
+        draw = ImageDraw.Draw(image)
+
+        def draw_cell(row_index: int, column_index: int, text: str, background: str, color: str,
+                      align: str, bold: bool = False, underlined: bool = False) -> None:
+            top = row_index * row_height + border
+            left = edges[column_index] + border
+            draw.rectangle(
+                (round(left * scale), round(top * scale),
+                 round(edges[column_index + 1] * scale) - 1, round((top + row_height - border) * scale) - 1),
+                fill=f"#{background}",
+            )
+
+            text_width = len(text) * char_width
+            content_width = edges[column_index + 1] - left - 2 * padding_x
+            text_left = left + padding_x
+            if align == "center":
+                text_left += (content_width - text_width) / 2
+            elif align == "right":
+                text_left += content_width - text_width
+
+            content_top = top + padding_y
+            draw.text(
+                (text_left * scale, content_top * scale + baseline_offset), text, font=font, fill=f"#{color}",
+                anchor="ls", stroke_width=1 if bold else 0, stroke_fill=f"#{color}",
+            )
+            if underlined:
+                underline_bottom = (content_top + BENCHMARK_LINE_HEIGHT + BENCHMARK_UNDERLINE_OFFSET) * scale
+                draw.rounded_rectangle(
+                    (text_left * scale, underline_bottom - BENCHMARK_UNDERLINE_HEIGHT * scale,
+                     (text_left + text_width) * scale, underline_bottom),
+                    radius=BENCHMARK_UNDERLINE_RADIUS * scale,
+                    fill=f"#{BENCHMARK_UNDERLINE_COLOR}",
+                )
+
+        for column_index, header in enumerate(table.headers):
+            draw_cell(0, column_index, header, BENCHMARK_HEADER_BACKGROUND_COLOR, BENCHMARK_TEXT_COLOR, "center", bold=True)
+
+        for row_index, cells in enumerate(rows, start=1):
+            for column_index, cell in enumerate(cells[:len(table.headers)]):
+                draw_cell(
+                    row_index, column_index, cell.value, BENCHMARK_BACKGROUND_COLOR,
+                    BENCHMARK_METHOD_COLOR if cell.is_method else BENCHMARK_TEXT_COLOR,
+                    "left" if cell.is_method else "right",
+                    underlined=cell.is_underlined,
+                )
+
+        return image
+
+    @staticmethod
+    def render_benchmark_table_image(
+            table: BenchmarkTable,
+            dest_path: str = "snippets",
+            filename: str = "benchmark.png"
+    ) -> dict:
+        """
+        Renders a benchmark table as a PNG image and saves it to disk.
+        The image is post-processed as configured, see ImagePostProcessor.
+
+        Args:
+            table (BenchmarkTable): The benchmark table model to render
+            dest_path (str, optional): The destination folder path. Defaults to "snippets".
+            filename (str, optional): The filename for the image. Defaults to "benchmark.png".
+
+        Returns:
+            dict: The result with the path of the saved image, like the renderer service's response
+        """
+        if not filename.lower().endswith('.png'):
+            filename = os.path.splitext(filename)[0] + '.png'
+
+        os.makedirs(dest_path, exist_ok=True)
+        image_path = os.path.join(dest_path, filename)
+        ImagePostProcessor.save(PillowRenderer.render_benchmark_table(table), image_path)
+
+        print_success(f"\n\nImage successfully generated at: {image_path}")
+        return {"message": "Image saved successfully", "path": image_path}
@@ -0,0 +1,123 @@
+import math
+
+from config.constants import *
+from models.benchmark_table import BenchmarkTable
+
+
+class SnippetMetrics:
+    """
+    Computes the layout of code snippet and benchmark table images without a browser.
+
+    Snippets and tables are set in the monospaced Hack font, so their size follows from
+    the number of characters and lines together with the font metrics and the CSS of
+    resources/snippet_template.html and resources/benchmark_template.html.
+    All sizes are in CSS pixels.
+    """
+
+    @staticmethod
+    def get_code_snippet_header_size() -> tuple[float, float]:
+        """
+        Computes the size of the window header of a code snippet.
+
+        Returns:
+            tuple[float, float]: The minimum width and the height of the header
+        """
+        header_top, header_right, header_bottom, header_left = SNIPPET_HEADER_PADDING
+        circles = len(SNIPPET_HEADER_CIRCLE_COLORS)
+        width = header_left + circles * (SNIPPET_HEADER_CIRCLE_SIZE + SNIPPET_HEADER_CIRCLE_MARGIN) + header_right
+        height = header_top + SNIPPET_HEADER_CIRCLE_SIZE + header_bottom
+        return width, height
+
+    @staticmethod
+    def get_code_snippet_size(lines: list[list[tuple[str, int]]]) -> tuple[float, float]:
+        """
+        Computes the size of the code container of a code snippet.
+
+        Args:
+            lines (list[list[tuple[str, int]]]): The (text, kind) runs of each line,
+                as returned by HtmlGenerator.split_code_snippet_lines
+
+        Returns:
+            tuple[float, float]: The width and height of the code container
+        """
+        columns = max((sum(len(text) for text, _ in line) for line in lines), default=0)
+        header_width, header_height = SnippetMetrics.get_code_snippet_header_size()
+
+        column_width = SNIPPET_FONT_ADVANCE * SNIPPET_FONT_SIZE + SNIPPET_LETTER_SPACING
+        code_width = columns * column_width + 2 * SNIPPET_CODE_PADDING
+        width = max(code_width, header_width) + 2 * SNIPPET_CONTAINER_PADDING
+        height = 2 * SNIPPET_CONTAINER_PADDING + header_height + 2 * SNIPPET_CODE_PADDING + len(lines) * SNIPPET_LINE_HEIGHT
+        return width, height
+
+    @staticmethod
+    def get_benchmark_column_edges(table: BenchmarkTable) -> list[float]:
+        """
+        Computes the horizontal position of the left border of each table column.
+
+        Column widths follow the widest cell of each column, like the browser's automatic
+        table layout does for cells that do not wrap.
+
+        Args:
+            table (BenchmarkTable): The benchmark table model
+
+        Returns:
+            list[float]: The left border of each column, followed by the right border of the table
+        """
+        columns = [len(header) for header in table.headers]
+        for row in table.rows:
+            for index, cell in enumerate(row.sorted_cells(table.headers)[:len(columns)]):
+                columns[index] = max(columns[index], len(cell.value))
+
+        char_width = SNIPPET_FONT_ADVANCE * BENCHMARK_FONT_SIZE
+        edges = [0.0]
+        for length in columns:
+            edges.append(edges[-1] + BENCHMARK_BORDER_WIDTH + length * char_width + 2 * BENCHMARK_CELL_PADDING[1])
+        return edges
+
+    @staticmethod
+    def get_benchmark_row_height() -> float:
+        """
+        Computes the height of a benchmark table row, including its top border.
+
+        Returns:
+            float: The row height
+        """
+        return BENCHMARK_BORDER_WIDTH + 2 * BENCHMARK_CELL_PADDING[0] + BENCHMARK_LINE_HEIGHT
+
+    @staticmethod
+    def get_benchmark_table_size(table: BenchmarkTable) -> tuple[float, float]:
+        """
+        Computes the size of a benchmark table.
+
+        Args:
+            table (BenchmarkTable): The benchmark table model
+
+        Returns:
+            tuple[float, float]: The width and height of the table
+        """
+        width = SnippetMetrics.get_benchmark_column_edges(table)[-1] + BENCHMARK_BORDER_WIDTH
+        height = (len(table.rows) + 1) * SnippetMetrics.get_benchmark_row_height() + BENCHMARK_BORDER_WIDTH
+        return width, height
+
+    @staticmethod
+    def get_viewport(size: tuple[float, float], min_width: float = 0) -> dict:
+        """
+        Computes the renderer viewport that fits an element of the given size.
+
+        The viewport holds the element and the page padding around it, plus some slack so
+        that small differences in font rendering never wrap the code.
+
+        Args:
+            size (tuple[float, float]): The width and height of the element
+            min_width (float, optional): The width the element stretches to if it is
+                narrower. Defaults to 0.
+
+        Returns:
+            dict: The viewport width and height in whole CSS pixels, as sent to the renderer service
+        """
+        width, height = size
+        padding = 2 * RENDER_VIEWPORT_PADDING + RENDER_VIEWPORT_SLACK
+        return {
+            "width": min(math.ceil(max(width, min_width) + padding), RENDER_VIEWPORT_MAX_SIZE),
+            "height": min(math.ceil(height + padding), RENDER_VIEWPORT_MAX_SIZE),
+        }
@@ -1,8 +1,9 @@
 import os
 import re
 import shutil
+import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Optional
 
 from config.prompts import print_success
 from config.settings import Settings
@@ -105,6 +106,37 @@ class FileHandler:
         print_success(f"File saved to {file_path}")
         return file_path
 
+    @staticmethod
+    def save_bytes_atomically(chunks: Iterable[bytes], file_path: str) -> int:
+        """
+        Streams binary contents to a file, replacing it only once all chunks are written.
+
+        The chunks go to a temporary file next to the destination, which is renamed over it
+        at the end, so an interrupted download never leaves a truncated image behind.
+
+        Args:
+            chunks (Iterable[bytes]): The file contents, e.g. the chunks of a streamed response
+            file_path (str): The path of the file to write
+
+        Returns:
+            int: The number of bytes written
+        """
+        folder_path = os.path.dirname(file_path) or "."
+        os.makedirs(folder_path, exist_ok=True)
+
+        fd, temp_path = tempfile.mkstemp(dir=folder_path, prefix=".", suffix=".tmp")
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    size += len(chunk)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return size
+
     @staticmethod
     def read_file(file_path: str) -> str | None:
         """
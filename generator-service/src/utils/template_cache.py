@@ -0,0 +1,75 @@
+import os
+import re
+from typing import Iterable
+
+# Placeholders in HTML templates, e.g. {{CODE_SNIPPET}}
+TEMPLATE_SLOT_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+
+
+class TemplateCache:
+    """
+    A utility class that loads HTML templates once and fills their {{SLOT}} placeholders.
+
+    Templates are split at their slots when loaded, so rendering a page is a single
+    join of the template parts and the slot values. A template is reloaded when its
+    file changes on disk.
+    """
+    _templates: dict[str, tuple[int, list[str]]] = {}
+
+    @staticmethod
+    def get_template_parts(template_path: str) -> list[str]:
+        """
+        Returns a template split at its slots, loading it if it is not cached or has changed.
+
+        Args:
+            template_path (str): The path to the template file
+
+        Returns:
+            list[str]: The template text, with the slot names at the odd indexes
+        """
+        modified_time = os.stat(template_path).st_mtime_ns
+        cached = TemplateCache._templates.get(template_path)
+        if cached is not None and cached[0] == modified_time:
+            return cached[1]
+
+        with open(template_path, "r", encoding="utf-8") as file:
+            parts = TEMPLATE_SLOT_PATTERN.split(file.read())
+
+        TemplateCache._templates[template_path] = (modified_time, parts)
+        return parts
+
+    @staticmethod
+    def render(template_path: str, **slots: str | Iterable[str]) -> str:
+        """
+        Renders a template by filling its slots.
+
+        Args:
+            template_path (str): The path to the template file
+            **slots (str | Iterable[str]): The value of each slot, either a string or
+                an iterable of string chunks. Slots without a value are left as they are.
+
+        Returns:
+            str: The rendered template
+        """
+        page = []
+        for index, part in enumerate(TemplateCache.get_template_parts(template_path)):
+            if index % 2 == 0:
+                page.append(part)
+                continue
+
+            value = slots.get(part)
+            if value is None:
+                page.append(f"{{{{{part}}}}}")
+            elif isinstance(value, str):
+                page.append(value)
+            else:
+                page.extend(value)
+
+        return "".join(page)
+
+    @staticmethod
+    def clear() -> None:
+        """
+        Removes all cached templates.
+        """
+        TemplateCache._templates.clear()
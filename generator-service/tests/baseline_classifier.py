@@ -0,0 +1,287 @@
+"""
+Frozen copy of the classifier that ran one regex pass per rule over the whole snippet,
+as it was before the single-scan classifier replaced it. The tests use it as the
+reference the single-scan classifier must reproduce, and as the benchmark baseline.
+The patterns and delimiters it used are frozen here as well.
+"""
+import re
+
+from config.constants import (
+    C_SHARP_KEYWORDS, TOKEN_CLASS_NAME, TOKEN_INTERFACE, TOKEN_METHOD, TOKEN_VARIABLE, TOKEN_BLANK, TOKEN_PROPERTY,
+    TOKEN_NUMBER, TOKEN_COMMENT, TOKEN_KEYWORD, TOKEN_STRING
+)
+
+DELIMITERS = [
+    " ",  # Space
+    "\n",  # New line
+    "\t",  # Tab
+    ".",  # Member access
+    "(",  # Opening parenthesis
+    ")",  # Closing parenthesis
+    "{",  # Opening brace
+    "}",  # Closing brace
+    "[",  # Opening bracket
+    "]",  # Closing bracket
+    "<",  # Opening angle bracket
+    ">",  # Closing angle bracket
+    "=",  # Assignment
+    "==",  # Equality
+    "!=",  # Inequality
+    ">",  # Greater than
+    "<",  # Less than
+    ">=",  # Greater than or equal
+    "<=",  # Less than or equal
+    "+",  # Addition
+    "-",  # Subtraction
+    "*",  # Multiplication
+    "/",  # Division
+    "%",  # Modulus
+    "&&",  # Logical AND
+    "||",  # Logical OR
+    "!",  # Logical NOT
+    ";",  # Statement terminator
+    ":",  # Colon
+    "?",  # Ternary conditional
+    ",",  # Comma
+    "@",  # Verbatim identifier
+    "#",  # Preprocessor directive
+    '"',  # String literal
+    "'",  # Character literal
+]
+
+# Pattern to extract using directives and namespace declarations
+IMPORTS_AND_NAMESPACES_PATTERN = r"(?:using|namespace)\s+([a-zA-Z0-9_.]+);"
+
+# Pattern to extract class names (not following a dot, and not followed by parentheses)
+CLASS_NAMES_PATTERN = r"(?<![.])\b[A-Z][a-zA-Z]*\b(?!\()"
+
+# Pattern to extract interface names (not following a dot, and not followed by parentheses)
+INTERFACE_NAMES_PATTERN = r"(?<![.])\b[I][A-Z][a-z][a-zA-Z]*\b(?!\()"
+
+# Pattern to extract variable names (starts with lowercase, can be camelCase, no parentheses or < after)
+VARIABLE_NAMES_PATTERN = r"(?<![.])\b[a-z][a-zA-Z0-9]*\b(?!\(|<)"
+
+# Pattern to extract method names
+METHODS_PATTERN = r"\w+\(.*?"
+
+# Pattern to extract generic method names
+GENERIC_METHODS_PATTERN = r".?\b(\w+)<[^>]*>+\("
+
+# Pattern to extract constructors
+CONSTRUCTORS_PATTERN = r"\bnew (\w+)"
+
+# Pattern to extract object initializers
+OBJECT_INITIALIZERS_PATTERN = r"new\s+\w+\s*\{[^{}]*\}"
+
+# Pattern to extract properties from object initializers
+OBJECT_INITIALIZER_PROPERTIES_PATTERN = r"\b(\w+)\b(?=\s*[:=])"
+
+# Pattern to extract properties from member access
+MEMBER_ACCESS_PROPERTIES_PATTERN = r"\.\b[A-Z][a-zA-Z0-9]*\b(?!\()"
+
+# Pattern to extract records
+RECORDS_PATTERN = r"record \b[A-Z][a-zA-Z]*\b\((?:\w+\s+\w+\,?\s*)+\)"
+
+# Pattern to extract properties from records
+RECORD_PROPERTIES_PATTERN = r"\b\w+\s+(\w+)"
+
+# Pattern to extract numbers
+NUMBERS_PATTERN = r"\d+"
+
+# Pattern to extract string literals
+STRINGS_PATTERN = r'(\$"[^"]*?"|"[^"]*?")'
+
+# Pattern to extract comments
+COMMENTS_PATTERN = r"//.*?(?=\n|$)"
+
+# Pattern to extract class properties - handles generic types and various modifiers
+CLASS_PROPERTY_PATTERN = r"public\s+(?:[A-Za-z0-9_<>?,\s]+\s+)(\w+)\s*\{\s*get;\s*set;\s*\}"
+
+# Pattern to extract auto-implemented properties with only get
+AUTO_PROPERTY_GET_PATTERN = r"(?i)\b\w+\s+[A-Z]\w*\s*\{\s*get;"
+
+# Pattern to extract region names
+REGION_NAME_PATTERN = r"#region\s+(.+)$"
+
+# Pattern to extract interpolated string expressions
+INTERPOLATED_STRING_EXPRESSIONS_PATTERN = r'\{[^}]*\}'
+
+# Pattern to extract C# multiline string literals (verbatim strings with @"" or raw string literals with """)
+MULTILINE_STRING_PATTERN = r'(@"[\s\S]*?")|("""[\s\S]*?""")'
+
+
+def get_tokens(code: str) -> set[str]:
+    """
+    Extracts tokens from a code string by replacing delimiters with spaces
+    and splitting the resulting string.
+
+    Args:
+        code (str): The source code string to tokenize
+
+    Returns:
+        set[str]: A set of unique tokens extracted from the code
+    """
+    for delimiter in DELIMITERS:
+        code = code.replace(delimiter, " ")
+
+    tokens = set(code.split())
+    return tokens
+
+
+def parse_code(code: str, blog_mode: bool = False) -> dict[str, str]:
+    """
+    Parses C# code and classifies tokens for syntax highlighting.
+
+    Identifies C# language elements like keywords, classes, methods, and properties
+    using regex patterns to match different code constructs.
+
+    Args:
+        code (str): The C# code to parse
+        blog_mode (bool, optional): Whether to use the blog color mapping. Defaults to False.
+
+    Returns:
+        dict[str, str]: Mapping of tokens to classification types (keyword,
+        class-name, method, variable, number, string, comment)
+    """
+    tokens = set(get_tokens(code))
+
+    keywords = [kw for kw in C_SHARP_KEYWORDS if kw in tokens]
+
+    imports_and_namespaces = set(re.findall(IMPORTS_AND_NAMESPACES_PATTERN, code))
+
+    domains = set()
+    for domain in imports_and_namespaces:
+        if "." in domain:
+            split_domains = domain.split(".")
+            for d in split_domains:
+                domains.add(d)
+        else:
+            domains.add(domain)
+
+    classes = set(re.findall(CLASS_NAMES_PATTERN, code))
+    
+    interfaces = set(re.findall(INTERFACE_NAMES_PATTERN, code))
+
+    methods = set(re.findall(METHODS_PATTERN, code))
+    methods = set([method.split("(")[0] for method in methods])
+    
+    variables = set(re.findall(VARIABLE_NAMES_PATTERN, code))
+
+    generic_methods = set(re.findall(GENERIC_METHODS_PATTERN, code))
+
+    constructors = set(re.findall(CONSTRUCTORS_PATTERN, code))
+
+    object_initializers = set(re.findall(OBJECT_INITIALIZERS_PATTERN, code))
+    properties_set = set()
+    for initializer in object_initializers:
+        # Find all matches for properties using the regex and add them to the set
+        properties = re.findall(OBJECT_INITIALIZER_PROPERTIES_PATTERN, initializer)
+        properties_set.update(properties)
+    variable_properties = [
+        prop[1:] for prop in set(re.findall(MEMBER_ACCESS_PROPERTIES_PATTERN, code))
+    ]
+    # class_properties = set(re.findall(CLASS_PROPERTY_PATTERN, code))  # TODO: Fix this
+    class_properties = set(re.findall(AUTO_PROPERTY_GET_PATTERN, code))
+    class_properties = [prop.split(" ")[1] for prop in class_properties]
+
+    records = set(re.findall(RECORDS_PATTERN, code))
+    record_properties_set = set()
+    record_names_set = set()
+    for record in records:
+        # Find all property names using the regex
+        record_name = record.split("(")[0].split()[1]
+        record_names_set.add(record_name)
+
+        properties = re.findall(RECORD_PROPERTIES_PATTERN, record.split("(")[1][0:-1])
+        record_properties_set.update(properties)
+
+    numbers = set(re.findall(NUMBERS_PATTERN, code))
+
+    strings = set(re.findall(STRINGS_PATTERN, code))
+
+    interpolated_strings = set(re.findall(INTERPOLATED_STRING_EXPRESSIONS_PATTERN, code))  # TODO: Fix this
+
+    multiline_strings = set(re.findall(MULTILINE_STRING_PATTERN, code))
+
+    comments = set(re.findall(COMMENTS_PATTERN, code))
+
+    region_names = set(re.findall(REGION_NAME_PATTERN, code))  # TODO: Fix this
+
+    token_classifications = {}
+
+    # Classes (highest priority)
+    for cls in classes:
+        token_classifications[cls] = TOKEN_CLASS_NAME
+
+    # Interfaces
+    for interface in interfaces:
+        token_classifications[interface] = TOKEN_INTERFACE if not blog_mode else TOKEN_CLASS_NAME
+
+    # Methods
+    for method in methods:
+        token_classifications[method] = TOKEN_METHOD
+
+    # Variables
+    for variable in variables:
+        token_classifications[variable] = TOKEN_VARIABLE if not blog_mode else TOKEN_BLANK
+
+    # Object initializer properties
+    for prop in properties_set:
+        token_classifications[prop] = TOKEN_PROPERTY if not blog_mode else TOKEN_VARIABLE
+
+    # Variable properties
+    for prop in variable_properties:
+        token_classifications[prop] = TOKEN_PROPERTY if not blog_mode else TOKEN_VARIABLE
+
+    # Class properties
+    for prop in class_properties:
+        token_classifications[prop] = TOKEN_PROPERTY if not blog_mode else TOKEN_VARIABLE
+
+    # Domains (from imports and namespaces)
+    for domain in domains:
+        token_classifications[domain] = TOKEN_CLASS_NAME
+
+    # Generic methods
+    for method in generic_methods:
+        token_classifications[method] = TOKEN_METHOD
+
+    # Constructors
+    for con in constructors:
+        token_classifications[con] = TOKEN_CLASS_NAME
+
+    # Record properties
+    for prop in record_properties_set:
+        token_classifications[prop] = TOKEN_BLANK
+
+    # Record names
+    for rec in record_names_set:
+        token_classifications[rec] = TOKEN_CLASS_NAME
+
+    # Numbers
+    for num in numbers:
+        token_classifications[num] = TOKEN_NUMBER
+
+    # Comments
+    for comment in comments:
+        token_classifications[f"{comment}\n"] = TOKEN_COMMENT
+
+    # Region names
+    for region in region_names:
+        token_classifications[region] = TOKEN_COMMENT
+
+    # Keywords
+    for keyword in keywords:
+        token_classifications[keyword] = TOKEN_KEYWORD
+
+    # Strings
+    for string in strings:
+        token_classifications[f"{string}"] = TOKEN_STRING
+
+    for multiline_string in multiline_strings:
+        token_classifications[f"{multiline_string}"] = TOKEN_STRING
+
+    # Interpolated strings
+    for interpolated_string in interpolated_strings:
+        token_classifications[interpolated_string] = TOKEN_BLANK
+
+    return token_classifications
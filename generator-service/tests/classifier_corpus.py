@@ -0,0 +1,57 @@
+"""
+Deterministic C# inputs for the classifier tests: realistic snippets repeated into
+large files, and random token soup that mixes the constructs of the multi-token rules.
+"""
+import random
+
+SNIPPETS = [
+    'using System.Collections.Generic;\nusing System.Linq;\nnamespace Demo.App;\n',
+    'public record Person(string FirstName, int Age);\n',
+    'public class OrderService{i} : IOrderService, IDisposable\n{{\n',
+    '    private readonly ISqlConnectionFactory _factory{i};\n',
+    '    public string Name{i} {{ get; set; }}\n    public int Count {{ get; }}\n',
+    '    public async Task<IResult> Handler{i}(ISqlConnectionFactory connectionFactory, int value)\n    {{\n',
+    '        using var connection = connectionFactory.OpenConnection();\n',
+    '        var orders = await connection.QueryAsync<Order>(\n            "SELECT * FROM \\"Orders\\" WHERE Id = {i}");\n',
+    '        var item = new Item {{ Id = {i}, Title = "x", Price = 1.5m }};\n',
+    '        if (value >= 10 && orders.Count() != 0 || item.Price <= 2) return Results.Ok(orders);\n',
+    '        // Fetch the Order{i} and call Process() on it\n',
+    '        var list = new List<int>();\n        list.Add(value{i} + 3);\n',
+    '        var text = $"Total: {{orders.Count}} for {{Name}}";\n        var path = @"C:\\temp\\file{i}.txt";\n',
+    '        foreach (var o in orders) {{ Console.WriteLine(o.Total * 2); }}\n',
+    '        return Results.Ok(Map<Order, OrderDto>(orders));\n    }}\n',
+    '#region Helpers\n    private static int Compute(int a, int b) => a * b + 42;\n#endregion\n',
+    '    public IEnumerable<string> Names => _items.Select(x => x.Name).Where(n => n != null);\n',
+    '}}\n',
+]
+
+# Fragments that start, end or break the multi-token constructs in unusual places
+TOKEN_SOUP = [
+    "new", "new ", "record ", "using ", "namespace ", "#region", "#region ", "get;", "GET;", "Get;",
+    "{", "}", "(", ")", "<", ">", ",", ";", "=", ":", ".", " ", " ", " ", "\n", "\t", "&&", "||", "&", "|",
+    "_x", "Foo", "Bar", "IFoo", "abc", "x1", "A", "b", "42", "string", "int", "public", "var",
+    "record Person(string Name, int Age)", "using A.B;", "Foo<int>(", ">>(", "new Foo { A = 1 }",
+    "public Foo { get; set; }", "x.Y", ".Y(", "@\"", "\"", "//",
+]
+
+
+def build_corpus(lines: int, seed: int = 7) -> str:
+    """
+    Builds C# code of about the given number of lines from the snippets, in a seeded random order.
+    """
+    rnd = random.Random(seed)
+    chunks = []
+    count = 0
+    while count < lines:
+        chunk = rnd.choice(SNIPPETS).format(i=len(chunks))
+        chunks.append(chunk)
+        count += chunk.count("\n")
+    return "".join(chunks)
+
+
+def build_token_soup(seed: int) -> str:
+    """
+    Builds a short random sequence of token soup fragments.
+    """
+    rnd = random.Random(seed)
+    return "".join(rnd.choice(TOKEN_SOUP) for _ in range(rnd.randint(1, 40)))
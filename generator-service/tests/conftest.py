@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# The generator service runs from its src directory, which holds its top-level packages
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config.settings import Settings  # noqa: E402
+from core.classification_cache import ClassificationCache  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", help="run the wall-clock benchmarks")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock comparison, skipped unless --benchmark is given")
+
+
+def pytest_collection_modifyitems(config, items):
+    # Timings depend on the load of the machine, so they are only compared on request
+    if config.getoption("--benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="wall-clock benchmark, run with --benchmark")
+    for item in items:
+        if item.get_closest_marker("benchmark"):
+            item.add_marker(skip_benchmark)
+
+
+@pytest.fixture
+def settings_env(monkeypatch, tmp_path):
+    """Sets the required settings, with all paths in a temporary directory, and reloads the settings."""
+    for name, value in {
+        "LINKEDIN_POSTS_PATH": str(tmp_path), "BLOG_POSTS_PATH": str(tmp_path), "OUTPUT_PATH": str(tmp_path),
+        "SERVER_PORT": "1", "RENDERER_SERVICE_URL": "http://localhost:3000", "BLOG_MODE": "false",
+        "SYNTAX_PRESET": "RIDER", "CLASSIFICATION_CACHE_PERSIST": "true",
+    }.items():
+        monkeypatch.setenv(name, value)
+    Settings.reset()
+    yield monkeypatch
+    Settings.reset()
+
+
+@pytest.fixture
+def classification_cache(settings_env):
+    """A persisted classification cache in a temporary output path."""
+    ClassificationCache.reset()
+    yield ClassificationCache.load()
+    ClassificationCache.reset()
@@ -0,0 +1,49 @@
+import pytest
+
+from classifier_corpus import build_corpus
+from config.settings import Settings
+from core.classification_cache import ClassificationCache
+from models.classifier_options import ClassifierOptions
+
+
+def test_entries_are_persisted_between_runs(classification_cache):
+    code = build_corpus(50)
+    token_spans = classification_cache.classify(code, ClassifierOptions())
+
+    ClassificationCache.reset()
+    cache = ClassificationCache.load()
+    assert cache.classify(code, ClassifierOptions()).spans == token_spans.spans
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["disk_bytes"] == classification_cache.stats()["disk_bytes"]
+
+
+def test_disk_store_drops_oldest_entries_over_its_limit(classification_cache):
+    snippets = [build_corpus(20, seed=seed) for seed in range(6)]
+    sizes = [len(classification_cache.classify(code, ClassifierOptions()).spans.tobytes()) for code in snippets]
+    ClassificationCache.reset()
+
+    cache = ClassificationCache.load()
+    cache.clear()
+    cache.disk_max_bytes = sum(sizes[-3:])
+    for code in snippets:
+        cache.classify(code, ClassifierOptions())
+    assert cache.stats()["disk_bytes"] == sum(sizes[-3:])
+
+    ClassificationCache.reset()
+    cache = ClassificationCache.load()
+    assert cache.stats()["disk_bytes"] == sum(sizes[-3:])
+    for code in snippets:
+        cache.classify(code, ClassifierOptions())
+    assert cache.stats()["disk_hits"] == 3
+    assert cache.stats()["misses"] == 3
+
+
+def test_persisting_without_output_path_is_a_configuration_error(settings_env):
+    Settings.load().output_path = None
+    ClassificationCache.reset()
+    try:
+        for _ in range(2):
+            with pytest.raises(ValueError, match="OUTPUT_PATH"):
+                ClassificationCache.load()
+    finally:
+        ClassificationCache.reset()
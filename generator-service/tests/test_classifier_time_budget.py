@@ -0,0 +1,137 @@
+import math
+
+import pytest
+
+import core.code_classifier as code_classifier
+from classifier_corpus import build_corpus, build_token_soup
+from core.code_classifier import CLASSIFICATION_PATTERN, classify_code, classify_tokens
+from models.classifier_options import ClassifierOptions
+
+# Worst-case inputs for the multi-token rules: deep generics, unterminated strings, 100k-char lines,
+# constructs that open without closing and record parameter lists that almost match
+PATHOLOGICAL_INPUTS = {
+    "deep generics": "Foo<" * 20000 + "int" + ">" * 20000 + "();",
+    "unclosed generics": "a<" * 30000,
+    "generics closed without call": "a<" * 30000 + ">;",
+    "unterminated verbatim string": '@"' + "x " * 50000,
+    "unterminated raw string": '"""' + "x " * 50000,
+    "unterminated strings": '"abc\n' * 30000,
+    "100k-char line": "var x = " + " + ".join(["Foo.Bar(baz)"] * 8000) + ";",
+    "record parameters": "record Person(" + " ".join("abcdefgh" for _ in range(5000)) + " =);",
+    "unclosed records": "record Person(" * 20000,
+    "unclosed initializers": "new X { " * 20000,
+    "long initializer": "new X { " + "A = 1, " * 20000,
+    "using chain": "using " * 30000,
+    "auto-properties without get": "public Foo Bar { " * 20000 + "get;",
+    "regions": "#region " * 20000,
+    "logical operator runs": "a" + "&" * 100001 + "b" + "|" * 100000 + "c",
+}
+
+# Patterns of the multi-token rules, of which a word can start at most MAX_RULES_PER_WORD:
+# a generic method call, or a region, a constructor with an object initializer and an auto-property
+MULTI_TOKEN_RULE_PATTERNS = [
+    "_IMPORTS_AND_NAMESPACES_RE", "_GENERIC_METHODS_RE", "_CONSTRUCTORS_RE", "_OBJECT_INITIALIZERS_RE",
+    "_RECORDS_RE", "_AUTO_PROPERTY_GET_RE", "_REGION_NAME_RE",
+]
+MAX_RULES_PER_WORD = 4
+
+
+class FakeClock:
+    """Replaces time.perf_counter in the classifier with a clock that advances by a fixed step per reading."""
+
+    def __init__(self, step: float):
+        self.now = 0.0
+        self.step = step
+
+    def perf_counter(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+class CountingPattern:
+    """Wraps a compiled pattern and counts the matches tried with it."""
+
+    def __init__(self, pattern, counter: list[int]):
+        self.pattern = pattern
+        self.counter = counter
+
+    def match(self, *args):
+        self.counter[0] += 1
+        return self.pattern.match(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.pattern, name)
+
+
+@pytest.fixture
+def rule_matches(monkeypatch) -> list[int]:
+    counter = [0]
+    for name in MULTI_TOKEN_RULE_PATTERNS:
+        monkeypatch.setattr(code_classifier, name, CountingPattern(getattr(code_classifier, name), counter))
+    return counter
+
+
+@pytest.fixture
+def over_budget_clock(monkeypatch):
+    # Every reading is a second later, so a budget below a second is spent at the first check
+    monkeypatch.setattr(code_classifier, "time", FakeClock(step=1.0))
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    monkeypatch.setattr(code_classifier, "time", FakeClock(step=0.0))
+
+
+@pytest.mark.parametrize("name", PATHOLOGICAL_INPUTS)
+def test_exhausted_budget_bounds_multi_token_rules(name, over_budget_clock, rule_matches):
+    code = PATHOLOGICAL_INPUTS[name]
+    words = len(CLASSIFICATION_PATTERN.findall(code))
+
+    token_spans = classify_code(code, ClassifierOptions(time_budget=0.5))
+
+    # The budget is checked every _TIME_BUDGET_CHECK_INTERVAL words, the rest only get the per-word rules
+    checked_words = min(words, code_classifier._TIME_BUDGET_CHECK_INTERVAL)
+    assert token_spans.is_partial == (words >= code_classifier._TIME_BUDGET_CHECK_INTERVAL)
+    assert rule_matches[0] <= MAX_RULES_PER_WORD * checked_words
+
+
+@pytest.mark.parametrize("name", PATHOLOGICAL_INPUTS)
+def test_exhausted_budget_still_classifies_words(name, over_budget_clock, monkeypatch):
+    code = PATHOLOGICAL_INPUTS[name]
+    partial = classify_tokens(code, time_budget=0.5)
+
+    monkeypatch.setattr(code_classifier, "time", FakeClock(step=0.0))
+    complete = classify_tokens(code, time_budget=0.5)
+
+    # Every word keeps its per-word rule, the multi-token rules can only promote tokens further
+    assert partial.keys() <= complete.keys()
+    assert all(rule <= complete[token] for token, rule in partial.items())
+
+
+@pytest.mark.parametrize("code", [pytest.param(build_corpus(10000), id="10k-line corpus")] + [
+    pytest.param(build_token_soup(seed), id=f"token soup {seed}") for seed in range(200)
+])
+def test_budget_does_not_change_classification_within_budget(code, frozen_clock):
+    assert not classify_code(code, ClassifierOptions(time_budget=0.5)).is_partial
+    assert classify_tokens(code, 0.5) == classify_tokens(code, math.inf)
+
+
+def test_partial_classification_is_not_cached(classification_cache, over_budget_clock):
+    code = PATHOLOGICAL_INPUTS["deep generics"]
+
+    assert classification_cache.classify(code, ClassifierOptions(time_budget=0.5)).is_partial
+    assert classification_cache.stats()["entries"] == 0
+
+    token_spans = classification_cache.classify(code, ClassifierOptions(time_budget=math.inf))
+    assert not token_spans.is_partial
+    assert classification_cache.classify(code, ClassifierOptions(time_budget=0.5)) is token_spans
+    assert classification_cache.stats() == {**classification_cache.stats(), "hits": 1, "misses": 2, "entries": 1}
+
+
+def test_complete_classification_is_cached(classification_cache, frozen_clock):
+    code = build_corpus(100)
+
+    token_spans = classification_cache.classify(code, ClassifierOptions())
+    assert not token_spans.is_partial
+    assert classification_cache.classify(code, ClassifierOptions()) is token_spans
+    assert classification_cache.stats()["hits"] == 1
@@ -0,0 +1,76 @@
+import os
+import time
+
+import pytest
+
+import baseline_classifier
+from classifier_corpus import build_corpus, build_token_soup
+from core.code_classifier import parse_code
+from core.tokenizer import iter_tokens, LEXEME_COMMENT, LEXEME_STRING
+from models.classifier_options import ClassifierOptions
+
+SNIPPET_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "resources", "snippet-1.cs")
+
+
+def read_snippet() -> str:
+    with open(SNIPPET_PATH, encoding="utf-8") as file:
+        return file.read()
+
+
+def get_differences(code: str, blog_mode: bool) -> list[tuple[str, str | None, str | None]]:
+    """
+    Returns the word tokens of the code the single-scan classifier classifies differently than the baseline,
+    with the baseline and the new classification. Strings and comments are classified by the lexer instead.
+    """
+    expected = baseline_classifier.parse_code(code, blog_mode)
+    actual = parse_code(code, ClassifierOptions(blog_mode=blog_mode))
+    return sorted({
+        (token, expected.get(token), actual.get(token))
+        for lexeme, token in iter_tokens(code)
+        if lexeme not in (LEXEME_STRING, LEXEME_COMMENT) and expected.get(token) != actual.get(token)
+    })
+
+
+def best_time(function, code: str, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.mark.parametrize("blog_mode", [False, True])
+def test_snippet_matches_baseline(blog_mode):
+    assert get_differences(read_snippet(), blog_mode) == []
+
+
+@pytest.mark.parametrize("blog_mode", [False, True])
+def test_corpus_matches_baseline(blog_mode):
+    assert get_differences(build_corpus(2000), blog_mode) == []
+
+
+@pytest.mark.parametrize("seed", range(2000))
+def test_token_soup_matches_baseline(seed):
+    code = build_token_soup(seed)
+    try:
+        baseline_classifier.parse_code(code)
+    except IndexError:
+        # The baseline splits auto-properties at spaces only and fails on other whitespace
+        pytest.skip("baseline classifier fails on this input")
+    assert get_differences(code, False) == []
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("name, code", [
+    ("snippet-1.cs", read_snippet()),
+    ("10k-line corpus", build_corpus(10000)),
+])
+def test_classifier_benchmark(name, code):
+    options = ClassifierOptions()
+    baseline_time = best_time(baseline_classifier.parse_code, code)
+    scan_time = best_time(lambda source: parse_code(source, options), code)
+
+    print(f"\n{name}: baseline {baseline_time * 1000:.1f} ms, single scan {scan_time * 1000:.1f} ms, "
+          f"{baseline_time / scan_time:.1f}x faster")
+    assert scan_time < baseline_time
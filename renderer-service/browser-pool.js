@@ -0,0 +1,178 @@
+const puppeteer = require('puppeteer');
+
+// Requests of the interactive lane get a free page before any request of the bulk lane
+const PRIORITIES = ['interactive', 'bulk'];
+
+/**
+ * Keeps one Chromium instance with a pool of ready pages, so requests do not pay a browser cold start.
+ *
+ * Requests acquire a page, render on it and release it again. When all pages are busy, requests wait
+ * in the queue of their priority lane. A request may ask for a page with a given affinity, e.g. one that
+ * already holds a loaded document, and gets it if such a page is free. The browser is recycled after a number of renders to bound its memory growth, and
+ * relaunched when it crashes.
+ */
+class BrowserPool {
+    constructor({ size, maxRenders, viewport, launchOptions }) {
+        this.size = size;
+        this.maxRenders = maxRenders;
+        this.viewport = viewport;
+        this.launchOptions = launchOptions;
+
+        this.browser = null;
+        this.version = null;
+        this.idlePages = [];
+        this.busyPages = new Set();
+        this.waiters = Object.fromEntries(PRIORITIES.map((priority) => [priority, []]));
+        this.renders = 0;
+        this.restarting = null;
+        this.onIdle = null;
+    }
+
+    async start() {
+        await this.restart();
+        if (!this.browser) {
+            throw new Error('Could not launch browser');
+        }
+    }
+
+    /**
+     * Returns the number of requests waiting for a page in a priority lane.
+     */
+    queued(priority) {
+        return this.waiters[priority].length;
+    }
+
+    /**
+     * Resolves with a free page, waiting in the queue of the priority lane while all pages are busy.
+     * A free page whose affinity property matches the requested one is preferred.
+     */
+    acquire(priority = 'interactive', affinity = null) {
+        return new Promise((resolve, reject) => {
+            this.waiters[priority].push({ resolve, reject, affinity });
+            if (!this.browser && !this.restarting) {
+                this.restart();
+            }
+            this.dispatch();
+        });
+    }
+
+    /**
+     * Returns a page to the pool after a render, replacing it if it was closed or crashed.
+     */
+    release(page) {
+        this.busyPages.delete(page);
+        if (this.busyPages.size === 0 && this.onIdle) {
+            this.onIdle();
+        }
+
+        // Pages of a browser that was recycled or crashed in the meantime are dropped
+        if (page.browser() !== this.browser || !this.browser.isConnected()) {
+            return;
+        }
+
+        this.renders++;
+        if (page.isClosed()) {
+            console.warn('Replacing closed page');
+            this.createPage(this.browser)
+                .then((newPage) => {
+                    this.idlePages.push(newPage);
+                    this.dispatch();
+                })
+                .catch((err) => console.error('Failed to replace page:', err));
+        } else {
+            this.idlePages.push(page);
+        }
+
+        if (this.renders >= this.maxRenders && !this.restarting) {
+            console.log(`Recycling browser after ${this.renders} renders`);
+            this.restart();
+        } else {
+            this.dispatch();
+        }
+    }
+
+    dispatch() {
+        while (!this.restarting && this.idlePages.length > 0) {
+            const lane = PRIORITIES.map((priority) => this.waiters[priority]).find((waiters) => waiters.length > 0);
+            if (!lane) {
+                return;
+            }
+
+            const waiter = lane.shift();
+            const index = this.idlePages.findIndex((page) => (page.affinity ?? null) === waiter.affinity);
+            const [page] = this.idlePages.splice(index >= 0 ? index : this.idlePages.length - 1, 1);
+            this.busyPages.add(page);
+            waiter.resolve(page);
+        }
+    }
+
+    async createPage(browser) {
+        const page = await browser.newPage();
+        await page.setViewport(this.viewport);
+        return page;
+    }
+
+    /**
+     * Waits for the running renders to finish, then replaces the browser and its pages.
+     */
+    restart() {
+        if (this.restarting) {
+            return this.restarting;
+        }
+
+        this.restarting = (async () => {
+            if (this.busyPages.size > 0) {
+                await new Promise((resolve) => { this.onIdle = resolve; });
+                this.onIdle = null;
+            }
+
+            const oldBrowser = this.browser;
+            this.browser = null;
+            this.idlePages = [];
+            if (oldBrowser) {
+                await oldBrowser.close().catch(() => {});
+            }
+
+            console.log('Launching browser...');
+            const browser = await puppeteer.launch(this.launchOptions);
+            browser.on('disconnected', () => {
+                if (browser === this.browser) {
+                    console.error('Browser disconnected, relaunching...');
+                    this.restart();
+                }
+            });
+
+            const pages = await Promise.all(Array.from({ length: this.size }, () => this.createPage(browser)));
+            this.version = await browser.version();
+            this.browser = browser;
+            this.idlePages = pages;
+            this.renders = 0;
+            console.log(`Browser launched successfully with ${pages.length} pages`);
+        })();
+
+        return this.restarting
+            .catch((err) => {
+                // Fail the queued requests, the next request tries to launch the browser again
+                console.error('Failed to launch browser:', err);
+                for (const waiters of Object.values(this.waiters)) {
+                    for (const waiter of waiters.splice(0)) {
+                        waiter.reject(err);
+                    }
+                }
+            })
+            .finally(() => {
+                this.restarting = null;
+                this.dispatch();
+            });
+    }
+
+    async close() {
+        if (this.browser) {
+            const browser = this.browser;
+            this.browser = null;
+            await browser.close();
+        }
+    }
+}
+
+module.exports = { BrowserPool, PRIORITIES };
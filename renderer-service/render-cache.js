@@ -0,0 +1,149 @@
+const crypto = require('crypto');
+const path = require('path');
+const fs = require('fs').promises;
+
+/**
+ * A content-addressed cache of rendered images on disk.
+ *
+ * Images are keyed by the hash of everything that affects the screenshot: the HTML, or the fragment
+ * and the preset page it is rendered into, the viewport,
+ * the device scale factor, the image format and the browser version. A hit is served from disk
+ * without touching the browser. The cache is bounded by the total size of its images and evicts
+ * the least recently used ones first.
+ */
+class RenderCache {
+    constructor({ dir, maxBytes }) {
+        this.dir = dir;
+        this.maxBytes = maxBytes;
+
+        // Keys in least to most recently used order, with the size of their image
+        this.entries = new Map();
+        this.size = 0;
+        this.hits = 0;
+        this.misses = 0;
+        this.bytesSaved = 0;
+    }
+
+    get enabled() {
+        return this.maxBytes > 0;
+    }
+
+    /**
+     * Indexes the images already in the cache directory, oldest first.
+     */
+    async start() {
+        if (!this.enabled) {
+            return;
+        }
+
+        await fs.mkdir(this.dir, { recursive: true });
+        const files = [];
+        for (const name of await fs.readdir(this.dir)) {
+            if (name.endsWith('.tmp')) {
+                await fs.rm(path.join(this.dir, name), { force: true });
+                continue;
+            }
+            const stats = await fs.stat(path.join(this.dir, name));
+            files.push({ name, size: stats.size, mtime: stats.mtimeMs });
+        }
+
+        files.sort((a, b) => a.mtime - b.mtime);
+        for (const { name, size } of files) {
+            this.entries.set(name, size);
+            this.size += size;
+        }
+        await this.evict();
+        console.log(`Render cache: ${this.entries.size} images, ${this.size} bytes in ${this.dir}`);
+    }
+
+    getKey(job, deviceScaleFactor, browserVersion) {
+        const { html, fragment, presetHash, pageViewport, imageType } = job;
+        const type = imageType || (job.fullFilePath.toLowerCase().endsWith('.png') ? 'png' : 'jpeg');
+        const settings = [browserVersion, deviceScaleFactor, pageViewport.width, pageViewport.height, type, presetHash || null];
+        const digest = crypto.createHash('sha256')
+            .update(JSON.stringify(settings))
+            .update(presetHash ? fragment : html)
+            .digest('hex');
+        return `${digest}.${type}`;
+    }
+
+    /**
+     * Returns the cached image of a key, or null on a miss.
+     */
+    async get(key) {
+        if (!this.enabled) {
+            return null;
+        }
+
+        if (this.entries.has(key)) {
+            try {
+                const image = await fs.readFile(path.join(this.dir, key));
+                this.entries.delete(key);
+                this.entries.set(key, image.length);
+                this.hits++;
+                this.bytesSaved += image.length;
+                return image;
+            } catch (err) {
+                console.warn('Dropping unreadable cache entry:', key, err.message);
+                this.size -= this.entries.get(key);
+                this.entries.delete(key);
+            }
+        }
+
+        this.misses++;
+        return null;
+    }
+
+    /**
+     * Stores a rendered image, evicting the least recently used images while the cache is over its size limit.
+     */
+    async put(key, image) {
+        if (!this.enabled || this.entries.has(key)) {
+            return;
+        }
+
+        // Written under a temporary name first, so a crash never leaves a truncated image under its key
+        const filePath = path.join(this.dir, key);
+        const tempPath = `${filePath}.${process.pid}.${crypto.randomBytes(4).toString('hex')}.tmp`;
+        try {
+            await fs.writeFile(tempPath, image);
+            await fs.rename(tempPath, filePath);
+        } catch (err) {
+            console.warn('Failed to cache image:', err.message);
+            await fs.rm(tempPath, { force: true });
+            return;
+        }
+
+        // Another request may have cached the same image in the meantime
+        if (!this.entries.has(key)) {
+            this.entries.set(key, image.length);
+            this.size += image.length;
+            await this.evict();
+        }
+    }
+
+    async evict() {
+        for (const [key, size] of this.entries) {
+            if (this.size <= this.maxBytes || this.entries.size <= 1) {
+                break;
+            }
+            this.entries.delete(key);
+            this.size -= size;
+            await fs.rm(path.join(this.dir, key), { force: true });
+        }
+    }
+
+    stats() {
+        const lookups = this.hits + this.misses;
+        return {
+            hits: this.hits,
+            misses: this.misses,
+            hitRatio: lookups ? this.hits / lookups : 0,
+            bytesSaved: this.bytesSaved,
+            entries: this.entries.size,
+            bytes: this.size
+        };
+    }
+}
+
+module.exports = { RenderCache };
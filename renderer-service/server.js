@@ -1,78 +1,303 @@
+const crypto = require('crypto');
 const express = require('express');
-const puppeteer = require('puppeteer');
 const path = require('path');
 const fs = require('fs').promises;
+const { BrowserPool, PRIORITIES } = require('./browser-pool');
+const { RenderCache } = require('./render-cache');
+const { version: RENDERER_VERSION } = require('./package.json');
 
 const app = express();
 const port = 3000;
 
-// Middleware to parse JSON bodies
-app.use(express.json({ limit: '10mb' }));
+// Middleware to parse JSON bodies, large enough for a batch of snippets
+app.use(express.json({ limit: '50mb' }));
 
 const OUTPUT_DIR = '/output';
 
-async function ensureOutputDir() {
-    try {
-        await fs.mkdir(OUTPUT_DIR, { recursive: true });
-        console.log(`Output directory ensured: ${OUTPUT_DIR}`);
-    } catch (err) {
-        console.error('Failed to create output directory:', err);
+// Viewport used when the client does not send a pre-measured one
+const DEFAULT_VIEWPORT = { width: 2048, height: 1536 };
+const MAX_VIEWPORT_SIZE = 16384;
+const DEVICE_SCALE_FACTOR = 2; // Increase for better quality
+
+// Output modes of a conversion: save the image to the shared output directory, or send its bytes back
+const OUTPUTS = ['file', 'image'];
+const IMAGE_FILENAME_PATTERN = /^[a-zA-Z0-9_\- ]+\.(png|jpg|jpeg)$/;
+
+// Preset pages registered by clients, into which fragment jobs are rendered
+const MAX_PRESETS = 32;
+const PRESET_NAME_PATTERN = /^[\w\-]{1,100}$/;
+const presets = new Map();
+
+// Limits of the /convert-batch endpoint
+const MAX_BATCH_SIZE = 200;
+
+// Space between the code containers of a contact sheet, wider than their box shadow
+const SHEET_GAP = 40;
+
+// Number of pages that render in parallel, and of jobs that may wait for a page in each priority lane
+const PAGE_COUNT = parseInt(process.env.RENDERER_PAGES || '4', 10);
+const MAX_QUEUE_DEPTH = parseInt(process.env.RENDERER_MAX_QUEUE || '64', 10);
+
+// Running average of the time a job holds a page, used to tell rejected clients when to retry
+let averageRenderMs = 500;
+
+// One browser renders on a pool of pages and is recycled after a number of renders to bound its memory
+const browserPool = new BrowserPool({
+    size: PAGE_COUNT,
+    maxRenders: parseInt(process.env.RENDERER_MAX_RENDERS || '500', 10),
+    viewport: { ...DEFAULT_VIEWPORT, deviceScaleFactor: DEVICE_SCALE_FACTOR },
+    launchOptions: {
+        headless: "new",
+        args: ['--no-sandbox', '--disable-setuid-sandbox']
     }
+});
+
+// Rendered images are reused for identical jobs, bounded by their total size on disk
+const renderCache = new RenderCache({
+    dir: process.env.RENDER_CACHE_DIR || '/tmp/render-cache',
+    maxBytes: parseInt(process.env.RENDER_CACHE_MAX_BYTES || String(256 * 1024 * 1024), 10)
+});
+
+/**
+ * Returns the version of the renderer and its browser, which clients use to key their render caches.
+ */
+function getRendererVersion() {
+    return `${RENDERER_VERSION}/${browserPool.version}`;
 }
 
-app.post('/convert', async (req, res) => {
-    console.log('Received convert request');
-    const { html, destPath, filename } = req.body;
+/**
+ * Returns the viewport requested by the client, or the default one if none was sent.
+ * Returns null if the requested viewport is invalid.
+ */
+function resolveViewport(viewport) {
+    if (viewport === undefined || viewport === null) {
+        return DEFAULT_VIEWPORT;
+    }
+
+    const { width, height } = viewport;
+    const isValidSize = (size) => Number.isInteger(size) && size > 0 && size <= MAX_VIEWPORT_SIZE;
+    if (!isValidSize(width) || !isValidSize(height)) {
+        return null;
+    }
+    return { width, height };
+}
+
+/**
+ * Returns the priority lane requested by the client, or the given default if none was sent.
+ * Returns null if the requested priority is unknown.
+ */
+function resolvePriority(priority, defaultPriority) {
+    if (priority === undefined || priority === null) {
+        return defaultPriority;
+    }
+    return PRIORITIES.includes(priority) ? priority : null;
+}
+
+/**
+ * Checks that the queue of a priority lane has room for the given number of jobs.
+ * Otherwise answers with 429 and a Retry-After estimate of when the queue has drained, and returns false.
+ * A request is always accepted into an empty queue, so batches larger than the queue can still run.
+ */
+function admitJobs(res, priority, count) {
+    const queued = browserPool.queued(priority);
+    if (queued === 0 || queued + count <= MAX_QUEUE_DEPTH) {
+        return true;
+    }
+
+    const retryAfter = Math.max(1, Math.ceil(queued / PAGE_COUNT * averageRenderMs / 1000));
+    console.warn(`Queue of the ${priority} lane is full (${queued} jobs), retry after ${retryAfter} s`);
+    res.set('Retry-After', String(retryAfter));
+    res.status(429).json({ error: 'Renderer is busy, retry later' });
+    return false;
+}
+
+/**
+ * Returns the output mode requested by the client: 'file' saves the image under the output directory,
+ * 'image' sends its bytes back in the response. Returns null if the requested mode is unknown.
+ */
+function resolveOutput(output) {
+    if (output === undefined || output === null) {
+        return 'file';
+    }
+    return OUTPUTS.includes(output) ? output : null;
+}
+
+/**
+ * Resolves what a job renders: either a full HTML document, or an HTML fragment that is
+ * swapped into the code element of a registered preset page.
+ * Returns an object with an error message if the content is missing or its preset is unknown.
+ */
+function resolveContent(job) {
+    const { html, fragment, preset } = job || {};
+
+    if (fragment !== undefined && fragment !== null) {
+        if (typeof fragment !== 'string' || !preset) {
+            console.error('Invalid fragment job:', { fragment: typeof fragment, preset });
+            return { error: 'Fragment jobs need a fragment string and a preset name' };
+        }
+
+        const presetPage = presets.get(preset);
+        if (!presetPage) {
+            console.error('Unknown preset:', preset);
+            return { error: `Unknown preset: ${preset}`, unknownPreset: true };
+        }
+        return { fragment, presetHash: presetPage.hash };
+    }
+
+    if (!html) {
+        console.error('Missing required field: html or fragment');
+        return { error: 'Missing required field: html or fragment' };
+    }
+    return { html };
+}
+
+/**
+ * Validates a conversion job and resolves its content, output paths and viewport.
+ * Jobs whose image is sent back need no output path, their optional filename selects the image format.
+ * Returns an object with an error message if the job is invalid.
+ */
+function prepareJob(job, output = 'file') {
+    const { destPath, filename, viewport } = job || {};
+
+    const content = resolveContent(job);
+    if (content.error) {
+        return content;
+    }
 
-    if (!html || !destPath || !filename) {
-        console.error('Missing required fields:', { html: !!html, destPath: !!destPath, filename: !!filename });
-        return res.status(400).json({ error: 'Missing required fields: html, destPath, filename' });
+    if (output === 'image') {
+        if (filename && !IMAGE_FILENAME_PATTERN.test(filename)) {
+            console.error('Invalid filename:', filename);
+            return { error: 'Invalid filename. Use alphanumeric characters, spaces, _, -, and .png/.jpg/.jpeg extension' };
+        }
+
+        const pageViewport = resolveViewport(viewport);
+        if (!pageViewport) {
+            console.error('Invalid viewport:', viewport);
+            return { error: `Invalid viewport. Use integer width and height between 1 and ${MAX_VIEWPORT_SIZE}` };
+        }
+
+        const imageType = filename && !filename.toLowerCase().endsWith('.png') ? 'jpeg' : 'png';
+        return { ...content, imageType, pageViewport };
+    }
+
+    if (!destPath || !filename) {
+        console.error('Missing required fields:', { destPath: !!destPath, filename: !!filename });
+        return { error: 'Missing required fields: destPath, filename' };
     }
 
-    
     const safeDestPath = path.normalize(destPath).replace(/^(\.\.[\/\\])+/, '').replace(/\\/g, '/');
     const fullDirPath = path.join(OUTPUT_DIR, safeDestPath);
     const fullFilePath = path.join(fullDirPath, filename);
-    
+
     console.log('Paths generated:', {
         safeDestPath,
         fullDirPath,
         fullFilePath
     });
 
-    if (!/^[a-zA-Z0-9_\- ]+\.(png|jpg|jpeg)$/.test(filename)) {
+    if (!IMAGE_FILENAME_PATTERN.test(filename)) {
         console.error('Invalid filename:', filename);
-        return res.status(400).json({ error: 'Invalid filename. Use alphanumeric characters, spaces, _, -, and .png/.jpg/.jpeg extension' });
+        return { error: 'Invalid filename. Use alphanumeric characters, spaces, _, -, and .png/.jpg/.jpeg extension' };
+    }
+
+    const pageViewport = resolveViewport(viewport);
+    if (!pageViewport) {
+        console.error('Invalid viewport:', viewport);
+        return { error: `Invalid viewport. Use integer width and height between 1 and ${MAX_VIEWPORT_SIZE}` };
     }
 
+    return { ...content, filename, fullDirPath, fullFilePath, pageViewport };
+}
+
+/**
+ * Loads a preset page into a page of the pool, including its fonts, so fragments can be swapped in.
+ * The page keeps the hash of the preset as its affinity, so later jobs of the preset prefer it.
+ */
+async function loadPreset(page, presetHash) {
+    const presetPage = [...presets.values()].find((preset) => preset.hash === presetHash);
+    if (!presetPage) {
+        throw new Error('Preset was replaced while the job was queued');
+    }
+
+    page.affinity = null;
+    console.log('Loading preset page:', presetPage.name);
+    await page.setContent(presetPage.html, { waitUntil: 'networkidle0' });
+
+    // Font faces only load once text uses them, so load them all before the first fragment arrives
+    await page.evaluate(() => Promise.all([...document.fonts].map((font) => font.load())));
+    page.affinity = presetHash;
+}
+
+/**
+ * Loads a newly registered preset into a page of the pool, so the first fragment does not pay for loading it.
+ * The warm-up waits in the bulk lane, behind interactive jobs, and is skipped while bulk jobs are queued,
+ * as they load the preset themselves when they need it.
+ */
+async function warmUpPreset(presetHash) {
+    if (browserPool.queued('bulk') > 0) {
+        return;
+    }
+
+    const page = await browserPool.acquire('bulk');
     try {
+        await loadPreset(page, presetHash);
+    } finally {
+        browserPool.release(page);
+    }
+}
+
+/**
+ * Renders a prepared job on a page from the pool and takes a screenshot of its code container.
+ * Returns the path of the saved file, or the image bytes for jobs without an output path.
+ */
+async function renderJob(job, priority) {
+    const { html, fragment, presetHash, fullDirPath, fullFilePath, imageType, pageViewport } = job;
+
+    if (fullDirPath) {
         console.log('Creating directory:', fullDirPath);
         await fs.mkdir(fullDirPath, { recursive: true });
+    }
 
-        console.log('Launching browser...');
-        const browser = await puppeteer.launch({
-            headless: "new",
-            args: ['--no-sandbox', '--disable-setuid-sandbox']
-        });
-        console.log('Browser launched successfully');
+    const cacheKey = renderCache.getKey(job, DEVICE_SCALE_FACTOR, getRendererVersion());
+    const cachedImage = await renderCache.get(cacheKey);
+    if (cachedImage) {
+        console.log('Serving cached image:', cacheKey);
+        if (!fullFilePath) {
+            return cachedImage;
+        }
+        await fs.writeFile(fullFilePath, cachedImage);
+        return fullFilePath;
+    }
 
-        const page = await browser.newPage();
-        console.log('New page created');
+    const page = await browserPool.acquire(priority, presetHash || null);
+    console.log('Page acquired for', priority, 'job');
+    const renderStart = Date.now();
+    let image;
 
-        // Set viewport to a large size initially with higher DPR for better quality
+    try {
+        // Size the viewport to the pre-measured snippet, or to a large default, with higher DPR for better quality
         await page.setViewport({
-            width: 2048,
-            height: 1536,
-            deviceScaleFactor: 2, // Increase for better quality
+            width: pageViewport.width,
+            height: pageViewport.height,
+            deviceScaleFactor: DEVICE_SCALE_FACTOR,
         });
-        console.log('Viewport set');
+        console.log('Viewport set:', pageViewport);
+
+        if (presetHash) {
+            // The template, CSS and fonts are already loaded, only the highlighted code changes
+            if (page.affinity !== presetHash) {
+                await loadPreset(page, presetHash);
+            }
+            await page.$eval('.code-container code', (code, markup) => { code.innerHTML = markup; }, fragment);
+        } else {
+            page.affinity = null;
+            console.log('Setting page content...');
+            await page.setContent(html, { waitUntil: 'networkidle0' });
+        }
 
-        console.log('Setting page content...');
-        await page.setContent(html, { waitUntil: 'networkidle0' });
-        
         // Wait for any fonts to load
         await page.evaluateHandle('document.fonts.ready');
-        
+
         // Get the exact dimensions of the code container
         console.log('Looking for code container element...');
         const element = await page.$('.code-container');
@@ -89,10 +314,8 @@ app.post('/convert', async (req, res) => {
         }
         console.log('Element dimensions:', boundingBox);
 
-        // Remove padding completely
-        const padding = 0;
         const screenshotOptions = {
-            path: fullFilePath,
+            ...(fullFilePath ? { path: fullFilePath } : { type: imageType }),
             clip: {
                 x: boundingBox.x,
                 y: boundingBox.y,
@@ -102,30 +325,166 @@ app.post('/convert', async (req, res) => {
             omitBackground: true // Make background transparent
         };
 
-        // Wait a bit for everything to settle
-        await page.waitForTimeout(100);
+        // Wait a bit for everything to settle, preset pages are settled once their fonts are ready
+        if (!presetHash) {
+            await page.waitForTimeout(100);
+        }
 
         console.log('Taking screenshot...');
-        await page.screenshot(screenshotOptions);
+        image = await page.screenshot(screenshotOptions);
         console.log('Screenshot taken');
+    } finally {
+        averageRenderMs = 0.9 * averageRenderMs + 0.1 * (Date.now() - renderStart);
+        browserPool.release(page);
+    }
+    await renderCache.put(cacheKey, image);
+
+    if (!fullFilePath) {
+        return image;
+    }
 
-        console.log('Closing browser...');
-        await browser.close();
-        console.log('Browser closed');
+    // Verify if file exists
+    try {
+        const stats = await fs.stat(fullFilePath);
+        console.log('File saved successfully:', {
+            path: fullFilePath,
+            size: stats.size + ' bytes'
+        });
+    } catch (statErr) {
+        console.error('File not found after save attempt:', statErr);
+        throw new Error('File was not saved successfully');
+    }
 
-        // Verify if file exists
-        try {
-            const stats = await fs.stat(fullFilePath);
-            console.log('File saved successfully:', {
-                path: fullFilePath,
-                size: stats.size + ' bytes'
-            });
-        } catch (statErr) {
-            console.error('File not found after save attempt:', statErr);
-            throw new Error('File was not saved successfully');
+    return fullFilePath;
+}
+
+/**
+ * Renders the fragments of one preset as a contact sheet: their code containers are stacked on a single
+ * page of the preset, which is captured in one screenshot. Each container is laid out in a cell as wide
+ * as the page of its own viewport would be, so it wraps and sizes like it does on its own.
+ * Returns the PNG of the sheet and the box of each container in CSS pixels, relative to the sheet.
+ * Sheets bypass the render cache, clients cache the images they slice out of them.
+ */
+async function renderSheet(jobs, presetHash, priority) {
+    const width = Math.max(...jobs.map((job) => job.pageViewport.width));
+    const height = jobs.reduce((total, job) => total + job.pageViewport.height, 0);
+
+    const page = await browserPool.acquire(priority, presetHash);
+    console.log('Page acquired for', priority, 'sheet of', jobs.length, 'jobs');
+    const renderStart = Date.now();
+
+    try {
+        await page.setViewport({ width, height, deviceScaleFactor: DEVICE_SCALE_FACTOR });
+        if (page.affinity !== presetHash) {
+            await loadPreset(page, presetHash);
         }
 
-        res.json({ message: 'Image saved successfully', path: fullFilePath });
+        // The page holds the sheet instead of the preset until it is restored below
+        page.affinity = null;
+        const cells = jobs.map((job) => ({ fragment: job.fragment, width: job.pageViewport.width }));
+        await page.evaluate((cells, gap) => {
+            const template = document.querySelector('.code-container');
+            const style = getComputedStyle(document.body);
+            const padding = parseFloat(style.paddingLeft) + parseFloat(style.paddingRight);
+
+            const sheet = document.createElement('div');
+            sheet.className = 'code-sheet';
+            for (const [index, { fragment, width }] of cells.entries()) {
+                const cell = document.createElement('div');
+                cell.style.width = 'fit-content';
+                cell.style.maxWidth = `${width - padding}px`;
+                cell.style.paddingTop = index ? `${gap}px` : '0';
+
+                const container = template.cloneNode(true);
+                container.querySelector('code').innerHTML = fragment;
+                cell.appendChild(container);
+                sheet.appendChild(cell);
+            }
+            template.replaceWith(sheet);
+            window.sheetTemplate = template;
+        }, cells, SHEET_GAP);
+        await page.evaluateHandle('document.fonts.ready');
+
+        const { clip, boxes } = await page.evaluate(() => {
+            const sheet = document.querySelector('.code-sheet').getBoundingClientRect();
+            const boxes = [...document.querySelectorAll('.code-sheet .code-container')].map((container) => {
+                const box = container.getBoundingClientRect();
+                return { x: box.x - sheet.x, y: box.y - sheet.y, width: box.width, height: box.height };
+            });
+            return { clip: { x: sheet.x, y: sheet.y, width: sheet.width, height: sheet.height }, boxes };
+        });
+
+        console.log('Taking sheet screenshot:', clip);
+        const image = await page.screenshot({ type: 'png', clip, omitBackground: true });
+
+        // Put the empty code container back, so the page stays loaded with the preset for the next jobs
+        await page.evaluate(() => {
+            document.querySelector('.code-sheet').replaceWith(window.sheetTemplate);
+            delete window.sheetTemplate;
+        });
+        page.affinity = presetHash;
+
+        return { image, boxes };
+    } finally {
+        averageRenderMs = 0.9 * averageRenderMs + 0.1 * (Date.now() - renderStart);
+        browserPool.release(page);
+    }
+}
+
+/**
+ * Reports the duration of a request, so clients can tell it apart from connection and transfer time.
+ */
+function setRenderTiming(res, startTime) {
+    const renderMs = Number(process.hrtime.bigint() - startTime) / 1e6;
+    res.set('Server-Timing', `render;dur=${renderMs.toFixed(1)}`);
+}
+
+async function ensureOutputDir() {
+    try {
+        await fs.mkdir(OUTPUT_DIR, { recursive: true });
+        console.log(`Output directory ensured: ${OUTPUT_DIR}`);
+    } catch (err) {
+        console.error('Failed to create output directory:', err);
+    }
+}
+
+app.post('/convert', async (req, res) => {
+    console.log('Received convert request');
+    const startTime = process.hrtime.bigint();
+
+    // Single renders are usually interactive, so they default to the interactive lane
+    const priority = resolvePriority(req.body.priority, 'interactive');
+    if (!priority) {
+        return res.status(400).json({ error: `Invalid priority. Use one of: ${PRIORITIES.join(', ')}` });
+    }
+
+    const output = resolveOutput(req.body.output);
+    if (!output) {
+        return res.status(400).json({ error: `Invalid output. Use one of: ${OUTPUTS.join(', ')}` });
+    }
+
+    const job = prepareJob(req.body, output);
+    if (job.error) {
+        // Presets are lost when the renderer restarts, clients register them again on 409
+        return res.status(job.unknownPreset ? 409 : 400).json({ error: job.error });
+    }
+
+    if (!admitJobs(res, priority, 1)) {
+        return;
+    }
+
+    try {
+        const result = await renderJob(job, priority);
+
+        setRenderTiming(res, startTime);
+        if (output === 'image') {
+            // Written without a Content-Length, so the image is sent with chunked transfer encoding
+            res.type(job.imageType);
+            res.write(result);
+            res.end();
+        } else {
+            res.json({ message: 'Image saved successfully', path: result });
+        }
     } catch (err) {
         console.error('Conversion error:', err);
         console.error('Error stack:', err.stack);
@@ -133,7 +492,149 @@ app.post('/convert', async (req, res) => {
     }
 });
 
-app.listen(port, () => {
-    console.log(`Server running at http://localhost:${port}`);
-    ensureOutputDir();
-});
\ No newline at end of file
+app.post('/convert-batch', async (req, res) => {
+    const { jobs } = req.body;
+    const priority = resolvePriority(req.body.priority, 'bulk');
+    console.log('Received convert batch request:', Array.isArray(jobs) ? jobs.length : 0, 'jobs');
+    const startTime = process.hrtime.bigint();
+
+    if (!Array.isArray(jobs) || jobs.length === 0 || jobs.length > MAX_BATCH_SIZE) {
+        return res.status(400).json({ error: `Expected a jobs array with 1 to ${MAX_BATCH_SIZE} items` });
+    }
+    if (!priority) {
+        return res.status(400).json({ error: `Invalid priority. Use one of: ${PRIORITIES.join(', ')}` });
+    }
+    const output = resolveOutput(req.body.output);
+    if (!output) {
+        return res.status(400).json({ error: `Invalid output. Use one of: ${OUTPUTS.join(', ')}` });
+    }
+    if (!admitJobs(res, priority, jobs.length)) {
+        return;
+    }
+
+    // Invalid jobs fail on their own without failing the whole batch
+    const preparedJobs = jobs.map((job) => prepareJob(job, output));
+    const unknownPresetJob = preparedJobs.find((job) => job.unknownPreset);
+    if (unknownPresetJob) {
+        return res.status(409).json({ error: unknownPresetJob.error });
+    }
+    const results = preparedJobs.map((job) => job.error ? { status: 'error', error: job.error } : null);
+
+    // The jobs render in parallel on the free pages of the pool and queue for the busy ones
+    await Promise.all(preparedJobs.map(async (job, index) => {
+        if (results[index]) {
+            return;
+        }
+
+        try {
+            const result = await renderJob(job, priority);
+            results[index] = output === 'image'
+                ? { status: 'ok', message: 'Image rendered successfully', image: result.toString('base64') }
+                : { status: 'ok', message: 'Image saved successfully', path: result };
+        } catch (err) {
+            console.error('Conversion error:', err);
+            results[index] = { status: 'error', error: 'Failed to convert HTML to image', details: err.message };
+        }
+    }));
+
+    setRenderTiming(res, startTime);
+    res.json({ results });
+});
+
+app.post('/convert-sheet', async (req, res) => {
+    const { jobs } = req.body;
+    const priority = resolvePriority(req.body.priority, 'bulk');
+    console.log('Received convert sheet request:', Array.isArray(jobs) ? jobs.length : 0, 'jobs');
+    const startTime = process.hrtime.bigint();
+
+    if (!Array.isArray(jobs) || jobs.length === 0 || jobs.length > MAX_BATCH_SIZE) {
+        return res.status(400).json({ error: `Expected a jobs array with 1 to ${MAX_BATCH_SIZE} items` });
+    }
+    if (!priority) {
+        return res.status(400).json({ error: `Invalid priority. Use one of: ${PRIORITIES.join(', ')}` });
+    }
+
+    // The sheet is sent back as one image, so the jobs need no output path and share one image format
+    const preparedJobs = jobs.map((job) => prepareJob(job, 'image'));
+    const invalidJob = preparedJobs.find((job) => job.error);
+    if (invalidJob) {
+        return res.status(invalidJob.unknownPreset ? 409 : 400).json({ error: invalidJob.error });
+    }
+
+    const presetHash = preparedJobs[0].presetHash;
+    if (!presetHash || preparedJobs.some((job) => job.presetHash !== presetHash)) {
+        return res.status(400).json({ error: 'Sheet jobs need fragments of a single preset' });
+    }
+    const height = preparedJobs.reduce((total, job) => total + job.pageViewport.height, 0);
+    if (height > MAX_VIEWPORT_SIZE) {
+        return res.status(400).json({ error: `Sheet is too tall. Keep the sum of viewport heights up to ${MAX_VIEWPORT_SIZE}` });
+    }
+
+    // A sheet holds a single page, so it takes a single place in the queue
+    if (!admitJobs(res, priority, 1)) {
+        return;
+    }
+
+    try {
+        const { image, boxes } = await renderSheet(preparedJobs, presetHash, priority);
+
+        setRenderTiming(res, startTime);
+        res.json({ image: image.toString('base64'), deviceScaleFactor: DEVICE_SCALE_FACTOR, boxes });
+    } catch (err) {
+        console.error('Sheet conversion error:', err);
+        res.status(500).json({ error: 'Failed to convert sheet to image', details: err.message });
+    }
+});
+
+app.post('/presets', (req, res) => {
+    const { name, html } = req.body;
+    console.log('Received preset:', name);
+
+    if (typeof name !== 'string' || !PRESET_NAME_PATTERN.test(name) || !html) {
+        return res.status(400).json({ error: 'Expected a preset name of letters, digits, _ and -, and its html' });
+    }
+
+    const hash = crypto.createHash('sha256').update(html).digest('hex');
+    let isNewPreset = false;
+    if (presets.get(name)?.hash !== hash) {
+        presets.delete(name);
+        presets.set(name, { name, html, hash });
+        if (presets.size > MAX_PRESETS) {
+            presets.delete(presets.keys().next().value);
+        }
+
+        isNewPreset = true;
+    }
+
+    res.json({ message: 'Preset registered', name });
+
+    // Warm up a page after answering, so registration never waits for a page of the pool
+    if (isNewPreset) {
+        warmUpPreset(hash).catch((err) => console.error('Failed to warm up preset page:', err));
+    }
+});
+
+app.get('/version', (req, res) => {
+    res.json({ version: getRendererVersion(), deviceScaleFactor: DEVICE_SCALE_FACTOR });
+});
+
+app.get('/stats', (req, res) => {
+    res.json({ renderCache: renderCache.stats() });
+});
+
+Promise.all([browserPool.start(), renderCache.start()])
+    .then(() => {
+        app.listen(port, () => {
+            console.log(`Server running at http://localhost:${port}`);
+            ensureOutputDir();
+        });
+    })
+    .catch((err) => {
+        console.error('Failed to start renderer:', err);
+        process.exit(1);
+    });
+
+process.on('SIGTERM', async () => {
+    await browserPool.close();
+    process.exit(0);
+});